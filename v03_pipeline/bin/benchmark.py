@@ -0,0 +1,404 @@
+import csv
+import os
+import shutil
+import time
+from dataclasses import asdict, dataclass
+
+import hail as hl
+import luigi
+
+from v03_pipeline.lib.misc.io import file_size_bytes
+from v03_pipeline.lib.misc.spark_metrics import (
+    completed_spark_stages,
+    spark_stage_metrics_since,
+)
+from v03_pipeline.lib.model import (
+    DatasetType,
+    Env,
+    ReferenceDatasetCollection,
+    ReferenceGenome,
+    SampleType,
+)
+from v03_pipeline.lib.paths import valid_reference_dataset_collection_path
+from v03_pipeline.lib.tasks.update_project_table import UpdateProjectTableTask
+from v03_pipeline.lib.tasks.update_sample_lookup_table import (
+    UpdateSampleLookupTableTask,
+)
+from v03_pipeline.lib.tasks.update_variant_annotations_table_with_new_samples import (
+    UpdateVariantAnnotationsTableWithNewSamplesTask,
+)
+from v03_pipeline.lib.tasks.write_family_tables import WriteFamilyTablesTask
+from v03_pipeline.lib.tasks.write_imported_callset import WriteImportedCallsetTask
+from v03_pipeline.lib.tasks.write_remapped_and_subsetted_callsets import (
+    WriteRemappedAndSubsettedCallsetsTask,
+)
+
+BENCHMARK_CONTIG = 'chr1'
+# The benchmark inputs are built from test data in the repository, so they
+# are found relative to it rather than to the working directory.
+REPOSITORY_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+)
+BENCHMARK_LIFTOVER_REF_PATH = os.path.join(
+    REPOSITORY_ROOT,
+    'v03_pipeline/var/test/liftover/grch38_to_grch37.over.chain.gz',
+)
+BENCHMARK_REFERENCE_DATASET_COLLECTION_TEMPLATES = {
+    rdc: os.path.join(REPOSITORY_ROOT, path)
+    for rdc, path in {
+        ReferenceDatasetCollection.COMBINED: 'v03_pipeline/var/test/reference_data/test_combined_1.ht',
+        ReferenceDatasetCollection.HGMD: 'v03_pipeline/var/test/reference_data/test_hgmd_1.ht',
+        ReferenceDatasetCollection.INTERVAL: 'v03_pipeline/var/test/reference_data/test_interval_1.ht',
+    }.items()
+}
+BENCHMARK_SAMPLE_TYPE = SampleType.WGS
+BENCHMARK_VARIANT_SPACING = 10
+BASES = ['A', 'C', 'G', 'T']
+MAX_INDEL_LENGTH = 10
+PEDIGREE_FIELDS = [
+    'Project_GUID',
+    'Family_GUID',
+    'Family_ID',
+    'Individual_ID',
+    'Paternal_ID',
+    'Maternal_ID',
+    'Sex',
+]
+REMAP_FIELDS = ['s', 'seqr_id']
+
+
+@dataclass
+class BenchmarkConfig:
+    n_variants: int = 10000
+    n_samples: int = 30
+    n_projects: int = 1
+    indel_fraction: float = 0.1
+    missing_fraction: float = 0.02
+    reference_data_fraction: float = 0.5
+    seed: int = 0
+
+
+@dataclass
+class BenchmarkProject:
+    project_guid: str
+    project_remap_path: str
+    project_pedigree_path: str
+    family_guids: list[str]
+
+
+@dataclass
+class BenchmarkStageResult:
+    stage: str
+    wall_time_seconds: float
+    output_size_bytes: int
+    spark_metrics: dict[str, int] | None
+
+
+def benchmark_sample_id(i: int) -> str:
+    return f'SAMPLE{i:06d}'
+
+
+def synthetic_callset_mt(config: BenchmarkConfig) -> hl.MatrixTable:
+    # Variants are evenly spaced along a single contig, so keys are unique
+    # whatever mix of SNVs and indels is drawn.
+    mt = hl.utils.range_matrix_table(config.n_variants, config.n_samples)
+    mt = mt.annotate_rows(
+        ref=hl.literal(BASES)[hl.rand_int32(len(BASES))],
+        indel_length=hl.rand_int32(1, MAX_INDEL_LENGTH),
+        variant_type=hl.rand_unif(0, 1),
+        af=hl.rand_beta(0.5, 5),
+    )
+    mt = mt.annotate_rows(
+        alt=hl.literal(BASES).filter(lambda b: b != mt.ref)[
+            hl.rand_int32(len(BASES) - 1)
+        ],
+    )
+    inserted = mt.ref + hl.delimit(hl.range(mt.indel_length).map(lambda _: mt.alt), '')
+    mt = mt.annotate_rows(
+        locus=hl.locus(
+            BENCHMARK_CONTIG,
+            mt.row_idx * BENCHMARK_VARIANT_SPACING + 1,
+            ReferenceGenome.GRCh38.value,
+        ),
+        alleles=hl.case()
+        .when(mt.variant_type >= config.indel_fraction, [mt.ref, mt.alt])
+        .when(mt.variant_type >= config.indel_fraction / 2, [mt.ref, inserted])
+        .default([inserted, mt.ref]),
+        rsid=hl.missing(hl.tstr),
+        filters=hl.empty_set(hl.tstr),
+        info=hl.struct(AF=[mt.af]),
+    )
+    mt = mt.key_rows_by('locus', 'alleles')
+    mt = mt.select_rows('rsid', 'filters', 'info')
+    mt = mt.key_cols_by(s=hl.format('SAMPLE%06d', mt.col_idx)).drop('col_idx')
+
+    # Genotypes are drawn under Hardy-Weinberg equilibrium.
+    af = mt.info.AF[0]
+    mt = mt.annotate_entries(
+        n_alt=hl.or_missing(
+            hl.rand_bool(1 - config.missing_fraction),
+            hl.rand_cat([(1 - af) ** 2, 2 * af * (1 - af), af**2]),
+        ),
+        DP=hl.rand_int32(10, 60),
+    )
+    n_alt_reads = (
+        hl.case().when(mt.n_alt == 0, 0).when(mt.n_alt == 1, mt.DP // 2).default(mt.DP)
+    )
+    mt = mt.annotate_entries(
+        GT=hl.call(mt.n_alt >= 2, mt.n_alt >= 1),  # noqa: PLR2004
+        AD=hl.or_missing(hl.is_defined(mt.n_alt), [mt.DP - n_alt_reads, n_alt_reads]),
+        DP=hl.or_missing(hl.is_defined(mt.n_alt), mt.DP),
+        GQ=hl.or_missing(hl.is_defined(mt.n_alt), hl.rand_int32(20, 99)),
+    )
+    return mt.drop('n_alt')
+
+
+def _synthetic_value(dtype: hl.HailType) -> hl.Expression:
+    if dtype == hl.tint32:
+        return hl.rand_int32(0, 2)
+    if dtype in {hl.tfloat32, hl.tfloat64}:
+        return hl.rand_unif(0, 1)
+    if dtype == hl.tstr:
+        return hl.format('BENCH%06d', hl.rand_int32(1000000))
+    if isinstance(dtype, hl.tstruct):
+        return hl.struct(
+            **{field: _synthetic_value(t) for field, t in dtype.items()},
+        )
+    return hl.missing(dtype)
+
+
+def synthetic_reference_dataset_collection_ht(
+    variants_ht: hl.Table,
+    template_ht: hl.Table,
+    fraction: float,
+) -> hl.Table:
+    # The template provides the schema and globals, the annotations are
+    # random values on a subset of the callset variants.
+    ht = variants_ht.select().filter(hl.rand_bool(fraction))
+    ht = ht.annotate(
+        **{
+            field: _synthetic_value(template_ht.row[field].dtype)
+            for field in template_ht.row_value
+        },
+    )
+    return ht.select_globals(**template_ht.index_globals())
+
+
+def write_pedigrees_and_remaps(
+    config: BenchmarkConfig,
+    work_dir: str,
+) -> list[BenchmarkProject]:
+    # Samples are assigned to trios, and trios to projects round-robin;
+    # leftover samples load as singletons.
+    projects = [
+        BenchmarkProject(
+            f'R{i:04d}_benchmark',
+            os.path.join(work_dir, f'remap_{i}.tsv'),
+            os.path.join(work_dir, f'pedigree_{i}.tsv'),
+            [],
+        )
+        for i in range(config.n_projects)
+    ]
+    pedigree_rows = [[] for _ in projects]
+    remap_rows = [[] for _ in projects]
+    for family_index, first_sample in enumerate(range(0, config.n_samples, 3)):
+        project_index = family_index % len(projects)
+        family_guid = f'{family_index}_{projects[project_index].project_guid}'
+        projects[project_index].family_guids.append(family_guid)
+        sample_ids = [
+            f'{benchmark_sample_id(i)}_1'
+            for i in range(first_sample, min(first_sample + 3, config.n_samples))
+        ]
+        for i, sample_id in enumerate(sample_ids):
+            is_proband = i == 2  # noqa: PLR2004
+            pedigree_rows[project_index].append(
+                {
+                    'Project_GUID': projects[project_index].project_guid,
+                    'Family_GUID': family_guid,
+                    'Family_ID': str(family_index),
+                    'Individual_ID': sample_id,
+                    'Paternal_ID': sample_ids[1] if is_proband else '',
+                    'Maternal_ID': sample_ids[0] if is_proband else '',
+                    'Sex': 'F' if i % 2 == 0 else 'M',
+                },
+            )
+            remap_rows[project_index].append(
+                {'s': sample_id.removesuffix('_1'), 'seqr_id': sample_id},
+            )
+    for project, pedigree, remap in zip(
+        projects,
+        pedigree_rows,
+        remap_rows,
+        strict=True,
+    ):
+        for path, fieldnames, rows in [
+            (project.project_pedigree_path, PEDIGREE_FIELDS, pedigree),
+            (project.project_remap_path, REMAP_FIELDS, remap),
+        ]:
+            with open(path, 'w') as f:
+                writer = csv.DictWriter(f, fieldnames, delimiter='\t')
+                writer.writeheader()
+                writer.writerows(rows)
+    return projects
+
+
+def validate_benchmark_env(work_dir: str) -> None:
+    # The benchmark overwrites the reference dataset collections and the
+    # pipeline tables, so every data root must be a scratch directory.
+    work_dir = os.path.abspath(work_dir)
+    outside_work_dir = [
+        path
+        for path in [
+            Env.HAIL_SEARCH_DATA,
+            Env.LOADING_DATASETS,
+            Env.PRIVATE_REFERENCE_DATASETS,
+            Env.REFERENCE_DATASETS,
+        ]
+        if os.path.commonpath([work_dir, os.path.abspath(path)]) != work_dir
+    ]
+    if outside_work_dir:
+        msg = (
+            f'Benchmark data roots must be inside {work_dir}: '
+            f'{", ".join(outside_work_dir)}'
+        )
+        raise RuntimeError(msg)
+
+
+def write_benchmark_inputs(
+    config: BenchmarkConfig,
+    work_dir: str,
+) -> tuple[str, list[BenchmarkProject]]:
+    validate_benchmark_env(work_dir)
+    os.makedirs(work_dir, exist_ok=True)
+    hl.set_global_seed(config.seed)
+    callset_path = os.path.join(work_dir, 'callset.mt')
+    synthetic_callset_mt(config).write(callset_path, overwrite=True)
+    variants_ht = hl.read_matrix_table(callset_path).rows()
+    for rdc in ReferenceDatasetCollection.for_dataset_type(DatasetType.SNV_INDEL):
+        template_path = BENCHMARK_REFERENCE_DATASET_COLLECTION_TEMPLATES[rdc]
+        destination_path = valid_reference_dataset_collection_path(
+            ReferenceGenome.GRCh38,
+            DatasetType.SNV_INDEL,
+            rdc,
+        )
+        if destination_path is None:
+            continue
+        if rdc == ReferenceDatasetCollection.INTERVAL:
+            shutil.rmtree(destination_path, ignore_errors=True)
+            shutil.copytree(template_path, destination_path)
+            continue
+        synthetic_reference_dataset_collection_ht(
+            variants_ht,
+            hl.read_table(template_path),
+            config.reference_data_fraction,
+        ).write(destination_path, overwrite=True)
+    return callset_path, write_pedigrees_and_remaps(config, work_dir)
+
+
+def benchmark_stages(
+    callset_path: str,
+    projects: list[BenchmarkProject],
+) -> list[tuple[str, luigi.Task]]:
+    shared_params = (
+        ReferenceGenome.GRCh38,
+        DatasetType.SNV_INDEL,
+        BENCHMARK_SAMPLE_TYPE,
+        callset_path,
+    )
+    project_guids = [p.project_guid for p in projects]
+    project_remap_paths = [p.project_remap_path for p in projects]
+    project_pedigree_paths = [p.project_pedigree_path for p in projects]
+    return [
+        (
+            'WriteImportedCallsetTask',
+            WriteImportedCallsetTask(*shared_params, validate=False),
+        ),
+        (
+            'WriteRemappedAndSubsettedCallsetsTask',
+            WriteRemappedAndSubsettedCallsetsTask(
+                *shared_params,
+                project_guids,
+                project_remap_paths,
+                project_pedigree_paths,
+                validate=False,
+            ),
+        ),
+        (
+            'UpdateSampleLookupTableTask',
+            UpdateSampleLookupTableTask(
+                *shared_params,
+                project_guids,
+                project_remap_paths,
+                project_pedigree_paths,
+                validate=False,
+            ),
+        ),
+        (
+            'UpdateVariantAnnotationsTableWithNewSamplesTask',
+            UpdateVariantAnnotationsTableWithNewSamplesTask(
+                ReferenceGenome.GRCh38,
+                DatasetType.SNV_INDEL,
+                BENCHMARK_SAMPLE_TYPE,
+                callset_path=callset_path,
+                project_guids=project_guids,
+                project_remap_paths=project_remap_paths,
+                project_pedigree_paths=project_pedigree_paths,
+                validate=False,
+                liftover_ref_path=BENCHMARK_LIFTOVER_REF_PATH,
+            ),
+        ),
+        *[
+            (
+                f'UpdateProjectTableTask/{p.project_guid}',
+                UpdateProjectTableTask(
+                    *shared_params,
+                    p.project_guid,
+                    p.project_remap_path,
+                    p.project_pedigree_path,
+                    validate=False,
+                ),
+            )
+            for p in projects
+        ],
+        *[
+            (
+                f'WriteFamilyTablesTask/{p.project_guid}',
+                WriteFamilyTablesTask(
+                    *shared_params,
+                    p.project_guid,
+                    p.project_remap_path,
+                    p.project_pedigree_path,
+                    family_guids=p.family_guids,
+                    validate=False,
+                ),
+            )
+            for p in projects
+        ],
+    ]
+
+
+def run_benchmark_stage(stage: str, task: luigi.Task) -> BenchmarkStageResult:
+    # Stages run in dependency order, so each build only runs its own task.
+    previous_stages = completed_spark_stages()
+    start = time.perf_counter()
+    if not luigi.build([task], local_scheduler=True):
+        msg = f'Benchmark stage {stage} failed'
+        raise RuntimeError(msg)
+    wall_time_seconds = time.perf_counter() - start
+    outputs = task.output()
+    if not isinstance(outputs, list):
+        outputs = [outputs]
+    return BenchmarkStageResult(
+        stage,
+        wall_time_seconds,
+        sum(file_size_bytes(output.path) for output in outputs),
+        spark_stage_metrics_since(previous_stages),
+    )
+
+
+def run_benchmark(config: BenchmarkConfig, work_dir: str) -> list[dict]:
+    callset_path, projects = write_benchmark_inputs(config, work_dir)
+    return [
+        asdict(run_benchmark_stage(stage, task))
+        for stage, task in benchmark_stages(callset_path, projects)
+    ]
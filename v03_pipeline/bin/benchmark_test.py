@@ -0,0 +1,97 @@
+import csv
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+
+import hail as hl
+
+from v03_pipeline.bin.benchmark import (
+    BenchmarkConfig,
+    synthetic_callset_mt,
+    synthetic_reference_dataset_collection_ht,
+    validate_benchmark_env,
+    write_pedigrees_and_remaps,
+)
+from v03_pipeline.lib.misc.io import import_pedigree, import_remap
+from v03_pipeline.lib.misc.pedigree import parse_pedigree_ht_to_families
+
+TEST_COMBINED_1 = 'v03_pipeline/var/test/reference_data/test_combined_1.ht'
+
+
+class BenchmarkTest(unittest.TestCase):
+    def test_synthetic_callset_mt(self) -> None:
+        mt = synthetic_callset_mt(
+            BenchmarkConfig(n_variants=200, n_samples=7, indel_fraction=0.5),
+        )
+        self.assertEqual(mt.count(), (200, 7))
+        self.assertEqual(
+            mt.s.collect()[:2],
+            ['SAMPLE000000', 'SAMPLE000001'],
+        )
+        rows = mt.rows().collect()
+        self.assertTrue(all(len(r.alleles) == 2 for r in rows))  # noqa: PLR2004
+        n_snvs = sum(len(r.alleles[0]) == len(r.alleles[1]) == 1 for r in rows)
+        self.assertTrue(0 < n_snvs < 200)  # noqa: PLR2004
+        entries = mt.entries()
+        self.assertTrue(
+            entries.aggregate(
+                hl.agg.all(
+                    hl.is_missing(entries.GT) | (hl.sum(entries.AD) == entries.DP),
+                ),
+            ),
+        )
+
+    def test_synthetic_reference_dataset_collection_ht(self) -> None:
+        variants_ht = synthetic_callset_mt(
+            BenchmarkConfig(n_variants=100, n_samples=1),
+        ).rows()
+        template_ht = hl.read_table(TEST_COMBINED_1)
+        ht = synthetic_reference_dataset_collection_ht(variants_ht, template_ht, 0.5)
+        self.assertEqual(ht.row.dtype, template_ht.row.dtype)
+        self.assertEqual(ht.globals.collect(), template_ht.globals.collect())
+        self.assertTrue(0 < ht.count() < 100)  # noqa: PLR2004
+
+    def test_write_pedigrees_and_remaps(self) -> None:
+        with tempfile.TemporaryDirectory() as work_dir:
+            projects = write_pedigrees_and_remaps(
+                BenchmarkConfig(n_samples=8, n_projects=2),
+                work_dir,
+            )
+            self.assertEqual(
+                [p.family_guids for p in projects],
+                [
+                    ['0_R0000_benchmark', '2_R0000_benchmark'],
+                    ['1_R0001_benchmark'],
+                ],
+            )
+            families = parse_pedigree_ht_to_families(
+                import_pedigree(projects[0].project_pedigree_path),
+            )
+            self.assertEqual(
+                sorted(len(family.samples) for family in families),
+                [2, 3],
+            )
+            self.assertEqual(
+                import_remap(projects[1].project_remap_path).seqr_id.collect(),
+                ['SAMPLE000003_1', 'SAMPLE000004_1', 'SAMPLE000005_1'],
+            )
+            with open(os.path.join(work_dir, 'pedigree_1.tsv')) as f:
+                rows = list(csv.DictReader(f, delimiter='\t'))
+            self.assertEqual(rows[2]['Paternal_ID'], 'SAMPLE000004_1')
+
+    @patch('v03_pipeline.bin.benchmark.Env')
+    def test_validate_benchmark_env(self, mock_env: Mock) -> None:
+        with tempfile.TemporaryDirectory() as work_dir:
+            mock_env.HAIL_SEARCH_DATA = os.path.join(work_dir, 'hail-search-data')
+            mock_env.LOADING_DATASETS = os.path.join(work_dir, 'loading-datasets')
+            mock_env.PRIVATE_REFERENCE_DATASETS = os.path.join(work_dir, 'private')
+            mock_env.REFERENCE_DATASETS = os.path.join(work_dir, 'reference')
+            validate_benchmark_env(work_dir)
+            mock_env.REFERENCE_DATASETS = '/seqr-reference-data'
+            self.assertRaisesRegex(
+                RuntimeError,
+                'seqr-reference-data',
+                validate_benchmark_env,
+                work_dir,
+            )
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+import argparse
+import json
+
+from v03_pipeline.bin.benchmark import BenchmarkConfig, run_benchmark
+
+if __name__ == '__main__':
+    # HAIL_SEARCH_DATA, LOADING_DATASETS, REFERENCE_DATASETS and
+    # PRIVATE_REFERENCE_DATASETS must all point inside the work dir; the
+    # reference tables there are overwritten with synthetic ones.  Without
+    # a local VEP install, set VEP_BACKEND=synthetic.
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--work-dir', required=True)
+    parser.add_argument('--output-path')
+    parser.add_argument('--n-variants', type=int, default=BenchmarkConfig.n_variants)
+    parser.add_argument('--n-samples', type=int, default=BenchmarkConfig.n_samples)
+    parser.add_argument('--n-projects', type=int, default=BenchmarkConfig.n_projects)
+    parser.add_argument(
+        '--indel-fraction',
+        type=float,
+        default=BenchmarkConfig.indel_fraction,
+    )
+    parser.add_argument(
+        '--missing-fraction',
+        type=float,
+        default=BenchmarkConfig.missing_fraction,
+    )
+    parser.add_argument(
+        '--reference-data-fraction',
+        type=float,
+        default=BenchmarkConfig.reference_data_fraction,
+    )
+    parser.add_argument('--seed', type=int, default=BenchmarkConfig.seed)
+    args = parser.parse_args()
+    results = run_benchmark(
+        BenchmarkConfig(
+            args.n_variants,
+            args.n_samples,
+            args.n_projects,
+            args.indel_fraction,
+            args.missing_fraction,
+            args.reference_data_fraction,
+            args.seed,
+        ),
+        args.work_dir,
+    )
+    report = json.dumps(results, indent=2)
+    if args.output_path:
+        with open(args.output_path, 'w') as f:
+            f.write(report)
+    print(report)
@@ -2,48 +2,41 @@
 from __future__ import annotations
 
 import argparse
-import os
+import sys
 
-import hail as hl
+import luigi
 
-from v03_pipeline.lib.misc.io import write
 from v03_pipeline.lib.model import (
     DatasetType,
     ReferenceDatasetCollection,
     ReferenceGenome,
 )
-from v03_pipeline.lib.paths import valid_reference_dataset_collection_path
-from v03_pipeline.lib.reference_data.combine import join_hts, update_existing_joined_hts
+from v03_pipeline.lib.tasks.write_reference_dataset import WriteReferenceDatasetTask
+from v03_pipeline.lib.tasks.write_reference_dataset_collection import (
+    WriteReferenceDatasetCollectionTask,
+)
 
 
-def run(dataset_type: DatasetType, dataset: str | None):
+def run(dataset_type: DatasetType, dataset: str | None, workers: int) -> bool:
     reference_genome = ReferenceGenome.GRCh38
-    destination_path = valid_reference_dataset_collection_path(
-        reference_genome,
-        dataset_type,
-        ReferenceDatasetCollection.INTERVAL,
-    )
-    if (
-        hl.hadoop_exists(os.path.join(destination_path, '_SUCCESS'))
-        and dataset is not None
-    ):
-        ht = update_existing_joined_hts(
-            destination_path,
-            dataset,
-            reference_genome,
-            dataset_type,
-            ReferenceDatasetCollection.INTERVAL,
-        )
-    else:
-        ht = join_hts(
+    if dataset is not None:
+        WriteReferenceDatasetTask(
             reference_genome,
             dataset_type,
             ReferenceDatasetCollection.INTERVAL,
-        )
-
-    ht.describe()
-    print(f'Uploading ht to {destination_path}')
-    write(ht, destination_path)
+            dataset,
+        ).run()
+    return luigi.build(
+        [
+            WriteReferenceDatasetCollectionTask(
+                reference_genome,
+                dataset_type,
+                ReferenceDatasetCollection.INTERVAL,
+            ),
+        ],
+        local_scheduler=True,
+        workers=workers,
+    )
 
 
 if __name__ == '__main__':
@@ -58,16 +51,23 @@ if __name__ == '__main__':
     parser.add_argument(
         '--dataset',
         default=None,
-        help='When used, update the passed dataset, otherwise run all datasets.',
+        help='When used, rebuild the passed dataset, otherwise only missing or stale datasets.',
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Number of datasets built concurrently.',
     )
     args, _ = parser.parse_known_args()
     if (
         args.dataset
         and args.dataset
-        not in ReferenceDatasetCollection.for_dataset_type(
+        not in ReferenceDatasetCollection.INTERVAL.datasets(
             args.dataset_type,
         )
     ):
-        msg = f'{args.dataset} is not a valid dataset for {DatasetType}'
+        msg = f'{args.dataset} is not a valid dataset for {args.dataset_type}'
         raise ValueError(msg)
-    run(args.dataset_type, args.dataset)
+    # If run does not succeed, exit with 1 status code.
+    run(args.dataset_type, args.dataset, args.workers) or sys.exit(1)
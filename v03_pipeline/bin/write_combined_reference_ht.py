@@ -2,55 +2,47 @@
 from __future__ import annotations
 
 import argparse
-import os
+import sys
 
-import hail as hl
+import luigi
 
-from v03_pipeline.lib.misc.io import write
 from v03_pipeline.lib.model import (
     DatasetType,
-    Env,
     ReferenceDatasetCollection,
     ReferenceGenome,
 )
-from v03_pipeline.lib.paths import valid_reference_dataset_collection_path
-from v03_pipeline.lib.reference_data.combine import join_hts, update_existing_joined_hts
+from v03_pipeline.lib.tasks.write_reference_dataset import WriteReferenceDatasetTask
+from v03_pipeline.lib.tasks.write_reference_dataset_collection import (
+    WriteReferenceDatasetCollectionTask,
+)
 
 
 def run(
     dataset_type: DatasetType,
     reference_genome: ReferenceGenome,
     dataset: str | None,
-):
-    destination_path = valid_reference_dataset_collection_path(
-        reference_genome,
-        dataset_type,
-        ReferenceDatasetCollection.COMBINED,
-    )
-    hl.init(tmp_dir=Env.HAIL_TMPDIR)
-    hl._set_flags(  # noqa: SLF001
-        no_whole_stage_codegen='1',
-    )  # hail 0.2.78 hits an error on the join, this flag gets around it
-    if (
-        hl.hadoop_exists(os.path.join(destination_path, '_SUCCESS'))
-        and dataset is not None
-    ):
-        ht = update_existing_joined_hts(
-            destination_path,
-            dataset,
+    workers: int,
+) -> bool:
+    if dataset is not None:
+        # Sources such as ClinVar keep their path between releases, so the
+        # dataset table is rebuilt on request and then merged as a delta.
+        WriteReferenceDatasetTask(
             reference_genome,
             dataset_type,
             ReferenceDatasetCollection.COMBINED,
-        )
-    else:
-        ht = join_hts(
-            reference_genome,
-            dataset_type,
-            ReferenceDatasetCollection.COMBINED,
-        )
-    ht.describe()
-    print(f'Uploading ht to {destination_path}')
-    write(ht, destination_path)
+            dataset,
+        ).run()
+    return luigi.build(
+        [
+            WriteReferenceDatasetCollectionTask(
+                reference_genome,
+                dataset_type,
+                ReferenceDatasetCollection.COMBINED,
+            ),
+        ],
+        local_scheduler=True,
+        workers=workers,
+    )
 
 
 if __name__ == '__main__':
@@ -71,20 +63,28 @@ if __name__ == '__main__':
     parser.add_argument(
         '--dataset',
         default=None,
-        help='When passed, update the single dataset, otherwise update all datasets.',
+        help='When passed, rebuild the single dataset, otherwise only missing or stale datasets.',
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Number of datasets built concurrently.',
     )
     args, _ = parser.parse_known_args()
     if (
         args.dataset
         and args.dataset
-        not in ReferenceDatasetCollection.for_dataset_type(
+        not in ReferenceDatasetCollection.COMBINED.datasets(
             args.dataset_type,
         )
     ):
-        msg = f'{args.dataset} is not a valid dataset for {DatasetType}'
+        msg = f'{args.dataset} is not a valid dataset for {args.dataset_type}'
         raise ValueError(msg)
+    # If run does not succeed, exit with 1 status code.
     run(
         args.dataset_type,
         args.reference_genome,
         args.dataset,
-    )
+        args.workers,
+    ) or sys.exit(1)
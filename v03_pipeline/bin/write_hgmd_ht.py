@@ -1,29 +1,30 @@
 #!/usr/bin/env python3
 import argparse
+import sys
+
+import luigi
 
-from v03_pipeline.lib.misc.io import write
 from v03_pipeline.lib.model import (
     DatasetType,
     ReferenceDatasetCollection,
     ReferenceGenome,
 )
-from v03_pipeline.lib.paths import valid_reference_dataset_collection_path
-from v03_pipeline.lib.reference_data.combine import join_hts
+from v03_pipeline.lib.tasks.write_reference_dataset_collection import (
+    WriteReferenceDatasetCollectionTask,
+)
 
 
-def run(reference_genome: ReferenceGenome):
-    ht = join_hts(
-        reference_genome,
-        DatasetType.SNV_INDEL,
-        ReferenceDatasetCollection.HGMD,
-    )
-    destination_path = valid_reference_dataset_collection_path(
-        reference_genome,
-        DatasetType.SNV_INDEL,
-        ReferenceDatasetCollection.HGMD,
+def run(reference_genome: ReferenceGenome) -> bool:
+    return luigi.build(
+        [
+            WriteReferenceDatasetCollectionTask(
+                reference_genome,
+                DatasetType.SNV_INDEL,
+                ReferenceDatasetCollection.HGMD,
+            ),
+        ],
+        local_scheduler=True,
     )
-    print(f'Uploading ht to {destination_path}')
-    write(ht, destination_path)
 
 
 if __name__ == '__main__':
@@ -35,4 +36,5 @@ if __name__ == '__main__':
         default=ReferenceGenome.GRCh38,
     )
     args, _ = parser.parse_known_args()
-    run(args.reference_genome)
+    # If run does not succeed, exit with 1 status code.
+    run(args.reference_genome) or sys.exit(1)
@@ -11,3 +11,13 @@ def get_fields(
 ) -> dict[str, hl.Expression]:
     fields = {fn.__name__: fn(t, **kwargs) for fn in fns}
     return {k: v for k, v in fields.items() if v is not None}
+
+
+def annotate_interval_matches(ht: hl.Table, interval_ht: hl.Table) -> hl.Table:
+    # The interval reference dataset fields are all read from these matches,
+    # so the interval table is looked up once per variant rather than once
+    # per field.  NB: ht is keyed by locus, so Hail plans this as an ordered
+    # interval join of the two tables rather than a re-keyed lookup.
+    return ht.annotate(
+        interval_matches=interval_ht.index(ht.locus, all_matches=True),
+    )
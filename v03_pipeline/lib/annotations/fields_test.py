@@ -3,7 +3,7 @@ from unittest.mock import Mock, patch
 
 import hail as hl
 
-from v03_pipeline.lib.annotations.fields import get_fields
+from v03_pipeline.lib.annotations.fields import annotate_interval_matches, get_fields
 from v03_pipeline.lib.model import (
     DatasetType,
     ReferenceDatasetCollection,
@@ -41,6 +41,16 @@ class FieldsTest(MockedDatarootTestCase):
             None,
         )
         ht = ht.annotate(rsid='abcd')
+        ht = annotate_interval_matches(
+            ht,
+            hl.read_table(
+                valid_reference_dataset_collection_path(
+                    ReferenceGenome.GRCh38,
+                    DatasetType.SNV_INDEL,
+                    ReferenceDatasetCollection.INTERVAL,
+                ),
+            ),
+        )
         self.assertCountEqual(
             list(
                 get_fields(
@@ -68,12 +68,8 @@ def HL(mt: hl.MatrixTable, **_: Any) -> hl.Expression:  # noqa: N802
     return hl.if_else(is_called, mt.HL, 0)
 
 
-def high_constraint_region(
-    ht: hl.Table,
-    interval_ht: hl.Table,
-    **_: Any,
-) -> hl.Expression:
-    return hl.is_defined(interval_ht[ht.locus])
+def high_constraint_region(ht: hl.Table, **_: Any) -> hl.Expression:
+    return hl.len(ht.interval_matches) > 0
 
 
 def mito_cn(mt: hl.MatrixTable, **_: Any) -> hl.Expression:
@@ -90,7 +86,47 @@ def rsid(ht: hl.Table, **_: Any) -> hl.Expression:
     return ht.rsid.find(lambda x: hl.is_defined(x))
 
 
-def gt_stats(ht: hl.Table, sample_lookup_ht: hl.Table, **_: Any) -> hl.Expression:
+def _gt_stats_with_delta(
+    ht: hl.Table,
+    sample_lookup_delta_ht: hl.Table,
+) -> hl.Expression:
+    # Only the rows in the delta are recomputed; every other row keeps its
+    # stored gt_stats.
+    delta = sample_lookup_delta_ht[ht.key]
+    return hl.if_else(
+        hl.is_missing(delta) & hl.is_defined(ht.gt_stats),
+        ht.gt_stats,
+        hl.bind(
+            lambda AC_het, AC_hom, AN: hl.Struct(  # noqa: N803
+                AC_het=AC_het,
+                AF_het=hl.float32(AC_het / AN),
+                AC_hom=AC_hom,
+                AF_hom=hl.float32(AC_hom / AN),
+                AN=AN,
+            ),
+            hl.or_else(ht.gt_stats.AC_het, 0)
+            + hl.or_else(delta.heteroplasmic_samples, 0),
+            hl.or_else(ht.gt_stats.AC_hom, 0)
+            + hl.or_else(delta.homoplasmic_samples, 0),
+            hl.or_else(ht.gt_stats.AN, 0)
+            + hl.or_else(
+                delta.ref_samples
+                + delta.heteroplasmic_samples
+                + delta.homoplasmic_samples,
+                0,
+            ),
+        ),
+    )
+
+
+def gt_stats(
+    ht: hl.Table,
+    sample_lookup_ht: hl.Table,
+    sample_lookup_delta_ht: hl.Table | None = None,
+    **_: Any,
+) -> hl.Expression:
+    if sample_lookup_delta_ht is not None:
+        return _gt_stats_with_delta(ht, sample_lookup_delta_ht)
     row = sample_lookup_ht[ht.key]
     return hl.Struct(
         AC_het=_AC_het(row),
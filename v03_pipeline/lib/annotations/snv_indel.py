@@ -39,6 +39,40 @@ def _hom(row: hl.StructExpression) -> hl.Int32Expression:
     )
 
 
+def _gt_stats_with_delta(
+    ht: hl.Table,
+    sample_lookup_delta_ht: hl.Table,
+) -> hl.Expression:
+    # Only the rows in the delta are recomputed; every other row keeps its
+    # stored gt_stats.
+    delta = sample_lookup_delta_ht[ht.key]
+    return hl.if_else(
+        hl.is_missing(delta) & hl.is_defined(ht.gt_stats),
+        ht.gt_stats,
+        hl.bind(
+            lambda AC, AN, hom: hl.Struct(  # noqa: N803
+                AC=AC,
+                AN=AN,
+                AF=hl.float32(AC / AN),
+                hom=hom,
+            ),
+            hl.or_else(ht.gt_stats.AC, 0)
+            + hl.or_else(
+                delta.ref_samples * N_ALT_REF
+                + delta.het_samples * N_ALT_HET
+                + delta.hom_samples * N_ALT_HOM,
+                0,
+            ),
+            hl.or_else(ht.gt_stats.AN, 0)
+            + hl.or_else(
+                2 * (delta.ref_samples + delta.het_samples + delta.hom_samples),
+                0,
+            ),
+            hl.or_else(ht.gt_stats.hom, 0) + hl.or_else(delta.hom_samples, 0),
+        ),
+    )
+
+
 def AB(mt: hl.MatrixTable, **_: Any) -> hl.Expression:  # noqa: N802
     is_called = hl.is_defined(mt.GT)
     return hl.bind(
@@ -63,8 +97,11 @@ def DP(mt: hl.MatrixTable, **_: Any) -> hl.Expression:  # noqa: N802
 def gt_stats(
     ht: hl.Table,
     sample_lookup_ht: hl.Table,
+    sample_lookup_delta_ht: hl.Table | None = None,
     **_: Any,
 ) -> hl.Expression:
+    if sample_lookup_delta_ht is not None:
+        return _gt_stats_with_delta(ht, sample_lookup_delta_ht)
     row = sample_lookup_ht[ht.key]
     return hl.Struct(
         AC=_AC(row),
@@ -74,34 +111,19 @@ def gt_stats(
     )
 
 
-def gnomad_non_coding_constraint(
-    ht: hl.Table,
-    interval_ht: hl.Table,
-    **_: Any,
-) -> hl.Expression:
+def gnomad_non_coding_constraint(ht: hl.Table, **_: Any) -> hl.Expression:
     return hl.Struct(
         z_score=(
-            interval_ht.index(ht.locus, all_matches=True)
-            .filter(
+            ht.interval_matches.filter(
                 lambda x: hl.is_defined(x.gnomad_non_coding_constraint['z_score']),
-            )
-            .gnomad_non_coding_constraint.z_score.first()
+            ).gnomad_non_coding_constraint.z_score.first()
         ),
     )
 
 
-def screen(
-    ht: hl.Table,
-    interval_ht: hl.Table,
-    **_: Any,
-) -> hl.Expression:
+def screen(ht: hl.Table, **_: Any) -> hl.Expression:
     return hl.Struct(
-        region_type_ids=(
-            interval_ht.index(
-                ht.locus,
-                all_matches=True,
-            ).flatmap(
-                lambda x: x.screen['region_type_ids'],
-            )
+        region_type_ids=ht.interval_matches.flatmap(
+            lambda x: x.screen['region_type_ids'],
         ),
     )
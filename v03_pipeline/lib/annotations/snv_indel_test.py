@@ -67,3 +67,56 @@ class SNVTest(unittest.TestCase):
                 ),
             ],
         )
+
+    def test_allele_count_annotations_indexed_samples(self) -> None:
+        ht = hl.Table.parallelize(
+            [{'id': 0}, {'id': 1}],
+            hl.tstruct(id=hl.tint32),
+            key='id',
+        )
+        sample_lookup_ht = hl.Table.parallelize(
+            [
+                {
+                    'id': 0,
+                    'ref_samples': hl.Struct(project_1=[0, 2], project_2=[]),
+                    'het_samples': hl.Struct(project_1=[1, 3], project_2=[]),
+                    'hom_samples': hl.Struct(project_1=[4, 5], project_2=[]),
+                },
+                {
+                    'id': 1,
+                    'ref_samples': hl.Struct(project_1=[0, 1], project_2=[0]),
+                    'het_samples': hl.Struct(project_1=[3], project_2=[]),
+                    'hom_samples': hl.Struct(project_1=[], project_2=[]),
+                },
+            ],
+            hl.tstruct(
+                id=hl.tint32,
+                ref_samples=hl.tstruct(
+                    project_1=hl.tarray(hl.tint32),
+                    project_2=hl.tarray(hl.tint32),
+                ),
+                het_samples=hl.tstruct(
+                    project_1=hl.tarray(hl.tint32),
+                    project_2=hl.tarray(hl.tint32),
+                ),
+                hom_samples=hl.tstruct(
+                    project_1=hl.tarray(hl.tint32),
+                    project_2=hl.tarray(hl.tint32),
+                ),
+            ),
+            key='id',
+            globals=hl.Struct(
+                sample_ids=hl.Struct(
+                    project_1=['a', 'b', 'c', 'd', 'e', 'f'],
+                    project_2=['g'],
+                ),
+            ),
+        )
+        ht = ht.select(gt_stats=gt_stats(ht, sample_lookup_ht))
+        self.assertCountEqual(
+            ht.collect(),
+            [
+                hl.Struct(id=0, gt_stats=hl.Struct(AC=6, AF=0.5, AN=12, hom=2)),
+                hl.Struct(id=1, gt_stats=hl.Struct(AC=1, AF=0.125, AN=8, hom=0)),
+            ],
+        )
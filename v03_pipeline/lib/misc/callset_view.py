@@ -0,0 +1,95 @@
+import os
+
+import hail as hl
+
+CALLSET_VIEW_SUFFIX = '.view.ht'
+
+
+def callset_view_ht(
+    mt: hl.MatrixTable,
+    imported_callset_path: str,
+) -> hl.Table:
+    # A view records the columns of a remapped and subsetted callset, keyed by
+    # their id in the imported callset, along with the globals.  The entries
+    # are read through from the imported callset.
+    imported_mt = hl.read_matrix_table(imported_callset_path)
+    ht = mt.cols()
+    ht = ht.select(
+        imported_s=ht.vcf_id if 'vcf_id' in ht.row else ht.s,
+        **{f: ht[f] for f in ht.row_value if f not in imported_mt.col},
+    )
+    return ht.annotate_globals(imported_callset_path=imported_callset_path)
+
+
+def write_callset_view_entries(
+    view_hts: dict[str, hl.Table],
+    imported_callset_path: str,
+    entries_path: str,
+) -> dict[str, hl.Table]:
+    # The entries of every project are split out of a single read of the
+    # imported callset, each into its own table under entries_path, so that
+    # reading a view no longer reads the entries of the whole callset.
+    mt = hl.read_matrix_table(imported_callset_path)
+    col_indices = {s: i for i, s in enumerate(mt.s.collect())}
+    ht = mt.select_globals()._localize_entries('entries', 'cols')  # noqa: SLF001
+    row_value = ht.row_value.drop('entries')
+    ht = ht.select(
+        **{
+            project_guid: hl.struct(
+                **row_value,
+                entries=hl.literal(
+                    sorted(col_indices[s] for s in view_ht.imported_s.collect()),
+                    hl.tarray(hl.tint32),
+                ).map(lambda i: ht.entries[i]),
+            )
+            for project_guid, view_ht in view_hts.items()
+        },
+    )
+    ht.write_many(entries_path, fields=list(view_hts), overwrite=True)
+    return {
+        project_guid: view_ht.annotate_globals(
+            entries_path=os.path.join(entries_path, project_guid),
+        )
+        for project_guid, view_ht in view_hts.items()
+    }
+
+
+def read_callset_view_entries(
+    mt: hl.MatrixTable,
+    entries_path: str,
+) -> hl.MatrixTable:
+    # The columns, in the order of the imported callset, and the globals are
+    # taken from the view and the rows and entries from the entries table.
+    cols_ht = mt.add_col_index('col_index').cols()
+    cols = [
+        c.drop('col_index')
+        for c in sorted(cols_ht.collect(), key=lambda c: c.col_index)
+    ]
+    ht = hl.read_table(entries_path)
+    ht = ht.select(**ht[os.path.basename(entries_path)])
+    ht = ht.select_globals(
+        cols=hl.literal(cols, hl.tarray(mt.col.dtype)),
+        **hl.literal(hl.eval(mt.globals), mt.globals.dtype),
+    )
+    return ht._unlocalize_entries('entries', 'cols', list(mt.col_key))  # noqa: SLF001
+
+
+def read_callset_view(path: str) -> hl.MatrixTable:
+    view_ht = hl.read_table(path)
+    mt = hl.read_matrix_table(hl.eval(view_ht.imported_callset_path))
+    view_ht = view_ht.key_by('imported_s')
+    mt = mt.semi_join_cols(view_ht)
+    mt = mt.annotate_cols(view=view_ht[mt.s])
+    mt = mt.key_cols_by(s=mt.view.s)
+    mt = mt.annotate_cols(**mt.view.drop('s')).drop('view')
+    view_globals = view_ht.index_globals().drop('imported_callset_path')
+    if 'entries_path' in view_ht.globals:
+        mt = mt.select_globals(**view_globals.drop('entries_path'))
+        return read_callset_view_entries(mt, hl.eval(view_ht.entries_path))
+    return mt.select_globals(**view_globals)
+
+
+def read_remapped_and_subsetted_callset(path: str) -> hl.MatrixTable:
+    if path.endswith(CALLSET_VIEW_SUFFIX):
+        return read_callset_view(path)
+    return hl.read_matrix_table(path)
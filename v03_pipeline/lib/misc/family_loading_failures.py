@@ -4,104 +4,140 @@ import numpy as np
 from v03_pipeline.lib.misc.pedigree import Family, Relation, Sample
 from v03_pipeline.lib.model import Ploidy
 
+RELATION_COEFFICIENTS = np.array([relation.coefficients for relation in Relation])
+RELATION_INDICES = {relation: i for i, relation in enumerate(Relation)}
+RELATEDNESS_CHECK_RTOL = 0.1
 
-def passes_relatedness_check(
-    relatedness_check_lookup: dict[tuple[str, str], list],
-    sample_id: str,
-    other_id: str,
-    relation: Relation,
-) -> bool:
-    # No relationship to check, return true
-    if other_id is None:
-        return True
-    coefficients = relatedness_check_lookup.get(
-        (min(sample_id, other_id), max(sample_id, other_id)),
-    )
-    if not coefficients:
-        return False
-    return np.allclose(
-        coefficients,
-        relation.coefficients,
-        0.1,
-    )
 
-
-def passes_all_relatedness_checks(  # noqa: C901
-    relatedness_check_lookup: dict[tuple[str, str], list],
+def expected_relations(
     sample: Sample,
-) -> bool:
-    for parent_id in [sample.mother, sample.father]:
-        if not passes_relatedness_check(
-            relatedness_check_lookup,
-            sample.sample_id,
-            parent_id,
-            Relation.PARENT,
-        ):
-            return False
-
-    for grandparent_id in [
-        sample.maternal_grandmother,
-        sample.maternal_grandfather,
-        sample.paternal_grandmother,
-        sample.paternal_grandfather,
-    ]:
-        if not passes_relatedness_check(
-            relatedness_check_lookup,
-            sample.sample_id,
-            grandparent_id,
-            Relation.GRANDPARENT,
-        ):
-            return False
-
-    for sibling_id in sample.siblings:
-        if not passes_relatedness_check(
-            relatedness_check_lookup,
-            sample.sample_id,
-            sibling_id,
-            Relation.SIBLING,
-        ):
-            return False
-
-    for half_sibling_id in sample.half_siblings:
-        # NB: A "half sibling" parsed from the pedigree may actually be a sibling, so we allow those
-        # through as well.
-        if not passes_relatedness_check(
-            relatedness_check_lookup,
-            sample.sample_id,
-            half_sibling_id,
-            Relation.HALF_SIBLING,
-        ) and not passes_relatedness_check(
-            relatedness_check_lookup,
-            sample.sample_id,
-            half_sibling_id,
-            Relation.SIBLING,
-        ):
-            return False
-
-    for aunt_nephew_id in sample.aunt_nephews:
-        if not passes_relatedness_check(
-            relatedness_check_lookup,
-            sample.sample_id,
-            aunt_nephew_id,
-            Relation.AUNT_NEPHEW,
-        ):
-            return False
-    return True
-
-
-def build_relatedness_check_lookup(
+) -> list[tuple[str, Relation, Relation]]:
+    # Each check is (other sample, relation, alternative relation).
+    # NB: A "half sibling" parsed from the pedigree may actually be a sibling, so we allow those
+    # through as well.
+    return [
+        *[
+            (parent_id, Relation.PARENT, Relation.PARENT)
+            for parent_id in [sample.mother, sample.father]
+            if parent_id
+        ],
+        *[
+            (grandparent_id, Relation.GRANDPARENT, Relation.GRANDPARENT)
+            for grandparent_id in [
+                sample.maternal_grandmother,
+                sample.maternal_grandfather,
+                sample.paternal_grandmother,
+                sample.paternal_grandfather,
+            ]
+            if grandparent_id
+        ],
+        *[
+            (sibling_id, Relation.SIBLING, Relation.SIBLING)
+            for sibling_id in sample.siblings
+        ],
+        *[
+            (half_sibling_id, Relation.HALF_SIBLING, Relation.SIBLING)
+            for half_sibling_id in sample.half_siblings
+        ],
+        *[
+            (aunt_nephew_id, Relation.AUNT_NEPHEW, Relation.AUNT_NEPHEW)
+            for aunt_nephew_id in sample.aunt_nephews
+        ],
+    ]
+
+
+def _pair_key(sample_id: str, other_id: str) -> str:
+    return '\t'.join(sorted([sample_id, other_id]))
+
+
+def build_relatedness_check_arrays(
     relatedness_check_ht: hl.Table,
     remap_lookup: hl.dict,
-) -> dict[tuple[str, str], list]:
-    # Build relatedness check lookup
-    relatedness_check_ht = relatedness_check_ht.key_by(
-        i=remap_lookup.get(relatedness_check_ht.i, relatedness_check_ht.i),
-        j=remap_lookup.get(relatedness_check_ht.j, relatedness_check_ht.j),
+    pair_keys: set[str] | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    # Returns the sorted pair keys of the relatedness check table, with the
+    # remapped ids of each pair in sorted order, and their coefficients.
+    # When pair keys are given only those pairs are collected.
+    i = remap_lookup.get(relatedness_check_ht.i, relatedness_check_ht.i)
+    j = remap_lookup.get(relatedness_check_ht.j, relatedness_check_ht.j)
+    relatedness_check_ht = relatedness_check_ht.select(
+        pair_key=hl.if_else(i < j, i + '\t' + j, j + '\t' + i),
+        coefficients=[
+            hl.float64(relatedness_check_ht[field])
+            for field in relatedness_check_ht.row
+            if field not in {'i', 'j'}
+        ],
     )
-    return {
-        (r.i, r.j): list(r.drop('i', 'j').values())
-        for r in relatedness_check_ht.collect()
-    }
+    if pair_keys is not None:
+        relatedness_check_ht = relatedness_check_ht.filter(
+            hl.literal(pair_keys, hl.tset(hl.tstr)).contains(
+                relatedness_check_ht.pair_key,
+            ),
+        )
+    rows = relatedness_check_ht.collect()
+    keys = np.array([r.pair_key for r in rows], dtype=str)
+    coefficients = np.array(
+        [r.coefficients for r in rows],
+        dtype=float,
+    ).reshape(len(rows), RELATION_COEFFICIENTS.shape[1])
+    order = np.argsort(keys)
+    return keys[order], coefficients[order]
+
+
+def evaluate_relatedness_checks(
+    families: set[Family],
+    relatedness_check_keys: np.ndarray,
+    relatedness_check_coefficients: np.ndarray,
+) -> dict[Family, list[str]]:
+    # Every expected relationship across all families is checked at once:
+    # expected pairs are joined to the relatedness check table by a binary
+    # search over its sorted pair keys, then compared to the coefficients of
+    # both the expected and the alternative relation.
+    checks = [
+        (family, sample.sample_id, other_id, relation, alternative_relation)
+        for family in families
+        for sample in family.samples.values()
+        for other_id, relation, alternative_relation in expected_relations(sample)
+    ]
+    failures = {family: [] for family in families}
+    if not checks:
+        return failures
+    check_families, sample_ids, other_ids, relations, alternative_relations = zip(
+        *checks,
+        strict=True,
+    )
+    keys = np.array(
+        [_pair_key(s, o) for s, o in zip(sample_ids, other_ids, strict=True)],
+        dtype=str,
+    )
+    indices = np.searchsorted(relatedness_check_keys, keys)
+    found = indices < len(relatedness_check_keys)
+    found[found] = relatedness_check_keys[indices[found]] == keys[found]
+    observed = np.full((len(keys), RELATION_COEFFICIENTS.shape[1]), np.nan)
+    observed[found] = relatedness_check_coefficients[indices[found]]
+    passes = found & (
+        np.isclose(
+            observed,
+            RELATION_COEFFICIENTS[[RELATION_INDICES[r] for r in relations]],
+            rtol=RELATEDNESS_CHECK_RTOL,
+        ).all(axis=1)
+        | np.isclose(
+            observed,
+            RELATION_COEFFICIENTS[[RELATION_INDICES[r] for r in alternative_relations]],
+            rtol=RELATEDNESS_CHECK_RTOL,
+        ).all(axis=1)
+    )
+    for k in np.flatnonzero(~passes):
+        reason = (
+            f'Sample {sample_ids[k]} has expected relation "{relations[k].value}" '
+            f'to {other_ids[k]} but '
+        )
+        if found[k]:
+            reason += f'has coefficients {observed[k].tolist()}'
+        else:
+            reason += 'the pair is missing from the relatedness check table'
+        failures[check_families[k]].append(reason)
+    return failures
 
 
 def build_sex_check_lookup(
@@ -132,30 +168,39 @@ def get_families_failed_relatedness_check(
     families: set[Family],
     relatedness_check_ht: hl.Table,
     remap_lookup: hl.dict,
-) -> set[Family]:
-    relatedness_check_lookup = build_relatedness_check_lookup(
-        relatedness_check_ht,
-        remap_lookup,
+) -> dict[Family, list[str]]:
+    # Only the pairs expected by the pedigrees are collected to the driver.
+    pair_keys = {
+        _pair_key(sample.sample_id, other_id)
+        for family in families
+        for sample in family.samples.values()
+        for other_id, _, _ in expected_relations(sample)
+    }
+    failures = evaluate_relatedness_checks(
+        families,
+        *build_relatedness_check_arrays(
+            relatedness_check_ht,
+            remap_lookup,
+            pair_keys,
+        ),
     )
-    failed_families = set()
-    for family in families:
-        for sample in family.samples.values():
-            if not passes_all_relatedness_checks(relatedness_check_lookup, sample):
-                failed_families.add(family)
-                break
-    return failed_families
+    return {family: reasons for family, reasons in failures.items() if reasons}
 
 
 def get_families_failed_sex_check(
     families: set[Family],
     sex_check_ht: hl.Table,
     remap_lookup: hl.dict,
-) -> set[Family]:
+) -> dict[Family, list[str]]:
     sex_check_lookup = build_sex_check_lookup(sex_check_ht, remap_lookup)
-    failed_families = set()
+    failed_families = {}
     for family in families:
-        for sample_id in family.samples:
-            if family.samples[sample_id].sex != sex_check_lookup[sample_id]:
-                failed_families.add(family)
-                break
+        reasons = [
+            f'Sample {sample_id} has pedigree sex {sample.sex.value} '
+            f'but imputed sex {sex_check_lookup[sample_id].value}'
+            for sample_id, sample in family.samples.items()
+            if sample.sex != sex_check_lookup[sample_id]
+        ]
+        if reasons:
+            failed_families[family] = reasons
     return failed_families
@@ -1,18 +1,30 @@
 import unittest
 
 import hail as hl
+import numpy as np
 
 from v03_pipeline.lib.misc.family_loading_failures import (
-    build_relatedness_check_lookup,
+    build_relatedness_check_arrays,
     build_sex_check_lookup,
-    passes_all_relatedness_checks,
+    evaluate_relatedness_checks,
+    get_families_failed_sex_check,
 )
-from v03_pipeline.lib.misc.pedigree import Sample
+from v03_pipeline.lib.misc.pedigree import Family, Sample
 from v03_pipeline.lib.model import Ploidy
 
 
+def relatedness_check_arrays(
+    relatedness_check_lookup: dict[tuple[str, str], list],
+) -> tuple[np.ndarray, np.ndarray]:
+    keys = sorted(relatedness_check_lookup)
+    return (
+        np.array(['\t'.join(key) for key in keys], dtype=str),
+        np.array([relatedness_check_lookup[key] for key in keys], dtype=float),
+    )
+
+
 class FamilyLoadingFailuresTest(unittest.TestCase):
-    def test_build_relatedness_check_lookup(self):
+    def test_build_relatedness_check_arrays(self):
         ht = hl.Table.parallelize(
             [
                 {
@@ -23,6 +35,14 @@ class FamilyLoadingFailuresTest(unittest.TestCase):
                     'ibd2': 0.0,
                     'pi_hat': 0.5,
                 },
+                {
+                    'i': 'ROS_006_18Y03227_D1',
+                    'j': 'ROS_007_19Y05939_D1',
+                    'ibd0': 0.5,
+                    'ibd1': 0.5,
+                    'ibd2': 0.0,
+                    'pi_hat': 0.25,
+                },
             ],
             hl.tstruct(
                 i=hl.tstr,
@@ -34,20 +54,29 @@ class FamilyLoadingFailuresTest(unittest.TestCase):
             ),
             key=['i', 'j'],
         )
+        keys, coefficients = build_relatedness_check_arrays(
+            ht,
+            hl.dict({'ROS_006_18Y03226_D1': 'remapped_id'}),
+        )
+        # Pairs are keyed by their remapped ids in sorted order.
         self.assertEqual(
-            build_relatedness_check_lookup(
-                ht,
-                hl.dict({'ROS_006_18Y03226_D1': 'remapped_id'}),
-            ),
-            {
-                ('remapped_id', 'ROS_007_19Y05939_D1'): [
-                    0.0,
-                    1.0,
-                    0.0,
-                    0.5,
-                ],
-            },
+            keys.tolist(),
+            [
+                'ROS_006_18Y03227_D1\tROS_007_19Y05939_D1',
+                'ROS_007_19Y05939_D1\tremapped_id',
+            ],
+        )
+        self.assertEqual(
+            coefficients.tolist(),
+            [[0.5, 0.5, 0.0, 0.25], [0.0, 1.0, 0.0, 0.5]],
+        )
+        keys, coefficients = build_relatedness_check_arrays(
+            ht,
+            hl.dict({'ROS_006_18Y03226_D1': 'remapped_id'}),
+            {'ROS_007_19Y05939_D1\tremapped_id'},
         )
+        self.assertEqual(keys.tolist(), ['ROS_007_19Y05939_D1\tremapped_id'])
+        self.assertEqual(coefficients.tolist(), [[0.0, 1.0, 0.0, 0.5]])
 
     def test_build_sex_check_lookup(self):
         ht = hl.Table.parallelize(
@@ -77,7 +106,50 @@ class FamilyLoadingFailuresTest(unittest.TestCase):
             },
         )
 
-    def test_passes_all_relatedness_checks(self):
+    def test_get_families_failed_sex_check(self):
+        ht = hl.Table.parallelize(
+            [
+                {'s': 'ROS_006_18Y03226_D1', 'sex': 'M'},
+                {'s': 'ROS_006_18Y03227_D1', 'sex': 'F'},
+            ],
+            hl.tstruct(
+                s=hl.tstr,
+                sex=hl.tstr,
+            ),
+            key='s',
+        )
+        families = {
+            Family(
+                family_guid='family_1',
+                samples={
+                    'remapped_id': Sample(sex=Ploidy.MALE, sample_id='remapped_id'),
+                },
+            ),
+            Family(
+                family_guid='family_2',
+                samples={
+                    'ROS_006_18Y03227_D1': Sample(
+                        sex=Ploidy.MALE,
+                        sample_id='ROS_006_18Y03227_D1',
+                    ),
+                },
+            ),
+        }
+        failed_families = get_families_failed_sex_check(
+            families,
+            ht,
+            hl.dict({'ROS_006_18Y03226_D1': 'remapped_id'}),
+        )
+        self.assertEqual(
+            [family.family_guid for family in failed_families],
+            ['family_2'],
+        )
+        self.assertEqual(
+            next(iter(failed_families.values())),
+            ['Sample ROS_006_18Y03227_D1 has pedigree sex M but imputed sex F'],
+        )
+
+    def test_evaluate_relatedness_checks(self):
         relatedness_check_lookup = {
             # Parent
             ('sample_1', 'sample_2'): [
@@ -91,27 +163,43 @@ class FamilyLoadingFailuresTest(unittest.TestCase):
             # Half Sibling (but actually a hidden Sibling)
             ('sample_1', 'sample_4'): [0.25, 0.5, 0.25, 0.5],
         }
-        sample = Sample(
-            sex=Ploidy.FEMALE,
-            sample_id='sample_1',
-            mother='sample_2',
-            paternal_grandfather='sample_3',
-            half_siblings=['sample_4'],
-        )
-        self.assertTrue(
-            passes_all_relatedness_checks(relatedness_check_lookup, sample),
+        family_1 = Family(
+            family_guid='family_1',
+            samples={
+                'sample_1': Sample(
+                    sex=Ploidy.FEMALE,
+                    sample_id='sample_1',
+                    mother='sample_2',
+                    paternal_grandfather='sample_3',
+                    half_siblings=['sample_4'],
+                ),
+            },
         )
-
         # Defined grandparent missing in relatedness table
-        sample = Sample(
-            sex=Ploidy.FEMALE,
-            sample_id='sample_1',
-            mother='sample_2',
-            paternal_grandfather='sample_3',
-            paternal_grandmother='sample_5',
+        family_2 = Family(
+            family_guid='family_2',
+            samples={
+                'sample_1': Sample(
+                    sex=Ploidy.FEMALE,
+                    sample_id='sample_1',
+                    mother='sample_2',
+                    paternal_grandfather='sample_3',
+                    paternal_grandmother='sample_5',
+                ),
+            },
         )
-        self.assertFalse(
-            passes_all_relatedness_checks(relatedness_check_lookup, sample),
+        self.assertEqual(
+            evaluate_relatedness_checks(
+                {family_1, family_2},
+                *relatedness_check_arrays(relatedness_check_lookup),
+            ),
+            {
+                family_1: [],
+                family_2: [
+                    'Sample sample_1 has expected relation "grandparent" to sample_5 '
+                    'but the pair is missing from the relatedness check table',
+                ],
+            },
         )
 
         # Sibling is actually a half sibling.
@@ -119,13 +207,38 @@ class FamilyLoadingFailuresTest(unittest.TestCase):
             **relatedness_check_lookup,
             ('sample_1', 'sample_4'): [0.5, 0.5, 0, 0.25],
         }
-        sample = Sample(
-            sex=Ploidy.FEMALE,
-            sample_id='sample_1',
-            mother='sample_2',
-            paternal_grandfather='sample_3',
-            siblings=['sample_4'],
-        )
-        self.assertFalse(
-            passes_all_relatedness_checks(relatedness_check_lookup, sample),
+        family_3 = Family(
+            family_guid='family_3',
+            samples={
+                'sample_1': Sample(
+                    sex=Ploidy.FEMALE,
+                    sample_id='sample_1',
+                    mother='sample_2',
+                    paternal_grandfather='sample_3',
+                    siblings=['sample_4'],
+                ),
+            },
+        )
+        self.assertEqual(
+            evaluate_relatedness_checks(
+                {family_3},
+                *relatedness_check_arrays(relatedness_check_lookup),
+            ),
+            {
+                family_3: [
+                    'Sample sample_1 has expected relation "sibling" to sample_4 '
+                    'but has coefficients [0.5, 0.5, 0.0, 0.25]',
+                ],
+            },
+        )
+
+        # Nothing to check against an empty relatedness table.
+        self.assertEqual(
+            evaluate_relatedness_checks(
+                {family_1},
+                np.array([], dtype=str),
+                np.empty((0, 4)),
+            )[family_1][0],
+            'Sample sample_1 has expected relation "parent" to sample_2 '
+            'but the pair is missing from the relatedness check table',
         )
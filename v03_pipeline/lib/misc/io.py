@@ -1,6 +1,12 @@
+import csv
+import functools
+import hashlib
 import math
 import os
+import shutil
+import subprocess
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 import hail as hl
 
@@ -9,7 +15,9 @@ from v03_pipeline.lib.model import DatasetType, Env, ReferenceGenome
 
 BIALLELIC = 2
 B_PER_MB = 1 << 20  # 1024 * 1024
+CONTENT_HASH_CHUNK_SIZE = 1 << 20
 MB_PER_PARTITION = 128
+N_LISTING_THREADS = 32
 
 
 def does_file_exist(path: str) -> bool:
@@ -19,25 +27,49 @@ def does_file_exist(path: str) -> bool:
 
 
 def file_size_bytes(path: str) -> int:
+    # Hail metadata records the part files of a table but not their sizes,
+    # so each directory is listed, one level at a time, across a thread pool.
     size_bytes = 0
-    seen_files = set()
-    while True:
-        files = hl.hadoop_ls(path)
-        has_directory = False
-        for f in files:
-            if f['path'] in seen_files:
-                continue
-            if f['is_dir']:
-                has_directory = True
-                continue
-            size_bytes += f['size_bytes']
-            seen_files.add(f['path'])
-        if not has_directory:
-            break
-        path = os.path.join(path, '**')
+    listings = [hl.hadoop_ls(path)]
+    with ThreadPoolExecutor(max_workers=N_LISTING_THREADS) as executor:
+        while listings:
+            directories = []
+            for files in listings:
+                for f in files:
+                    if f['is_dir']:
+                        directories.append(f['path'])
+                    else:
+                        size_bytes += f['size_bytes']
+            listings = list(executor.map(hl.hadoop_ls, directories))
     return size_bytes
 
 
+def estimate_file_size_bytes(
+    t: hl.Table | hl.MatrixTable,
+    reference_path: str,
+) -> int:
+    # The reference is an already written table with the same row schema,
+    # usually the input of the task or a previous version of the output.
+    # Its size is scaled by the ratio of rows and, for matrix tables, of
+    # the columns kept, as entries dominate the size.  Counting the rows
+    # of the reference only reads its metadata.
+    size_bytes = file_size_bytes(reference_path)
+    if hl.hadoop_exists(os.path.join(reference_path, 'entries')):
+        reference_mt = hl.read_matrix_table(reference_path)
+        reference_n_rows, reference_n_cols = reference_mt.count()
+    else:
+        reference_n_rows, reference_n_cols = hl.read_table(reference_path).count(), 0
+    if isinstance(t, hl.MatrixTable):
+        n_rows, n_cols = t.count()
+        if reference_n_cols:
+            size_bytes = size_bytes * n_cols / reference_n_cols
+    else:
+        n_rows = t.count()
+    if reference_n_rows:
+        size_bytes = size_bytes * n_rows / reference_n_rows
+    return math.ceil(size_bytes)
+
+
 def compute_hail_n_partitions(file_size_b: int) -> int:
     return math.ceil(file_size_b / B_PER_MB / MB_PER_PARTITION)
 
@@ -166,10 +198,109 @@ def import_pedigree(pedigree_path: str) -> hl.Table:
     )
 
 
-def write(
+def _open(path: str, mode: str = 'r'):
+    # NB: callers use the returned file as a context manager.
+    if path.startswith('gs://'):
+        return hl.hadoop_open(path, mode)
+    return open(path, mode)  # noqa: SIM115
+
+
+def file_content_hash(path: str) -> str:
+    content_hash = hashlib.sha256()
+    with _open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CONTENT_HASH_CHUNK_SIZE), b''):
+            content_hash.update(chunk)
+    return content_hash.hexdigest()
+
+
+def read_remap(remap_path: str) -> list[hl.Struct]:
+    # Remaps are read on the driver without Hail, with the same fields and
+    # missing values as the table returned by import_remap.
+    with _open(remap_path) as f:
+        return [
+            hl.Struct(
+                s=None if row['s'] == 'NA' else row['s'],
+                seqr_id=None if row['seqr_id'] == 'NA' else row['seqr_id'],
+            )
+            for row in csv.DictReader(f, delimiter='\t')
+        ]
+
+
+@functools.cache
+def _cached_remap(remap_path: str, _content_hash: str) -> tuple[hl.Struct, ...]:
+    return tuple(read_remap(remap_path))
+
+
+def load_remap(remap_path: str) -> list[hl.Struct]:
+    # Parsed remaps are shared by every task of a load running in this
+    # process; the content hash keeps an edited file from being served stale.
+    return list(_cached_remap(remap_path, file_content_hash(remap_path)))
+
+
+def read_pedigree(pedigree_path: str) -> list[hl.Struct]:
+    # Pedigrees are read on the driver without Hail, with the same fields
+    # as the table returned by import_pedigree.
+    with _open(pedigree_path) as f:
+        reader = csv.DictReader(f, delimiter='\t')
+        if reader.fieldnames is None:
+            msg = f'Pedigree {pedigree_path} is empty'
+            raise ValueError(msg)
+        return [
+            hl.Struct(
+                sex=row['Sex'] or None,
+                family_guid=row['Family_GUID'] or None,
+                s=row['Individual_ID'] or None,
+                maternal_s=row['Maternal_ID'] or None,
+                paternal_s=row['Paternal_ID'] or None,
+            )
+            for row in reader
+        ]
+
+
+def move_directory(source_path: str, destination_path: str) -> None:
+    if source_path.startswith('gs://') or destination_path.startswith('gs://'):
+        subprocess.run(
+            [  # noqa: S603, S607
+                'gsutil',
+                '-m',
+                '-q',
+                'mv',
+                source_path,
+                destination_path,
+            ],
+            check=True,
+        )
+        return
+    shutil.move(source_path, destination_path)
+
+
+def remove_directory(path: str) -> None:
+    if path.startswith('gs://'):
+        subprocess.run(
+            ['gsutil', '-m', '-q', 'rm', '-r', path],  # noqa: S603, S607
+            check=True,
+        )
+        return
+    shutil.rmtree(path)
+
+
+def replace_directory(source_path: str, destination_path: str) -> None:
+    # The existing directory is set aside rather than deleted, and is only
+    # removed once the replacement is in place.  If the move fails, the
+    # existing directory is restored.
+    previous_path = f'{destination_path}.{uuid.uuid4()}.previous'
+    move_directory(destination_path, previous_path)
+    try:
+        move_directory(source_path, destination_path)
+    except Exception:
+        move_directory(previous_path, destination_path)
+        raise
+    remove_directory(previous_path)
+
+
+def checkpoint(
     t: hl.Table | hl.MatrixTable,
-    destination_path: str,
-) -> hl.Table | hl.MatrixTable:
+) -> tuple[hl.Table | hl.MatrixTable, str]:
     suffix = 'mt' if isinstance(t, hl.MatrixTable) else 'ht'
     read_fn = hl.read_matrix_table if isinstance(t, hl.MatrixTable) else hl.read_table
     checkpoint_path = os.path.join(
@@ -178,6 +309,52 @@ def write(
     )
     # not using checkpoint to read/write here because the checkpoint codec is different, leading to a different on disk size.
     t.write(checkpoint_path)
-    t = read_fn(checkpoint_path)
-    t = t.naive_coalesce(compute_hail_n_partitions(file_size_bytes(checkpoint_path)))
+    return read_fn(checkpoint_path), checkpoint_path
+
+
+def write(
+    t: hl.Table | hl.MatrixTable,
+    destination_path: str,
+    size_reference_path: str | None = None,
+) -> hl.Table | hl.MatrixTable:
+    if size_reference_path is not None:
+        # The partitioning is planned up front, so the table is written once.
+        t = t.naive_coalesce(
+            compute_hail_n_partitions(
+                estimate_file_size_bytes(t, size_reference_path),
+            ),
+        )
+        return t.write(destination_path, overwrite=True)
+    t, path = checkpoint(t)
+    t = t.naive_coalesce(compute_hail_n_partitions(file_size_bytes(path)))
     return t.write(destination_path, overwrite=True)
+
+
+def write_in_place(
+    t: hl.Table | hl.MatrixTable,
+    destination_path: str,
+) -> None:
+    # The destination is also an input of the updated table, so it cannot be
+    # written directly.  Rather than re-reading a temporary copy and rewriting
+    # it, the copy is written once, next to the destination, and then swapped
+    # into place.  The partitioning of the existing table is kept unless the
+    # table has since outgrown it.
+    #
+    # Object stores have no directory rename: a move on GCS copies and then
+    # deletes every object, so the swap would copy the table twice and leave
+    # the destination missing or partial while it runs.  There the existing
+    # checkpoint and write path is used instead.
+    if destination_path.startswith('gs://'):
+        write(t, destination_path)
+        return
+    if isinstance(t, hl.MatrixTable):
+        n_partitions = hl.read_matrix_table(destination_path).n_partitions()
+    else:
+        n_partitions = hl.read_table(destination_path).n_partitions()
+    n_partitions = max(
+        n_partitions,
+        compute_hail_n_partitions(estimate_file_size_bytes(t, destination_path)),
+    )
+    tmp_path = f'{destination_path}.{uuid.uuid4()}.tmp'
+    t.naive_coalesce(n_partitions).write(tmp_path)
+    replace_directory(tmp_path, destination_path)
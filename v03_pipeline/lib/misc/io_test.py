@@ -1,9 +1,25 @@
+import math
+import os
+import shutil
+import tempfile
 import unittest
+from unittest.mock import patch
 
-from v03_pipeline.lib.misc.io import compute_hail_n_partitions, file_size_bytes
+import hail as hl
+
+from v03_pipeline.lib.misc.io import (
+    compute_hail_n_partitions,
+    estimate_file_size_bytes,
+    file_size_bytes,
+    import_remap,
+    load_remap,
+    read_remap,
+    write_in_place,
+)
 
 TEST_MITO_MT = 'v03_pipeline/var/test/callsets/mito_1.mt'
 TEST_SV_VCF = 'v03_pipeline/var/test/callsets/sv_1.vcf'
+TEST_REMAP = 'v03_pipeline/var/test/remaps/test_remap_1.tsv'
 
 
 class IOTest(unittest.TestCase):
@@ -13,7 +29,110 @@ class IOTest(unittest.TestCase):
         self.assertEqual(file_size_bytes(TEST_MITO_MT), 191310)
         self.assertEqual(file_size_bytes(TEST_SV_VCF), 20040)
 
+    def test_estimate_file_size_bytes(self) -> None:
+        mt = hl.read_matrix_table(TEST_MITO_MT)
+        self.assertEqual(estimate_file_size_bytes(mt, TEST_MITO_MT), 191310)
+        self.assertEqual(
+            estimate_file_size_bytes(mt.head(None, n_cols=252), TEST_MITO_MT),
+            19131,
+        )
+        self.assertEqual(estimate_file_size_bytes(mt.rows(), TEST_MITO_MT), 191310)
+        n_rows = mt.count_rows()
+        self.assertEqual(
+            estimate_file_size_bytes(mt.head(n_rows // 2), TEST_MITO_MT),
+            math.ceil(191310 * (n_rows // 2) / n_rows),
+        )
+
     def test_compute_hail_n_partitions(self) -> None:
         self.assertEqual(compute_hail_n_partitions(23), 1)
         self.assertEqual(compute_hail_n_partitions(191310), 1)
         self.assertEqual(compute_hail_n_partitions(1913100000), 15)
+
+    def test_write_in_place(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'test.ht')
+            hl.utils.range_table(100, n_partitions=4).write(path)
+            ht = hl.read_table(path)
+            new_ht = hl.utils.range_table(105, n_partitions=2)
+            ht = ht.union(new_ht.filter(new_ht.idx >= 100))  # noqa: PLR2004
+            write_in_place(ht.annotate(x=ht.idx * 2), path)
+            ht = hl.read_table(path)
+            self.assertLessEqual(ht.n_partitions(), 4)
+            self.assertEqual(ht.count(), 105)
+            self.assertEqual(ht.aggregate(hl.agg.sum(ht.x)), 2 * sum(range(105)))
+            self.assertEqual(os.listdir(temp_dir), ['test.ht'])
+
+    def test_write_in_place_failed_move(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'test.ht')
+            hl.utils.range_table(100, n_partitions=4).write(path)
+            ht = hl.read_table(path)
+            moves = []
+            shutil_move = shutil.move
+
+            def move(source_path: str, destination_path: str) -> None:
+                moves.append((source_path, destination_path))
+                if len(moves) == 2:  # noqa: PLR2004
+                    raise OSError
+                shutil_move(source_path, destination_path)
+
+            with patch(
+                'v03_pipeline.lib.misc.io.shutil.move',
+                side_effect=move,
+            ), self.assertRaises(OSError):
+                write_in_place(ht.annotate(x=ht.idx * 2), path)
+            # The existing table was set aside and then restored.
+            self.assertEqual(moves[0][0], path)
+            self.assertEqual(moves[2], (moves[0][1], path))
+            self.assertEqual(hl.read_table(path).count(), 100)
+
+    def test_write_in_place_gcs(self) -> None:
+        ht = hl.utils.range_table(10)
+        with patch('v03_pipeline.lib.misc.io.write') as mock_write, patch(
+            'v03_pipeline.lib.misc.io.replace_directory',
+        ) as mock_replace_directory:
+            write_in_place(ht, 'gs://bucket/test.ht')
+            mock_write.assert_called_once_with(ht, 'gs://bucket/test.ht')
+            mock_replace_directory.assert_not_called()
+
+    def test_file_size_bytes_nested_directories(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for i in range(3):
+                os.makedirs(os.path.join(temp_dir, f'a{i}', 'b', 'c'))
+                for d in ['', 'b', os.path.join('b', 'c')]:
+                    with open(os.path.join(temp_dir, f'a{i}', d, 'f'), 'w') as f:
+                        f.write('x' * 10)
+            self.assertEqual(file_size_bytes(temp_dir), 90)
+            self.assertEqual(file_size_bytes(os.path.join(temp_dir, 'a0', 'f')), 10)
+
+    def test_read_remap(self) -> None:
+        self.assertEqual(
+            read_remap(TEST_REMAP),
+            import_remap(TEST_REMAP).collect(),
+        )
+
+    def test_load_remap(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            remap_path = os.path.join(temp_dir, 'remap.tsv')
+            with open(remap_path, 'w') as f:
+                f.write('s\tseqr_id\nabc\tabc_1\n')
+            with patch('v03_pipeline.lib.misc.io.read_remap') as mock_read_remap:
+                mock_read_remap.side_effect = read_remap
+                self.assertEqual(
+                    load_remap(remap_path),
+                    [hl.Struct(s='abc', seqr_id='abc_1')],
+                )
+                self.assertEqual(
+                    load_remap(remap_path),
+                    [hl.Struct(s='abc', seqr_id='abc_1')],
+                )
+                self.assertEqual(mock_read_remap.call_count, 1)
+
+                # An edited remap is parsed again.
+                with open(remap_path, 'w') as f:
+                    f.write('s\tseqr_id\nabc\tabc_2\n')
+                self.assertEqual(
+                    load_remap(remap_path),
+                    [hl.Struct(s='abc', seqr_id='abc_2')],
+                )
+                self.assertEqual(mock_read_remap.call_count, 2)
@@ -1,9 +1,12 @@
-import itertools
+import functools
+from collections import defaultdict
+from collections.abc import Iterable
 from dataclasses import dataclass, field
 from enum import Enum
 
 import hail as hl
 
+from v03_pipeline.lib.misc.io import file_content_hash, read_pedigree
 from v03_pipeline.lib.model import Ploidy
 
 
@@ -90,6 +93,62 @@ class Family:
                 samples[row.s].paternal_grandfather = samples[paternal_s].father
         return samples
 
+    @staticmethod
+    def index_descendants(
+        samples: dict[str, Sample],
+    ) -> tuple[dict[str, list[str]], dict[tuple[str, str], list[str]]]:
+        # Children are indexed by each of their parents and grandchildren by
+        # each identified pair of grandparents.
+        children = defaultdict(list)
+        grandchildren = defaultdict(list)
+        for sample in samples.values():
+            for parent in (sample.mother, sample.father):
+                if parent:
+                    children[parent].append(sample.sample_id)
+            for grandparents in (
+                (sample.maternal_grandmother, sample.maternal_grandfather),
+                (sample.paternal_grandmother, sample.paternal_grandfather),
+            ):
+                if all(grandparents):
+                    grandchildren[grandparents].append(sample.sample_id)
+        return children, grandchildren
+
+    @staticmethod
+    def collateral_relation(sample_i: Sample, sample_j: Sample) -> Relation | None:
+        # If other sample is already related, they are not collaterally related
+        if sample_j.sample_id in {
+            sample_i.mother,
+            sample_i.father,
+            sample_i.maternal_grandmother,
+            sample_i.maternal_grandfather,
+            sample_i.paternal_grandmother,
+            sample_i.paternal_grandfather,
+        }:
+            return None
+
+        # If both parents are identified and the same, samples are siblings.
+        if (
+            sample_i.mother
+            and sample_i.father
+            and (sample_i.mother == sample_j.mother)
+            and (sample_i.father == sample_j.father)
+        ):
+            return Relation.SIBLING
+
+        # If only a single parent is identified and the same, samples are half siblings
+        if (sample_i.mother and sample_i.mother == sample_j.mother) or (
+            sample_i.father and sample_i.father == sample_j.father
+        ):
+            return Relation.HALF_SIBLING
+
+        # If either set of one's grandparents is identified and equal to the other's parents,
+        # they're aunt/uncle related
+        # NB: because we will only check an  i, j pair of samples a single time,
+        # we need to check both grandparents_i == parents_j and parents_i == grandparents_j.
+        if sample_i.is_aunt_nephew(sample_j) or sample_j.is_aunt_nephew(sample_i):
+            return Relation.AUNT_NEPHEW
+        return None
+
     @staticmethod
     def parse_collateral_lineage(
         samples: dict[str, Sample],
@@ -98,56 +157,38 @@ class Family:
         # A sample_i that is siblings with sample_j, will list sample_j as as sibling, but
         # sample_j will not list sample_i as a sibling.  Relationships only appear in the
         # ibd table a single time, so we only need to check the pairing once.
-        for sample_i, sample_j in itertools.combinations(samples.keys(), 2):
-            # If other sample is already related, continue
-            if sample_j in {
-                samples[sample_i].mother,
-                samples[sample_i].father,
-                samples[sample_i].maternal_grandmother,
-                samples[sample_i].maternal_grandfather,
-                samples[sample_i].paternal_grandmother,
-                samples[sample_i].paternal_grandfather,
-            }:
-                continue
-
-            # If both parents are identified and the same, samples are siblings.
-            if (
-                samples[sample_i].mother
-                and samples[sample_i].father
-                and (samples[sample_i].mother == samples[sample_j].mother)
-                and (samples[sample_i].father == samples[sample_j].father)
-            ):
-                samples[sample_i].siblings.append(
-                    sample_j,
-                )
-                continue
-
-            # If only a single parent is identified and the same, samples are half siblings
-            if (
-                samples[sample_i].mother
-                and samples[sample_i].mother == samples[sample_j].mother
-            ) or (
-                samples[sample_i].father
-                and samples[sample_i].father == samples[sample_j].father
-            ):
-                samples[sample_i].half_siblings.append(
-                    sample_j,
+        #
+        # Rather than comparing every pair of samples, each sample is only compared
+        # with the samples sharing a parent with it or with one of its grandparents,
+        # and with the grandchildren of its parents, which covers every pair that
+        # can be collaterally related.
+        order = {sample_id: i for i, sample_id in enumerate(samples)}
+        children, grandchildren = Family.index_descendants(samples)
+        for sample_i in samples.values():
+            candidates = {
+                sample_j
+                for relative in (
+                    sample_i.mother,
+                    sample_i.father,
+                    sample_i.maternal_grandmother,
+                    sample_i.paternal_grandmother,
                 )
-                continue
-
-            # If either set of one's grandparents is identified and equal to the other's parents,
-            # they're aunt/uncle related
-            # NB: because we will only check an  i, j pair of samples a single time, (itertools.combinations)
-            # we need to check both grandparents_i == parents_j and parents_i == grandparents_j.
-            # fmt: off
-            if (
-                samples[sample_i].is_aunt_nephew(samples[sample_j])
-                or samples[sample_j].is_aunt_nephew(samples[sample_i])
-            ):
-                samples[sample_i].aunt_nephews.append(
-                    sample_j,
-                )
-            # fmt: on
+                if relative
+                for sample_j in children[relative]
+            }
+            if sample_i.mother and sample_i.father:
+                candidates.update(grandchildren[(sample_i.mother, sample_i.father)])
+            relatives = {
+                Relation.SIBLING: sample_i.siblings,
+                Relation.HALF_SIBLING: sample_i.half_siblings,
+                Relation.AUNT_NEPHEW: sample_i.aunt_nephews,
+            }
+            for sample_j in sorted(candidates, key=order.get):
+                if order[sample_j] <= order[sample_i.sample_id]:
+                    continue
+                relation = Family.collateral_relation(sample_i, samples[sample_j])
+                if relation:
+                    relatives[relation].append(sample_j)
         return samples
 
     @classmethod
@@ -160,13 +201,37 @@ class Family:
         )
 
 
+def parse_pedigree_to_families(
+    rows: Iterable[hl.Struct],
+) -> set[Family]:
+    # Rows are grouped by family whatever their order in the pedigree.
+    family_rows = defaultdict(list)
+    for row in rows:
+        family_rows[row.family_guid].append(row)
+    return {
+        Family.parse(family_guid, members)
+        for family_guid, members in family_rows.items()
+    }
+
+
 def parse_pedigree_ht_to_families(
     pedigree_ht: hl.Table,
 ) -> set[Family]:
-    families = set()
-    for family_guid, rows in itertools.groupby(
-        pedigree_ht.collect(),
-        lambda x: x.family_guid,
-    ):
-        families.add(Family.parse(family_guid, list(rows)))
-    return families
+    return parse_pedigree_to_families(pedigree_ht.collect())
+
+
+@functools.cache
+def _cached_pedigree_families(
+    pedigree_path: str,
+    _content_hash: str,
+) -> frozenset[Family]:
+    return frozenset(parse_pedigree_to_families(read_pedigree(pedigree_path)))
+
+
+def load_pedigree_families(pedigree_path: str) -> set[Family]:
+    # Every project and family task of a load parses the same pedigree, so
+    # the parsed families are shared by the tasks running in this process.
+    # NB: the families themselves are shared and must not be modified.
+    return set(
+        _cached_pedigree_families(pedigree_path, file_content_hash(pedigree_path)),
+    )
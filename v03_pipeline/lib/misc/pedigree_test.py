@@ -2,8 +2,14 @@ import unittest
 
 import hail as hl
 
-from v03_pipeline.lib.misc.io import import_pedigree
-from v03_pipeline.lib.misc.pedigree import Family, Sample, parse_pedigree_ht_to_families
+from v03_pipeline.lib.misc.io import import_pedigree, read_pedigree
+from v03_pipeline.lib.misc.pedigree import (
+    Family,
+    Sample,
+    load_pedigree_families,
+    parse_pedigree_ht_to_families,
+    parse_pedigree_to_families,
+)
 from v03_pipeline.lib.model import Ploidy
 
 TEST_PEDIGREE_1 = 'v03_pipeline/var/test/pedigrees/test_pedigree_1.tsv'
@@ -14,6 +20,62 @@ class PedigreesTest(unittest.TestCase):
     def test_empty_pedigree(self) -> None:
         with self.assertRaises(ValueError):
             _ = import_pedigree(TEST_PEDIGREE_1)
+        with self.assertRaises(ValueError):
+            _ = read_pedigree(TEST_PEDIGREE_1)
+
+    def test_read_pedigree(self) -> None:
+        self.assertEqual(
+            read_pedigree(TEST_PEDIGREE_2),
+            import_pedigree(TEST_PEDIGREE_2).collect(),
+        )
+        self.assertEqual(
+            parse_pedigree_to_families(read_pedigree(TEST_PEDIGREE_2)),
+            parse_pedigree_ht_to_families(import_pedigree(TEST_PEDIGREE_2)),
+        )
+
+    def test_load_pedigree_families(self) -> None:
+        families = load_pedigree_families(TEST_PEDIGREE_2)
+        self.assertEqual(
+            families,
+            parse_pedigree_ht_to_families(import_pedigree(TEST_PEDIGREE_2)),
+        )
+        # Parsed families are shared, but each caller gets its own set.
+        families.clear()
+        self.assertEqual(
+            load_pedigree_families(TEST_PEDIGREE_2),
+            parse_pedigree_ht_to_families(import_pedigree(TEST_PEDIGREE_2)),
+        )
+
+    def test_parse_pedigree_to_families_unsorted(self) -> None:
+        families = parse_pedigree_to_families(
+            [
+                hl.Struct(
+                    family_guid='fam_1',
+                    s='sample_1',
+                    maternal_s=None,
+                    paternal_s=None,
+                    sex='F',
+                ),
+                hl.Struct(
+                    family_guid='fam_2',
+                    s='sample_2',
+                    maternal_s=None,
+                    paternal_s=None,
+                    sex='M',
+                ),
+                hl.Struct(
+                    family_guid='fam_1',
+                    s='sample_3',
+                    maternal_s='sample_1',
+                    paternal_s=None,
+                    sex='M',
+                ),
+            ],
+        )
+        self.assertCountEqual(
+            [(f.family_guid, list(f.samples)) for f in families],
+            [('fam_1', ['sample_1', 'sample_3']), ('fam_2', ['sample_2'])],
+        )
 
     def test_parse_lineage(self) -> None:
         #
@@ -27,17 +27,63 @@ def deglobalize_sample_ids(ht: hl.Table) -> hl.Table:
     return ht.drop('sample_ids')
 
 
+def _remaining_sample_indices(
+    ht: hl.Table,
+    sample_subset_ht: hl.Table,
+) -> tuple[list[str], list[int]]:
+    sample_ids = sample_subset_ht.aggregate(hl.agg.collect_as_set(sample_subset_ht.s))
+    ht_sample_ids = hl.eval(ht.sample_ids)
+    return ht_sample_ids, [
+        i for i, sample_id in enumerate(ht_sample_ids) if sample_id not in sample_ids
+    ]
+
+
 def filter_callset_entries(
     ht: hl.Table,
     sample_subset_ht: hl.Table,
 ) -> hl.Table:
-    # Removes sample id calls that have been re-called.
-    sample_ids = sample_subset_ht.aggregate(hl.agg.collect_as_set(sample_subset_ht.s))
-    ht = deglobalize_sample_ids(ht)
+    # Removes sample id calls that have been re-called.  The positions of the
+    # remaining samples are computed once from the globals and each row's
+    # entries are then selected by position.
+    ht_sample_ids, sample_indices = _remaining_sample_indices(ht, sample_subset_ht)
     ht = ht.annotate(
-        entries=(ht.entries.filter(lambda e: ~hl.set(sample_ids).contains(e.s))),
+        entries=hl.literal(sample_indices, hl.tarray(hl.tint32)).map(
+            lambda i: ht.entries[i],
+        ),
+    )
+    return ht.annotate_globals(
+        sample_ids=hl.literal(
+            [ht_sample_ids[i] for i in sample_indices],
+            hl.tarray(hl.tstr),
+        ),
+    )
+
+
+def filter_callset_sparse_entries(
+    ht: hl.Table,
+    sample_subset_ht: hl.Table,
+) -> hl.Table:
+    # Sparse counterpart of filter_callset_entries: entries of re-called
+    # samples are dropped and the remaining sample indices are shifted down.
+    ht_sample_ids, sample_indices = _remaining_sample_indices(ht, sample_subset_ht)
+    new_sample_indices = {i: new_i for new_i, i in enumerate(sample_indices)}
+    new_sample_indices = hl.literal(
+        [new_sample_indices.get(i) for i in range(len(ht_sample_ids))],
+        hl.tarray(hl.tint32),
+    )
+    ht = ht.annotate(
+        entries=ht.entries.filter(
+            lambda e: hl.is_defined(new_sample_indices[e.sample_index]),
+        ).map(
+            lambda e: e.annotate(sample_index=new_sample_indices[e.sample_index]),
+        ),
+    )
+    return ht.annotate_globals(
+        sample_ids=hl.literal(
+            [ht_sample_ids[i] for i in sample_indices],
+            hl.tarray(hl.tstr),
+        ),
     )
-    return globalize_sample_ids(ht)
 
 
 def join_entries_hts(ht: hl.Table, callset_ht: hl.Table) -> hl.Table:
@@ -61,3 +107,50 @@ def join_entries_hts(ht: hl.Table, callset_ht: hl.Table) -> hl.Table:
         ),
     )
     return ht.transmute_globals(sample_ids=ht.sample_ids.extend(ht.sample_ids_1))
+
+
+def join_sparse_entries_hts(ht: hl.Table, callset_ht: hl.Table) -> hl.Table:
+    # Unlike join_entries_hts, neither side is padded: samples absent from
+    # a row have no entry, the callset sample indices are offset past the
+    # existing samples and the calls appended.
+    ht = ht.join(callset_ht, 'outer')
+    empty_entries = hl.empty_array(ht.entries_1.dtype.element_type)
+    n_samples = hl.len(ht.sample_ids)
+    ht = ht.select(
+        filters=hl.or_else(ht.filters_1, ht.filters),
+        entries=hl.or_else(ht.entries, empty_entries).extend(
+            hl.or_else(ht.entries_1, empty_entries).map(
+                lambda e: e.annotate(sample_index=e.sample_index + n_samples),
+            ),
+        ),
+    )
+    return ht.transmute_globals(sample_ids=ht.sample_ids.extend(ht.sample_ids_1))
+
+
+def has_sparse_entries(ht: hl.Table) -> bool:
+    return 'sample_index' in ht.entries.dtype.element_type
+
+
+def sparsify_entries(ht: hl.Table) -> hl.Table:
+    # Samples without an entry in a row, those of the callsets that did not
+    # call the variant, are dropped.  Every other entry, reference calls
+    # included, is kept whole and tagged with the position of its sample in
+    # the sample_ids global.
+    return ht.annotate(
+        entries=hl.enumerate(ht.entries)
+        .filter(lambda ie: hl.is_defined(ie[1]))
+        .map(lambda ie: hl.struct(sample_index=ie[0], **ie[1])),
+    )
+
+
+def densify_entries(ht: hl.Table) -> hl.Table:
+    # Samples without an entry are restored as missing, as they are padded
+    # by join_entries_hts.
+    return ht.annotate(
+        entries=hl.rbind(
+            hl.dict(
+                ht.entries.map(lambda e: (e.sample_index, e.drop('sample_index'))),
+            ),
+            lambda entries: hl.range(hl.len(ht.sample_ids)).map(entries.get),
+        ),
+    )
@@ -4,9 +4,13 @@ import hail as hl
 
 from v03_pipeline.lib.misc.sample_entries import (
     deglobalize_sample_ids,
+    densify_entries,
     filter_callset_entries,
+    filter_callset_sparse_entries,
     globalize_sample_ids,
     join_entries_hts,
+    join_sparse_entries_hts,
+    sparsify_entries,
 )
 
 
@@ -326,3 +330,179 @@ class SampleEntriesTest(unittest.TestCase):
                 ),
             ],
         )
+
+    def test_filter_callset_entries_empty_table(self) -> None:
+        entries_ht = hl.Table.parallelize(
+            [],
+            hl.tstruct(
+                id=hl.tint32,
+                filters=hl.tset(hl.tstr),
+                entries=hl.tarray(hl.tstruct(a=hl.tint32)),
+            ),
+            key='id',
+            globals=hl.Struct(sample_ids=['a', 'c', 'e', 'f']),
+        )
+        sample_subset_ht = hl.Table.parallelize(
+            [{'s': 'a'}, {'s': 'f'}],
+            hl.tstruct(
+                s=hl.dtype('str'),
+            ),
+            key='s',
+        )
+        ht = filter_callset_entries(entries_ht, sample_subset_ht)
+        self.assertCountEqual(
+            ht.globals.collect(),
+            [hl.Struct(sample_ids=['c', 'e'])],
+        )
+        self.assertEqual(ht.count(), 0)
+
+    def test_sparsify_and_densify_entries(self) -> None:
+        entries_ht = hl.Table.parallelize(
+            [
+                {
+                    'id': 0,
+                    'entries': [
+                        hl.Struct(GT=hl.Call([0, 0]), GQ=40),
+                        hl.Struct(GT=hl.Call([0, 1]), GQ=20),
+                        None,
+                        hl.Struct(GT=hl.Call([1, 1]), GQ=30),
+                    ],
+                },
+                {
+                    'id': 1,
+                    'entries': [
+                        None,
+                        None,
+                        hl.Struct(GT=None, GQ=5),
+                        hl.Struct(GT=hl.Call([0, 0]), GQ=None),
+                    ],
+                },
+            ],
+            hl.tstruct(
+                id=hl.tint32,
+                entries=hl.tarray(hl.tstruct(GT=hl.tcall, GQ=hl.tint32)),
+            ),
+            key='id',
+            globals=hl.Struct(sample_ids=['a', 'c', 'e', 'f']),
+        )
+        ht = sparsify_entries(entries_ht)
+        self.assertCountEqual(
+            ht.entries.collect(),
+            [
+                [
+                    hl.Struct(sample_index=0, GT=hl.Call([0, 0]), GQ=40),
+                    hl.Struct(sample_index=1, GT=hl.Call([0, 1]), GQ=20),
+                    hl.Struct(sample_index=3, GT=hl.Call([1, 1]), GQ=30),
+                ],
+                [
+                    hl.Struct(sample_index=2, GT=None, GQ=5),
+                    hl.Struct(sample_index=3, GT=hl.Call([0, 0]), GQ=None),
+                ],
+            ],
+        )
+        # Reference calls, no-calls and missing entries are all restored.
+        ht = densify_entries(ht)
+        self.assertCountEqual(ht.collect(), entries_ht.collect())
+
+    def test_join_sparse_entries_hts(self) -> None:
+        entries_ht = hl.Table.parallelize(
+            [
+                {
+                    'id': 0,
+                    'filters': {'HIGH_SR_BACKGROUND'},
+                    'entries': [
+                        hl.Struct(sample_index=1, a=2),
+                        hl.Struct(sample_index=3, a=2),
+                    ],
+                },
+                {
+                    'id': 1,
+                    'filters': {'HIGH_SR_BACKGROUND'},
+                    'entries': [
+                        hl.Struct(sample_index=0, a=2),
+                    ],
+                },
+            ],
+            hl.tstruct(
+                id=hl.tint32,
+                filters=hl.tset(hl.tstr),
+                entries=hl.tarray(hl.tstruct(sample_index=hl.tint32, a=hl.tint32)),
+            ),
+            key='id',
+            globals=hl.Struct(sample_ids=['a', 'c', 'e', 'f']),
+        )
+        callset_ht = hl.Table.parallelize(
+            [
+                {
+                    'id': 0,
+                    'filters': {'PASS'},
+                    'entries': [
+                        hl.Struct(sample_index=1, a=10),
+                    ],
+                },
+                {
+                    'id': 2,
+                    'filters': {'HIGH_SR_BACKGROUND', 'PASS'},
+                    'entries': [
+                        hl.Struct(sample_index=0, a=11),
+                        hl.Struct(sample_index=1, a=12),
+                    ],
+                },
+            ],
+            hl.tstruct(
+                id=hl.tint32,
+                filters=hl.tset(hl.tstr),
+                entries=hl.tarray(hl.tstruct(sample_index=hl.tint32, a=hl.tint32)),
+            ),
+            key='id',
+            globals=hl.Struct(sample_ids=['b', 'g']),
+        )
+        sample_subset_ht = hl.Table.parallelize(
+            [{'s': 'a'}, {'s': 'e'}],
+            hl.tstruct(
+                s=hl.dtype('str'),
+            ),
+            key='s',
+        )
+        ht = filter_callset_sparse_entries(entries_ht, sample_subset_ht)
+        ht = join_sparse_entries_hts(ht, callset_ht)
+        self.assertCountEqual(
+            ht.globals.collect(),
+            [hl.Struct(sample_ids=['c', 'f', 'b', 'g'])],
+        )
+        self.assertCountEqual(
+            ht.collect(),
+            [
+                hl.Struct(
+                    id=0,
+                    filters={'PASS'},
+                    entries=[
+                        hl.Struct(sample_index=0, a=2),
+                        hl.Struct(sample_index=1, a=2),
+                        hl.Struct(sample_index=3, a=10),
+                    ],
+                ),
+                hl.Struct(
+                    id=1,
+                    filters={'HIGH_SR_BACKGROUND'},
+                    entries=[],
+                ),
+                hl.Struct(
+                    id=2,
+                    filters={'PASS', 'HIGH_SR_BACKGROUND'},
+                    entries=[
+                        hl.Struct(sample_index=2, a=11),
+                        hl.Struct(sample_index=3, a=12),
+                    ],
+                ),
+            ],
+        )
+        # Samples absent from a row are densified as missing, not as calls.
+        self.assertCountEqual(
+            densify_entries(ht).entries.collect(),
+            [
+                [hl.Struct(a=2), hl.Struct(a=2), None, hl.Struct(a=10)],
+                [None, None, None, None],
+                [None, None, hl.Struct(a=11), hl.Struct(a=12)],
+            ],
+        )
@@ -16,36 +16,44 @@ def vcf_remap(mt: hl.MatrixTable) -> hl.MatrixTable:
 
 def remap_sample_ids(
     mt: hl.MatrixTable,
-    project_remap_ht: hl.Table,
+    project_remap: list[hl.Struct],
     ignore_missing_samples_when_remapping: bool,
 ) -> hl.MatrixTable:
     mt = vcf_remap(mt)
-    collected_remap = project_remap_ht.collect()
-    s_dups = [k for k, v in Counter([r.s for r in collected_remap]).items() if v > 1]
+    s_dups = [k for k, v in Counter([r.s for r in project_remap]).items() if v > 1]
     seqr_dups = [
-        k for k, v in Counter([r.seqr_id for r in collected_remap]).items() if v > 1
+        k for k, v in Counter([r.seqr_id for r in project_remap]).items() if v > 1
     ]
 
     if len(s_dups) > 0 or len(seqr_dups) > 0:
         msg = f'Duplicate s or seqr_id entries in remap file were found. Duplicate s:{s_dups}. Duplicate seqr_id:{seqr_dups}.'
         raise ValueError(msg)
 
-    missing_samples = project_remap_ht.anti_join(mt.cols()).collect()
-    remap_count = len(collected_remap)
+    callset_sample_ids = mt.s.collect()
+    callset_sample_id_set = set(callset_sample_ids)
+    missing_samples = sorted(
+        (r for r in project_remap if r.s not in callset_sample_id_set),
+        key=lambda r: r.s,
+    )
+    remap_count = len(project_remap)
 
     if len(missing_samples) != 0:
         message = (
-            f'Only {project_remap_ht.semi_join(mt.cols()).count()} out of {remap_count} '
+            f'Only {remap_count - len(missing_samples)} out of {remap_count} '
             'remap IDs matched IDs in the variant callset.\n'
             f"IDs that aren't in the callset: {missing_samples}\n"
-            f'All callset sample IDs:{mt.s.collect()}'
+            f'All callset sample IDs:{callset_sample_ids}'
         )
         if ignore_missing_samples_when_remapping:
             print(message)
         else:
             raise MatrixTableSampleSetError(message, missing_samples)
 
-    mt = mt.annotate_cols(**project_remap_ht[mt.s])
+    remap_lookup = hl.literal(
+        {r.s: r.seqr_id for r in project_remap},
+        hl.tdict(hl.tstr, hl.tstr),
+    )
+    mt = mt.annotate_cols(seqr_id=remap_lookup.get(mt.s))
     remap_expr = hl.cond(hl.is_missing(mt.seqr_id), mt.s, mt.seqr_id)
     mt = mt.annotate_cols(seqr_id=remap_expr, vcf_id=mt.s)
     mt = mt.key_cols_by(s=mt.seqr_id)
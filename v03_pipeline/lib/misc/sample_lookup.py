@@ -1,6 +1,6 @@
 import hail as hl
 
-from v03_pipeline.lib.model import DatasetType
+from v03_pipeline.lib.model import DatasetType, ReferenceGenome
 
 
 def compute_callset_sample_lookup_ht(
@@ -15,6 +15,27 @@ def compute_callset_sample_lookup_ht(
     ).rows()
 
 
+def is_indexed_sample_lookup_ht(sample_lookup_ht: hl.Table) -> bool:
+    return 'sample_ids' in sample_lookup_ht.globals
+
+
+def _empty_samples(indexed: bool) -> hl.CollectionExpression:
+    return hl.empty_array(hl.tint32) if indexed else hl.empty_set(hl.tstr)
+
+
+def _union_samples(
+    samples: hl.CollectionExpression,
+    other_samples: hl.CollectionExpression,
+) -> hl.CollectionExpression:
+    # NB: indexed sample arrays are only ever unioned after the callset
+    # samples have been filtered out, so the arrays are disjoint.
+    if isinstance(samples.dtype, hl.tarray):
+        return hl.sorted(
+            samples.extend(hl.or_else(other_samples, hl.empty_array(hl.tint32))),
+        )
+    return samples.union(other_samples)
+
+
 def filter_callset_sample_ids(
     dataset_type: DatasetType,
     sample_lookup_ht: hl.Table,
@@ -24,7 +45,30 @@ def filter_callset_sample_ids(
     if hl.eval(~sample_lookup_ht.updates.project_guid.contains(project_guid)):
         return sample_lookup_ht
     sample_ids = sample_subset_ht.aggregate(hl.agg.collect_as_set(sample_subset_ht.s))
-    return sample_lookup_ht.select(
+    if is_indexed_sample_lookup_ht(sample_lookup_ht):
+        sample_indices = hl.literal(
+            {
+                i
+                for i, sample_id in enumerate(
+                    hl.eval(sample_lookup_ht.sample_ids[project_guid]),
+                )
+                if sample_id in sample_ids
+            },
+            hl.tset(hl.tint32),
+        )
+        return sample_lookup_ht.annotate(
+            **{
+                field: sample_lookup_ht[field].annotate(
+                    **{
+                        project_guid: sample_lookup_ht[field][project_guid].filter(
+                            lambda i: ~sample_indices.contains(i),
+                        ),
+                    },
+                )
+                for field in dataset_type.sample_lookup_table_fields_and_genotype_filter_fns
+            },
+        )
+    return sample_lookup_ht.annotate(
         **{
             field: sample_lookup_ht[field].annotate(
                 **{
@@ -38,33 +82,285 @@ def filter_callset_sample_ids(
     )
 
 
-def join_sample_lookup_hts(
+def union_callset_sample_lookup_hts(
+    dataset_type: DatasetType,
+    callset_sample_lookup_hts: dict[str, hl.Table],
+) -> hl.Table:
+    # Merges the per-project callset sample lookup tables in a single
+    # multi-way join, nesting each sample set under its project_guid.
+    project_guids = list(callset_sample_lookup_hts.keys())
+    ht = hl.Table.multi_way_zip_join(
+        [
+            callset_sample_lookup_ht.select_globals()
+            for callset_sample_lookup_ht in callset_sample_lookup_hts.values()
+        ],
+        'data',
+        'global_data',
+    )
+    ht = ht.select(
+        **{
+            field: hl.Struct(
+                **{
+                    project_guid: hl.or_else(
+                        ht.data[i][field],
+                        hl.empty_set(hl.tstr),
+                    )
+                    for i, project_guid in enumerate(project_guids)
+                },
+            )
+            for field in dataset_type.sample_lookup_table_fields_and_genotype_filter_fns
+        },
+    )
+    return ht.select_globals()
+
+
+def join_sample_lookup_hts_for_projects(
     dataset_type: DatasetType,
     sample_lookup_ht: hl.Table,
     callset_sample_lookup_ht: hl.Table,
-    project_guid: str,
 ) -> hl.Table:
-    sample_lookup_ht = sample_lookup_ht.join(callset_sample_lookup_ht, 'outer')
     first_field_name = next(
         iter(dataset_type.sample_lookup_table_fields_and_genotype_filter_fns.keys()),
     )
+    project_guids = callset_sample_lookup_ht[first_field_name].dtype.fields
+    other_fields = [
+        field
+        for field in sample_lookup_ht.row_value
+        if field not in dataset_type.sample_lookup_table_fields_and_genotype_filter_fns
+    ]
+    indexed = is_indexed_sample_lookup_ht(sample_lookup_ht)
+    sample_lookup_ht = sample_lookup_ht.join(callset_sample_lookup_ht, 'outer')
     empty_entry = hl.Struct(
         **{
-            project_guid: hl.empty_set(hl.tstr)
+            project_guid: _empty_samples(indexed)
             for project_guid in sample_lookup_ht[first_field_name].dtype.fields
         },
     )
     return sample_lookup_ht.select(
+        *other_fields,
         **{
             field: hl.or_else(sample_lookup_ht[field], empty_entry).annotate(
                 **{
-                    project_guid: (
-                        sample_lookup_ht[field]
-                        .get(project_guid, hl.empty_set(hl.tstr))
-                        .union(sample_lookup_ht[f'{field}_1'])
+                    project_guid: _union_samples(
+                        sample_lookup_ht[field].get(
+                            project_guid,
+                            _empty_samples(indexed),
+                        ),
+                        sample_lookup_ht[f'{field}_1'][project_guid],
+                    )
+                    for project_guid in project_guids
+                },
+            )
+            for field in dataset_type.sample_lookup_table_fields_and_genotype_filter_fns
+        },
+    )
+
+
+def sample_lookup_sizes(
+    dataset_type: DatasetType,
+    sample_lookup_ht: hl.Table,
+    project_guids: list[str],
+) -> hl.StructExpression:
+    return hl.Struct(
+        **{
+            field: sum(
+                hl.len(sample_lookup_ht[field][project_guid])
+                for project_guid in project_guids
+            )
+            for field in dataset_type.sample_lookup_table_fields_and_genotype_filter_fns
+        },
+    )
+
+
+def compute_sample_lookup_delta_ht(
+    dataset_type: DatasetType,
+    sample_lookup_ht: hl.Table,
+    callset_sample_lookup_ht: hl.Table,
+    sample_subset_hts: dict[str, hl.Table],
+) -> hl.Table:
+    # The per-variant change in the number of samples in each sample lookup
+    # field, counting only the projects being updated.  Annotations derived
+    # from the sample lookup table are linear in these counts.
+    project_guids = list(sample_subset_hts.keys())
+    first_field_name = next(
+        iter(dataset_type.sample_lookup_table_fields_and_genotype_filter_fns.keys()),
+    )
+    existing_project_guids = [
+        project_guid
+        for project_guid in project_guids
+        if project_guid in sample_lookup_ht[first_field_name].dtype.fields
+    ]
+    if existing_project_guids:
+        ht = sample_lookup_ht.select(
+            **{
+                field: sample_lookup_ht[field].select(*existing_project_guids)
+                for field in dataset_type.sample_lookup_table_fields_and_genotype_filter_fns
+            },
+        )
+        ht = ht.annotate(
+            previous_sizes=sample_lookup_sizes(
+                dataset_type,
+                ht,
+                existing_project_guids,
+            ),
+        )
+        for project_guid, sample_subset_ht in sample_subset_hts.items():
+            ht = filter_callset_sample_ids(
+                dataset_type,
+                ht,
+                sample_subset_ht,
+                project_guid,
+            )
+        ht = join_sample_lookup_hts_for_projects(
+            dataset_type,
+            ht,
+            callset_sample_lookup_ht,
+        )
+    else:
+        # NB: new projects have no samples outside of the callset rows,
+        # so the sample lookup table does not need to be scanned.
+        ht = callset_sample_lookup_ht.annotate(
+            previous_sizes=hl.missing(
+                hl.tstruct(
+                    **{
+                        field: hl.tint32
+                        for field in dataset_type.sample_lookup_table_fields_and_genotype_filter_fns
+                    },
+                ),
+            ),
+        )
+    sizes = sample_lookup_sizes(dataset_type, ht, project_guids)
+    ht = ht.select(
+        **{
+            field: sizes[field] - hl.or_else(ht.previous_sizes[field], 0)
+            for field in dataset_type.sample_lookup_table_fields_and_genotype_filter_fns
+        },
+    )
+    ht = ht.filter(hl.any([ht[field] != 0 for field in ht.row_value]))
+    return ht.select_globals(
+        previous_updates=hl.literal(
+            hl.eval(sample_lookup_ht.updates),
+            sample_lookup_ht.updates.dtype,
+        ),
+    )
+
+
+def index_sample_lookup_ht(
+    dataset_type: DatasetType,
+    sample_lookup_ht: hl.Table,
+    sample_ids: dict[str, list[str]],
+) -> hl.Table:
+    # Replaces the per-row sample id sets with sorted int32 positions into
+    # a per-project global sample_ids array.  Sample ids are only ever
+    # appended to these arrays, so an indexed table stays indexed across
+    # updates and only the callset rows are ever converted.
+    first_field_name = next(
+        iter(dataset_type.sample_lookup_table_fields_and_genotype_filter_fns.keys()),
+    )
+    project_guids = sample_lookup_ht[first_field_name].dtype.fields
+    sample_lookup_ht = sample_lookup_ht.annotate_globals(
+        sample_ids=hl.Struct(
+            **{
+                project_guid: hl.array(project_sample_ids)
+                if project_sample_ids
+                else hl.empty_array(hl.tstr)
+                for project_guid, project_sample_ids in sample_ids.items()
+            },
+        ),
+    )
+    sample_lookup_ht = sample_lookup_ht.annotate_globals(
+        sample_indices=hl.Struct(
+            **{
+                project_guid: hl.dict(
+                    hl.enumerate(
+                        sample_lookup_ht.sample_ids[project_guid],
+                        index_first=False,
                     ),
+                )
+                for project_guid in project_guids
+            },
+        ),
+    )
+    sample_lookup_ht = sample_lookup_ht.select(
+        **{
+            field: sample_lookup_ht[field].annotate(
+                **{
+                    project_guid: hl.sorted(
+                        hl.array(sample_lookup_ht[field][project_guid]).map(
+                            lambda s, project_guid=project_guid: (
+                                sample_lookup_ht.sample_indices[project_guid][s]
+                            ),
+                        ),
+                    )
+                    for project_guid in project_guids
                 },
             )
             for field in dataset_type.sample_lookup_table_fields_and_genotype_filter_fns
         },
     )
+    return sample_lookup_ht.drop('sample_indices')
+
+
+def initialize_sample_lookup_ht(
+    reference_genome: ReferenceGenome,
+    dataset_type: DatasetType,
+    indexed: bool,
+) -> hl.Table:
+    key_type = dataset_type.table_key_type(reference_genome)
+    ht = hl.Table.parallelize(
+        [],
+        hl.tstruct(
+            **key_type,
+            **{
+                field: hl.tstruct()
+                for field in dataset_type.sample_lookup_table_fields_and_genotype_filter_fns
+            },
+        ),
+        key=key_type.fields,
+        globals=hl.Struct(
+            updates=hl.empty_set(hl.tstruct(callset=hl.tstr, project_guid=hl.tstr)),
+        ),
+    )
+    if indexed:
+        ht = ht.annotate_globals(sample_ids=hl.Struct())
+    return ht
+
+
+def compute_callset_sample_lookup_ht_for_projects(
+    dataset_type: DatasetType,
+    sample_lookup_ht: hl.Table,
+    callset_mts: dict[str, hl.MatrixTable],
+) -> tuple[hl.Table, dict[str, hl.Table]]:
+    # The per-project callset lookups merged into one table, in the layout
+    # of the sample lookup table, along with the samples of each project.
+    # In the sample index layout, new sample ids are appended to each
+    # project's sample_ids and only the callset rows are indexed.
+    sample_ids = None
+    if is_indexed_sample_lookup_ht(sample_lookup_ht):
+        sample_ids = {
+            k: list(v) for k, v in hl.eval(sample_lookup_ht.sample_ids).items()
+        }
+    sample_subset_hts = {}
+    callset_sample_lookup_hts = {}
+    for project_guid, callset_mt in callset_mts.items():
+        if sample_ids is not None:
+            project_sample_ids = sample_ids.setdefault(project_guid, [])
+            project_sample_ids.extend(
+                sorted(set(callset_mt.s.collect()) - set(project_sample_ids)),
+            )
+        sample_subset_hts[project_guid] = callset_mt.cols()
+        callset_sample_lookup_hts[project_guid] = compute_callset_sample_lookup_ht(
+            dataset_type,
+            callset_mt,
+        )
+    callset_sample_lookup_ht = union_callset_sample_lookup_hts(
+        dataset_type,
+        callset_sample_lookup_hts,
+    )
+    if sample_ids is not None:
+        callset_sample_lookup_ht = index_sample_lookup_ht(
+            dataset_type,
+            callset_sample_lookup_ht,
+            sample_ids,
+        )
+    return callset_sample_lookup_ht, sample_subset_hts
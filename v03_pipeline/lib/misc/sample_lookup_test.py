@@ -4,8 +4,11 @@ import hail as hl
 
 from v03_pipeline.lib.misc.sample_lookup import (
     compute_callset_sample_lookup_ht,
+    compute_sample_lookup_delta_ht,
     filter_callset_sample_ids,
-    join_sample_lookup_hts,
+    index_sample_lookup_ht,
+    join_sample_lookup_hts_for_projects,
+    union_callset_sample_lookup_hts,
 )
 from v03_pipeline.lib.model import DatasetType
 
@@ -138,345 +141,308 @@ class SampleLookupTest(unittest.TestCase):
             ],
         )
 
-    def test_join_sample_lookup_hts(self) -> None:
+    def test_join_sample_lookup_hts_for_projects(self) -> None:
         sample_lookup_ht = hl.Table.parallelize(
-            [],
-            hl.tstruct(
-                id=hl.tint32,
-                ref_samples=hl.tstruct(),
-                het_samples=hl.tstruct(),
-                hom_samples=hl.tstruct(),
-            ),
-            key='id',
-        )
-        callset_sample_lookup_ht = hl.Table.parallelize(
             [
                 {
                     'id': 0,
-                    'ref_samples': {'a'},
-                    'het_samples': {'b', 'c'},
-                    'hom_samples': set(),
+                    'ref_samples': hl.Struct(project_1={'a'}),
+                    'het_samples': hl.Struct(project_1={'b'}),
+                    'hom_samples': hl.Struct(project_1=set()),
                 },
                 {
                     'id': 1,
-                    'ref_samples': set(),
-                    'het_samples': set(),
-                    'hom_samples': {'a', 'b', 'c'},
+                    'ref_samples': hl.Struct(project_1=set()),
+                    'het_samples': hl.Struct(project_1=set()),
+                    'hom_samples': hl.Struct(project_1={'a', 'b'}),
                 },
             ],
             hl.tstruct(
                 id=hl.tint32,
-                ref_samples=hl.tset(hl.tstr),
-                het_samples=hl.tset(hl.tstr),
-                hom_samples=hl.tset(hl.tstr),
+                ref_samples=hl.tstruct(project_1=hl.tset(hl.tstr)),
+                het_samples=hl.tstruct(project_1=hl.tset(hl.tstr)),
+                hom_samples=hl.tstruct(project_1=hl.tset(hl.tstr)),
             ),
             key='id',
         )
-        sample_lookup_ht = join_sample_lookup_hts(
+        callset_sample_lookup_ht_type = hl.tstruct(
+            id=hl.tint32,
+            ref_samples=hl.tset(hl.tstr),
+            het_samples=hl.tset(hl.tstr),
+            hom_samples=hl.tset(hl.tstr),
+        )
+        callset_sample_lookup_hts = {
+            'project_1': hl.Table.parallelize(
+                [
+                    {
+                        'id': 0,
+                        'ref_samples': set(),
+                        'het_samples': {'c'},
+                        'hom_samples': set(),
+                    },
+                ],
+                callset_sample_lookup_ht_type,
+                key='id',
+            ),
+            'project_2': hl.Table.parallelize(
+                [
+                    {
+                        'id': 0,
+                        'ref_samples': {'d'},
+                        'het_samples': set(),
+                        'hom_samples': set(),
+                    },
+                    {
+                        'id': 2,
+                        'ref_samples': set(),
+                        'het_samples': {'d'},
+                        'hom_samples': {'e'},
+                    },
+                ],
+                callset_sample_lookup_ht_type,
+                key='id',
+            ),
+        }
+        sample_lookup_ht = join_sample_lookup_hts_for_projects(
             DatasetType.SNV_INDEL,
             sample_lookup_ht,
-            callset_sample_lookup_ht,
-            'project_1',
+            union_callset_sample_lookup_hts(
+                DatasetType.SNV_INDEL,
+                callset_sample_lookup_hts,
+            ),
         )
         self.assertCountEqual(
             sample_lookup_ht.collect(),
             [
                 hl.Struct(
                     id=0,
-                    ref_samples=hl.Struct(project_1={'a'}),
-                    het_samples=hl.Struct(project_1={'b', 'c'}),
-                    hom_samples=hl.Struct(project_1=set()),
+                    ref_samples=hl.Struct(project_1={'a'}, project_2={'d'}),
+                    het_samples=hl.Struct(project_1={'b', 'c'}, project_2=set()),
+                    hom_samples=hl.Struct(project_1=set(), project_2=set()),
                 ),
                 hl.Struct(
                     id=1,
-                    ref_samples=hl.Struct(project_1=set()),
-                    het_samples=hl.Struct(project_1=set()),
-                    hom_samples=hl.Struct(project_1={'a', 'b', 'c'}),
+                    ref_samples=hl.Struct(project_1=set(), project_2=set()),
+                    het_samples=hl.Struct(project_1=set(), project_2=set()),
+                    hom_samples=hl.Struct(project_1={'a', 'b'}, project_2=set()),
+                ),
+                hl.Struct(
+                    id=2,
+                    ref_samples=hl.Struct(project_1=set(), project_2=set()),
+                    het_samples=hl.Struct(project_1=set(), project_2={'d'}),
+                    hom_samples=hl.Struct(project_1=set(), project_2={'e'}),
                 ),
             ],
         )
-        callset_sample_lookup_ht = hl.Table.parallelize(
+
+    def test_index_sample_lookup_ht(self) -> None:
+        sample_lookup_ht = hl.Table.parallelize(
             [
                 {
                     'id': 0,
-                    'ref_samples': {'a'},
-                    'het_samples': {'b'},
-                    'hom_samples': set(),
+                    'ref_samples': hl.Struct(project_1={'a'}, project_2=set()),
+                    'het_samples': hl.Struct(project_1={'b', 'c'}, project_2={'d'}),
+                    'hom_samples': hl.Struct(project_1=set(), project_2=set()),
                 },
                 {
-                    'id': 2,
-                    'ref_samples': set(),
-                    'het_samples': {'a'},
-                    'hom_samples': {'b'},
+                    'id': 1,
+                    'ref_samples': hl.Struct(project_1=set(), project_2={'d'}),
+                    'het_samples': hl.Struct(project_1=set(), project_2=set()),
+                    'hom_samples': hl.Struct(project_1={'a', 'c'}, project_2=set()),
                 },
             ],
             hl.tstruct(
                 id=hl.tint32,
-                ref_samples=hl.tset(hl.tstr),
-                het_samples=hl.tset(hl.tstr),
-                hom_samples=hl.tset(hl.tstr),
+                ref_samples=hl.tstruct(
+                    project_1=hl.tset(hl.tstr),
+                    project_2=hl.tset(hl.tstr),
+                ),
+                het_samples=hl.tstruct(
+                    project_1=hl.tset(hl.tstr),
+                    project_2=hl.tset(hl.tstr),
+                ),
+                hom_samples=hl.tstruct(
+                    project_1=hl.tset(hl.tstr),
+                    project_2=hl.tset(hl.tstr),
+                ),
             ),
             key='id',
         )
-        sample_lookup_ht = join_sample_lookup_hts(
+        indexed_sample_lookup_ht = index_sample_lookup_ht(
             DatasetType.SNV_INDEL,
             sample_lookup_ht,
-            callset_sample_lookup_ht,
-            'project_2',
+            {'project_1': ['a', 'b', 'c'], 'project_2': ['d', 'e']},
+        )
+        self.assertEqual(
+            hl.eval(indexed_sample_lookup_ht.sample_ids),
+            hl.Struct(project_1=['a', 'b', 'c'], project_2=['d', 'e']),
         )
         self.assertCountEqual(
-            sample_lookup_ht.collect(),
+            indexed_sample_lookup_ht.collect(),
             [
                 hl.Struct(
                     id=0,
-                    ref_samples=hl.Struct(
-                        project_1={'a'},
-                        project_2={'a'},
-                    ),
-                    het_samples=hl.Struct(
-                        project_1={'b', 'c'},
-                        project_2={'b'},
-                    ),
-                    hom_samples=hl.Struct(
-                        project_1=set(),
-                        project_2=set(),
-                    ),
+                    ref_samples=hl.Struct(project_1=[0], project_2=[]),
+                    het_samples=hl.Struct(project_1=[1, 2], project_2=[0]),
+                    hom_samples=hl.Struct(project_1=[], project_2=[]),
                 ),
                 hl.Struct(
                     id=1,
-                    ref_samples=hl.Struct(
-                        project_1=set(),
-                        project_2=set(),
-                    ),
-                    het_samples=hl.Struct(
-                        project_1=set(),
-                        project_2=set(),
-                    ),
-                    hom_samples=hl.Struct(
-                        project_1={'a', 'b', 'c'},
-                        project_2=set(),
-                    ),
-                ),
-                hl.Struct(
-                    id=2,
-                    ref_samples=hl.Struct(
-                        project_1=set(),
-                        project_2=set(),
-                    ),
-                    het_samples=hl.Struct(
-                        project_1=set(),
-                        project_2={'a'},
-                    ),
-                    hom_samples=hl.Struct(
-                        project_1=set(),
-                        project_2={'b'},
-                    ),
+                    ref_samples=hl.Struct(project_1=[], project_2=[0]),
+                    het_samples=hl.Struct(project_1=[], project_2=[]),
+                    hom_samples=hl.Struct(project_1=[0, 2], project_2=[]),
                 ),
             ],
         )
-        callset_sample_lookup_ht = hl.Table.parallelize(
-            [
-                {
-                    'id': 0,
-                    'ref_samples': {'c'},
-                    'het_samples': {'d'},
-                    'hom_samples': {'e'},
-                },
-                {
-                    'id': 3,
-                    'ref_samples': set(),
-                    'het_samples': {'c'},
-                    'hom_samples': {'d', 'e'},
-                },
-            ],
-            hl.tstruct(
-                id=hl.tint32,
-                ref_samples=hl.tset(hl.tstr),
-                het_samples=hl.tset(hl.tstr),
-                hom_samples=hl.tset(hl.tstr),
+        # Sample ids appended to an indexed table keep the existing positions.
+        indexed_sample_lookup_ht = filter_callset_sample_ids(
+            DatasetType.SNV_INDEL,
+            indexed_sample_lookup_ht.annotate_globals(
+                updates={hl.Struct(callset='abc', project_guid='project_1')},
             ),
-            key='id',
+            hl.Table.parallelize(
+                [{'s': 'b'}],
+                hl.tstruct(s=hl.tstr),
+                key='s',
+            ),
+            'project_1',
         )
-        sample_lookup_ht = join_sample_lookup_hts(
+        callset_sample_lookup_ht = index_sample_lookup_ht(
             DatasetType.SNV_INDEL,
-            sample_lookup_ht,
+            hl.Table.parallelize(
+                [
+                    {
+                        'id': 1,
+                        'ref_samples': hl.Struct(project_1={'b'}),
+                        'het_samples': hl.Struct(project_1={'f'}),
+                        'hom_samples': hl.Struct(project_1=set()),
+                    },
+                ],
+                hl.tstruct(
+                    id=hl.tint32,
+                    ref_samples=hl.tstruct(project_1=hl.tset(hl.tstr)),
+                    het_samples=hl.tstruct(project_1=hl.tset(hl.tstr)),
+                    hom_samples=hl.tstruct(project_1=hl.tset(hl.tstr)),
+                ),
+                key='id',
+            ),
+            {'project_1': ['a', 'b', 'c', 'f'], 'project_2': ['d', 'e']},
+        )
+        indexed_sample_lookup_ht = join_sample_lookup_hts_for_projects(
+            DatasetType.SNV_INDEL,
+            indexed_sample_lookup_ht,
             callset_sample_lookup_ht,
-            'project_3',
         )
         self.assertCountEqual(
-            sample_lookup_ht.collect(),
+            indexed_sample_lookup_ht.collect(),
             [
                 hl.Struct(
                     id=0,
-                    ref_samples=hl.Struct(
-                        project_1={'a'},
-                        project_2={'a'},
-                        project_3={'c'},
-                    ),
-                    het_samples=hl.Struct(
-                        project_1={'b', 'c'},
-                        project_2={'b'},
-                        project_3={'d'},
-                    ),
-                    hom_samples=hl.Struct(
-                        project_1=set(),
-                        project_2=set(),
-                        project_3={'e'},
-                    ),
+                    ref_samples=hl.Struct(project_1=[0], project_2=[]),
+                    het_samples=hl.Struct(project_1=[2], project_2=[0]),
+                    hom_samples=hl.Struct(project_1=[], project_2=[]),
                 ),
                 hl.Struct(
                     id=1,
-                    ref_samples=hl.Struct(
-                        project_1=set(),
-                        project_2=set(),
-                        project_3=set(),
-                    ),
-                    het_samples=hl.Struct(
-                        project_1=set(),
-                        project_2=set(),
-                        project_3=set(),
-                    ),
-                    hom_samples=hl.Struct(
-                        project_1={'a', 'b', 'c'},
-                        project_2=set(),
-                        project_3=set(),
-                    ),
-                ),
-                hl.Struct(
-                    id=2,
-                    ref_samples=hl.Struct(
-                        project_1=set(),
-                        project_2=set(),
-                        project_3=set(),
-                    ),
-                    het_samples=hl.Struct(
-                        project_1=set(),
-                        project_2={'a'},
-                        project_3=set(),
-                    ),
-                    hom_samples=hl.Struct(
-                        project_1=set(),
-                        project_2={'b'},
-                        project_3=set(),
-                    ),
-                ),
-                hl.Struct(
-                    id=3,
-                    ref_samples=hl.Struct(
-                        project_1=set(),
-                        project_2=set(),
-                        project_3=set(),
-                    ),
-                    het_samples=hl.Struct(
-                        project_1=set(),
-                        project_2=set(),
-                        project_3={'c'},
-                    ),
-                    hom_samples=hl.Struct(
-                        project_1=set(),
-                        project_2=set(),
-                        project_3={'d', 'e'},
-                    ),
+                    ref_samples=hl.Struct(project_1=[1], project_2=[0]),
+                    het_samples=hl.Struct(project_1=[3], project_2=[]),
+                    hom_samples=hl.Struct(project_1=[0, 2], project_2=[]),
                 ),
             ],
         )
+
+    def test_compute_sample_lookup_delta_ht(self) -> None:
+        sample_lookup_ht = hl.Table.parallelize(
+            [
+                {
+                    'id': 0,
+                    'ref_samples': hl.Struct(project_1={'a'}),
+                    'het_samples': hl.Struct(project_1={'b'}),
+                    'hom_samples': hl.Struct(project_1=set()),
+                },
+                {
+                    'id': 1,
+                    'ref_samples': hl.Struct(project_1={'b'}),
+                    'het_samples': hl.Struct(project_1=set()),
+                    'hom_samples': hl.Struct(project_1={'a'}),
+                },
+                {
+                    'id': 2,
+                    'ref_samples': hl.Struct(project_1={'b'}),
+                    'het_samples': hl.Struct(project_1=set()),
+                    'hom_samples': hl.Struct(project_1=set()),
+                },
+            ],
+            hl.tstruct(
+                id=hl.tint32,
+                ref_samples=hl.tstruct(project_1=hl.tset(hl.tstr)),
+                het_samples=hl.tstruct(project_1=hl.tset(hl.tstr)),
+                hom_samples=hl.tstruct(project_1=hl.tset(hl.tstr)),
+            ),
+            key='id',
+            globals=hl.Struct(
+                updates=hl.set([hl.Struct(callset='abc', project_guid='project_1')]),
+            ),
+        )
+        # Sample "a" of project_1 is re-called alongside the new project_2.
         callset_sample_lookup_ht = hl.Table.parallelize(
             [
                 {
                     'id': 0,
-                    'ref_samples': {'a', 'd'},
-                    'het_samples': {'b', 'f'},
-                    'hom_samples': {'c'},
+                    'ref_samples': hl.Struct(project_1=set(), project_2={'c'}),
+                    'het_samples': hl.Struct(project_1={'a'}, project_2=set()),
+                    'hom_samples': hl.Struct(project_1=set(), project_2=set()),
+                },
+                {
+                    'id': 3,
+                    'ref_samples': hl.Struct(project_1={'a'}, project_2=set()),
+                    'het_samples': hl.Struct(project_1=set(), project_2=set()),
+                    'hom_samples': hl.Struct(project_1=set(), project_2={'c'}),
                 },
             ],
             hl.tstruct(
                 id=hl.tint32,
-                ref_samples=hl.tset(hl.tstr),
-                het_samples=hl.tset(hl.tstr),
-                hom_samples=hl.tset(hl.tstr),
+                ref_samples=hl.tstruct(
+                    project_1=hl.tset(hl.tstr),
+                    project_2=hl.tset(hl.tstr),
+                ),
+                het_samples=hl.tstruct(
+                    project_1=hl.tset(hl.tstr),
+                    project_2=hl.tset(hl.tstr),
+                ),
+                hom_samples=hl.tstruct(
+                    project_1=hl.tset(hl.tstr),
+                    project_2=hl.tset(hl.tstr),
+                ),
             ),
             key='id',
         )
-        sample_lookup_ht = join_sample_lookup_hts(
+        sample_lookup_delta_ht = compute_sample_lookup_delta_ht(
             DatasetType.SNV_INDEL,
             sample_lookup_ht,
             callset_sample_lookup_ht,
-            'project_2',
+            {
+                'project_1': hl.Table.parallelize(
+                    [{'s': 'a'}],
+                    hl.tstruct(s=hl.tstr),
+                    key='s',
+                ),
+                'project_2': hl.Table.parallelize(
+                    [{'s': 'c'}],
+                    hl.tstruct(s=hl.tstr),
+                    key='s',
+                ),
+            },
         )
         self.assertCountEqual(
-            sample_lookup_ht.collect(),
+            sample_lookup_delta_ht.collect(),
             [
-                hl.Struct(
-                    id=0,
-                    ref_samples=hl.Struct(
-                        project_1={'a'},
-                        project_2={'a', 'd'},
-                        project_3={'c'},
-                    ),
-                    het_samples=hl.Struct(
-                        project_1={'b', 'c'},
-                        project_2={'b', 'f'},
-                        project_3={'d'},
-                    ),
-                    hom_samples=hl.Struct(
-                        project_1=set(),
-                        project_2={'c'},
-                        project_3={'e'},
-                    ),
-                ),
-                hl.Struct(
-                    id=1,
-                    ref_samples=hl.Struct(
-                        project_1=set(),
-                        project_2=set(),
-                        project_3=set(),
-                    ),
-                    het_samples=hl.Struct(
-                        project_1=set(),
-                        project_2=set(),
-                        project_3=set(),
-                    ),
-                    hom_samples=hl.Struct(
-                        project_1={'a', 'b', 'c'},
-                        project_2=set(),
-                        project_3=set(),
-                    ),
-                ),
-                hl.Struct(
-                    id=2,
-                    ref_samples=hl.Struct(
-                        project_1=set(),
-                        project_2=set(),
-                        project_3=set(),
-                    ),
-                    het_samples=hl.Struct(
-                        project_1=set(),
-                        project_2={'a'},
-                        project_3=set(),
-                    ),
-                    hom_samples=hl.Struct(
-                        project_1=set(),
-                        project_2={'b'},
-                        project_3=set(),
-                    ),
-                ),
-                hl.Struct(
-                    id=3,
-                    ref_samples=hl.Struct(
-                        project_1=set(),
-                        project_2=set(),
-                        project_3=set(),
-                    ),
-                    het_samples=hl.Struct(
-                        project_1=set(),
-                        project_2=set(),
-                        project_3={'c'},
-                    ),
-                    hom_samples=hl.Struct(
-                        project_1=set(),
-                        project_2=set(),
-                        project_3={'d', 'e'},
-                    ),
-                ),
+                hl.Struct(id=0, ref_samples=0, het_samples=1, hom_samples=0),
+                hl.Struct(id=1, ref_samples=0, het_samples=0, hom_samples=-1),
+                hl.Struct(id=3, ref_samples=1, het_samples=0, hom_samples=1),
             ],
         )
+        self.assertEqual(
+            hl.eval(sample_lookup_delta_ht.previous_updates),
+            {hl.Struct(callset='abc', project_guid='project_1')},
+        )
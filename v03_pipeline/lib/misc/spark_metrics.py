@@ -0,0 +1,52 @@
+import hail as hl
+import requests
+
+SPARK_STAGE_METRICS = [
+    'executorRunTime',
+    'inputBytes',
+    'outputBytes',
+    'shuffleReadBytes',
+    'shuffleWriteBytes',
+]
+SPARK_UI_TIMEOUT_SECONDS = 10
+
+
+def completed_spark_stages() -> list[dict] | None:
+    # Stage metrics are read from the Spark UI REST API of the running
+    # context, so they are unavailable when the UI is disabled.
+    sc = hl.spark_context()
+    if not sc.uiWebUrl:
+        return None
+    try:
+        response = requests.get(
+            f'{sc.uiWebUrl}/api/v1/applications/{sc.applicationId}/stages',
+            params={'status': 'complete'},
+            timeout=SPARK_UI_TIMEOUT_SECONDS,
+        )
+        response.raise_for_status()
+    except requests.RequestException:
+        return None
+    return response.json()
+
+
+def spark_stage_metrics_since(
+    previous_stages: list[dict] | None,
+) -> dict[str, int] | None:
+    stages = completed_spark_stages()
+    if stages is None or previous_stages is None:
+        return None
+    previous_stage_ids = {
+        (stage['stageId'], stage['attemptId']) for stage in previous_stages
+    }
+    new_stages = [
+        stage
+        for stage in stages
+        if (stage['stageId'], stage['attemptId']) not in previous_stage_ids
+    ]
+    return {
+        'n_stages': len(new_stages),
+        **{
+            metric: sum(stage.get(metric, 0) for stage in new_stages)
+            for metric in SPARK_STAGE_METRICS
+        },
+    }
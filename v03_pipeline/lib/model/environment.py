@@ -3,9 +3,12 @@ from dataclasses import dataclass
 
 # NB: using os.environ.get inside the dataclass defaults gives a lint error.
 ACCESS_PRIVATE_DATASETS = os.environ.get('ACCESS_PRIVATE_DATASETS') == '1'
+CALLSET_VIEWS = os.environ.get('CALLSET_VIEWS') == '1'
 CHECK_SEX_AND_RELATEDNESS = os.environ.get('CHECK_SEX_AND_RELATEDNESS') == '1'
 HAIL_TMPDIR = os.environ.get('HAIL_TMPDIR', '/tmp')  # noqa: S108
 HAIL_SEARCH_DATA = os.environ.get('HAIL_SEARCH_DATA', '/hail-search-data')
+INDEX_SAMPLE_LOOKUP_TABLE = os.environ.get('INDEX_SAMPLE_LOOKUP_TABLE') == '1'
+IN_PLACE_UPDATES = os.environ.get('IN_PLACE_UPDATES') == '1'
 LOADING_DATASETS = os.environ.get('LOADING_DATASETS', '/seqr-loading-temp')
 PRIVATE_REFERENCE_DATASETS = os.environ.get(
     'PRIVATE_REFERENCE_DATASETS',
@@ -15,14 +18,25 @@ REFERENCE_DATASETS = os.environ.get(
     'REFERENCE_DATASETS',
     '/seqr-reference-data',
 )
+SPARSE_ENTRIES = os.environ.get('SPARSE_ENTRIES') == '1'
+SYNTHETIC_VEP_COST_PER_VARIANT = int(
+    os.environ.get('SYNTHETIC_VEP_COST_PER_VARIANT', '0'),
+)
+VEP_BACKEND = os.environ.get('VEP_BACKEND', 'hail')
 
 
 @dataclass
 class Env:
     ACCESS_PRIVATE_DATASETS: bool = ACCESS_PRIVATE_DATASETS
+    CALLSET_VIEWS: bool = CALLSET_VIEWS
     CHECK_SEX_AND_RELATEDNESS: bool = CHECK_SEX_AND_RELATEDNESS
     HAIL_TMPDIR: str = HAIL_TMPDIR
     HAIL_SEARCH_DATA: str = HAIL_SEARCH_DATA
+    INDEX_SAMPLE_LOOKUP_TABLE: bool = INDEX_SAMPLE_LOOKUP_TABLE
+    IN_PLACE_UPDATES: bool = IN_PLACE_UPDATES
     LOADING_DATASETS: str = LOADING_DATASETS
     PRIVATE_REFERENCE_DATASETS: str = PRIVATE_REFERENCE_DATASETS
     REFERENCE_DATASETS: str = REFERENCE_DATASETS
+    SPARSE_ENTRIES: bool = SPARSE_ENTRIES
+    SYNTHETIC_VEP_COST_PER_VARIANT: int = SYNTHETIC_VEP_COST_PER_VARIANT
+    VEP_BACKEND: str = VEP_BACKEND
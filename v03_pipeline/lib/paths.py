@@ -90,6 +90,40 @@ def metadata_for_run_path(
     )
 
 
+def task_metrics_for_run_prefix(
+    reference_genome: ReferenceGenome,
+    dataset_type: DatasetType,
+    run_id: str,
+) -> str:
+    return os.path.join(
+        _v03_pipeline_prefix(
+            Env.HAIL_SEARCH_DATA,
+            reference_genome,
+            dataset_type,
+        ),
+        'runs',
+        run_id,
+        'tasks',
+    )
+
+
+def vep_parameters_for_run_path(
+    reference_genome: ReferenceGenome,
+    dataset_type: DatasetType,
+    run_id: str,
+) -> str:
+    return os.path.join(
+        _v03_pipeline_prefix(
+            Env.HAIL_SEARCH_DATA,
+            reference_genome,
+            dataset_type,
+        ),
+        'runs',
+        run_id,
+        'vep_parameters.json',
+    )
+
+
 def project_table_path(
     reference_genome: ReferenceGenome,
     dataset_type: DatasetType,
@@ -140,6 +174,58 @@ def remapped_and_subsetted_callset_path(
     )
 
 
+def remapped_and_subsetted_callset_view_path(
+    reference_genome: ReferenceGenome,
+    dataset_type: DatasetType,
+    callset_path: str,
+    project_guid: str,
+) -> str:
+    return os.path.join(
+        _v03_pipeline_prefix(
+            Env.LOADING_DATASETS,
+            reference_genome,
+            dataset_type,
+        ),
+        'remapped_and_subsetted_callsets',
+        project_guid,
+        f'{hashlib.sha256(callset_path.encode("utf8")).hexdigest()}.view.ht',
+    )
+
+
+def remapped_and_subsetted_callset_entries_path(
+    reference_genome: ReferenceGenome,
+    dataset_type: DatasetType,
+    callset_path: str,
+) -> str:
+    return os.path.join(
+        _v03_pipeline_prefix(
+            Env.LOADING_DATASETS,
+            reference_genome,
+            dataset_type,
+        ),
+        'remapped_and_subsetted_callset_entries',
+        hashlib.sha256(callset_path.encode('utf8')).hexdigest(),
+    )
+
+
+def sample_lookup_delta_table_path(
+    reference_genome: ReferenceGenome,
+    dataset_type: DatasetType,
+    run_id: str,
+    callset_path: str,
+) -> str:
+    return os.path.join(
+        _v03_pipeline_prefix(
+            Env.LOADING_DATASETS,
+            reference_genome,
+            dataset_type,
+        ),
+        'lookup_deltas',
+        run_id,
+        f'{hashlib.sha256(callset_path.encode("utf8")).hexdigest()}.ht',
+    )
+
+
 def sample_lookup_table_path(
     reference_genome: ReferenceGenome,
     dataset_type: DatasetType,
@@ -212,6 +298,67 @@ def valid_reference_dataset_collection_path(
     )
 
 
+def valid_reference_dataset_collection_manifest_path(
+    reference_genome: ReferenceGenome,
+    dataset_type: DatasetType,
+    reference_dataset_collection: ReferenceDatasetCollection,
+) -> str | None:
+    if (
+        not Env.ACCESS_PRIVATE_DATASETS
+        and reference_dataset_collection.access_control == AccessControl.PRIVATE
+    ):
+        return None
+    return os.path.join(
+        _v03_reference_data_prefix(
+            reference_dataset_collection.access_control,
+            reference_genome,
+        ),
+        dataset_type.value,
+        'reference_datasets',
+        reference_dataset_collection.value,
+        'manifest.json',
+    )
+
+
+def valid_reference_dataset_path(
+    reference_genome: ReferenceGenome,
+    dataset_type: DatasetType,
+    reference_dataset_collection: ReferenceDatasetCollection,
+    dataset: str,
+) -> str | None:
+    if (
+        not Env.ACCESS_PRIVATE_DATASETS
+        and reference_dataset_collection.access_control == AccessControl.PRIVATE
+    ):
+        return None
+    return os.path.join(
+        _v03_reference_data_prefix(
+            reference_dataset_collection.access_control,
+            reference_genome,
+        ),
+        dataset_type.value,
+        'reference_datasets',
+        reference_dataset_collection.value,
+        f'{dataset}.ht',
+    )
+
+
+def vep_cache_prefix(
+    reference_genome: ReferenceGenome,
+    dataset_type: DatasetType,
+    vep_config_hash: str,
+) -> str:
+    return os.path.join(
+        _v03_pipeline_prefix(
+            Env.LOADING_DATASETS,
+            reference_genome,
+            dataset_type,
+        ),
+        'vep_cache',
+        vep_config_hash,
+    )
+
+
 def variant_annotations_table_path(
     reference_genome: ReferenceGenome,
     dataset_type: DatasetType,
@@ -13,12 +13,20 @@ from v03_pipeline.lib.paths import (
     metadata_for_run_path,
     project_table_path,
     relatedness_check_table_path,
+    remapped_and_subsetted_callset_entries_path,
     remapped_and_subsetted_callset_path,
+    remapped_and_subsetted_callset_view_path,
+    sample_lookup_delta_table_path,
     sample_lookup_table_path,
     sex_check_table_path,
+    task_metrics_for_run_prefix,
     valid_cached_reference_dataset_query_path,
+    valid_reference_dataset_collection_manifest_path,
     valid_reference_dataset_collection_path,
+    valid_reference_dataset_path,
     variant_annotations_table_path,
+    vep_cache_prefix,
+    vep_parameters_for_run_path,
 )
 
 
@@ -83,6 +91,27 @@ class TestPaths(unittest.TestCase):
             '/seqr-reference-data-private/v03/GRCh38/SNV_INDEL/reference_datasets/hgmd.ht',
         )
 
+    def test_valid_reference_dataset_collection_manifest_path(self) -> None:
+        self.assertEqual(
+            valid_reference_dataset_collection_manifest_path(
+                ReferenceGenome.GRCh38,
+                DatasetType.SNV_INDEL,
+                ReferenceDatasetCollection.HGMD,
+            ),
+            '/seqr-reference-data-private/v03/GRCh38/SNV_INDEL/reference_datasets/hgmd/manifest.json',
+        )
+
+    def test_valid_reference_dataset_path(self) -> None:
+        self.assertEqual(
+            valid_reference_dataset_path(
+                ReferenceGenome.GRCh38,
+                DatasetType.SNV_INDEL,
+                ReferenceDatasetCollection.COMBINED,
+                'clinvar',
+            ),
+            '/seqr-reference-data/v03/GRCh38/SNV_INDEL/reference_datasets/combined/clinvar.ht',
+        )
+
     def test_sample_lookup_table_path(self) -> None:
         self.assertEqual(
             sample_lookup_table_path(
@@ -122,6 +151,26 @@ class TestPaths(unittest.TestCase):
             '/hail-search-data/v03/GRCh38/SNV_INDEL/runs/manual__2023-06-26T18:30:09.349671+00:00/metadata.json',
         )
 
+    def test_task_metrics_for_run_prefix(self) -> None:
+        self.assertEqual(
+            task_metrics_for_run_prefix(
+                ReferenceGenome.GRCh38,
+                DatasetType.SNV_INDEL,
+                'manual__2023-06-26T18:30:09.349671+00:00',
+            ),
+            '/hail-search-data/v03/GRCh38/SNV_INDEL/runs/manual__2023-06-26T18:30:09.349671+00:00/tasks',
+        )
+
+    def test_vep_parameters_for_run_path(self) -> None:
+        self.assertEqual(
+            vep_parameters_for_run_path(
+                ReferenceGenome.GRCh38,
+                DatasetType.SNV_INDEL,
+                'manual__2023-06-26T18:30:09.349671+00:00',
+            ),
+            '/hail-search-data/v03/GRCh38/SNV_INDEL/runs/manual__2023-06-26T18:30:09.349671+00:00/vep_parameters.json',
+        )
+
     def test_variant_annotations_table_path(self) -> None:
         self.assertEqual(
             variant_annotations_table_path(
@@ -131,6 +180,27 @@ class TestPaths(unittest.TestCase):
             '/hail-search-data/v03/GRCh38/GCNV/annotations.ht',
         )
 
+    def test_sample_lookup_delta_table_path(self) -> None:
+        self.assertEqual(
+            sample_lookup_delta_table_path(
+                ReferenceGenome.GRCh37,
+                DatasetType.MITO,
+                'manual__2023-06-26T18:30:09.349671+00:00',
+                'gs://abc.efg/callset.vcf.gz',
+            ),
+            '/seqr-loading-temp/v03/GRCh37/MITO/lookup_deltas/manual__2023-06-26T18:30:09.349671+00:00/ead56bb177a5de24178e1e622ce1d8beb3f8892bdae1c925d22ca0af4013d6dd.ht',
+        )
+
+    def test_vep_cache_prefix(self) -> None:
+        self.assertEqual(
+            vep_cache_prefix(
+                ReferenceGenome.GRCh38,
+                DatasetType.SNV_INDEL,
+                'abcdef',
+            ),
+            '/seqr-loading-temp/v03/GRCh38/SNV_INDEL/vep_cache/abcdef',
+        )
+
     def test_remapped_and_subsetted_callset_path(self) -> None:
         self.assertEqual(
             remapped_and_subsetted_callset_path(
@@ -151,6 +221,27 @@ class TestPaths(unittest.TestCase):
             '/seqr-loading-temp/v03/GRCh38/GCNV/remapped_and_subsetted_callsets/R0111_tgg_bblanken_wes/bce53ccdb49a5ed2513044e1d0c6224e3ffcc323f770dc807d9175fd3c70a050.mt',
         )
 
+    def test_remapped_and_subsetted_callset_view_path(self) -> None:
+        self.assertEqual(
+            remapped_and_subsetted_callset_view_path(
+                ReferenceGenome.GRCh38,
+                DatasetType.GCNV,
+                'gs://abc.efg/callset.vcf.gz',
+                'R0111_tgg_bblanken_wes',
+            ),
+            '/seqr-loading-temp/v03/GRCh38/GCNV/remapped_and_subsetted_callsets/R0111_tgg_bblanken_wes/ead56bb177a5de24178e1e622ce1d8beb3f8892bdae1c925d22ca0af4013d6dd.view.ht',
+        )
+
+    def test_remapped_and_subsetted_callset_entries_path(self) -> None:
+        self.assertEqual(
+            remapped_and_subsetted_callset_entries_path(
+                ReferenceGenome.GRCh38,
+                DatasetType.GCNV,
+                'gs://abc.efg/callset.vcf.gz',
+            ),
+            '/seqr-loading-temp/v03/GRCh38/GCNV/remapped_and_subsetted_callset_entries/ead56bb177a5de24178e1e622ce1d8beb3f8892bdae1c925d22ca0af4013d6dd',
+        )
+
     def test_imported_callset_path(self) -> None:
         self.assertEqual(
             imported_callset_path(
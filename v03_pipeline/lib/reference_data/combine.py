@@ -3,6 +3,7 @@ from datetime import datetime
 import hail as hl
 import pytz
 
+from v03_pipeline.lib.misc.io import checkpoint
 from v03_pipeline.lib.model import (
     DatasetType,
     ReferenceDatasetCollection,
@@ -89,6 +90,25 @@ def get_enum_select_fields(enum_selects, ht):
     return enum_select_fields
 
 
+def get_dataset_path(dataset: str, reference_genome: ReferenceGenome) -> str:
+    config = CONFIG[dataset][reference_genome.v02_value]
+    return config['source_path'] if 'custom_import' in config else config['path']
+
+
+def dataset_is_current(
+    dataset: str,
+    reference_genome: ReferenceGenome,
+    path: str | None,
+    version: str | None,
+) -> bool:
+    # Whether a table built with these path and version globals still
+    # matches the config for the dataset.
+    config = CONFIG[dataset][reference_genome.v02_value]
+    return path == get_dataset_path(dataset, reference_genome) and (
+        'version' not in config or version == config['version']
+    )
+
+
 def get_ht(
     dataset: str,
     reference_genome: ReferenceGenome,
@@ -113,7 +133,7 @@ def get_ht(
     )
     ht = ht.transmute(**get_enum_select_fields(config.get('enum_select'), ht))
     ht = ht.select_globals(
-        path=(config['source_path'] if 'custom_import' in config else config['path']),
+        path=get_dataset_path(dataset, reference_genome),
         version=parse_version(ht, dataset, config),
         enums=hl.Struct(
             **config.get(
@@ -141,20 +161,62 @@ def join_hts(
     dataset_type: DatasetType,
     reference_dataset_collection: ReferenceDatasetCollection,
 ):
-    key_type = reference_dataset_collection.table_key_type(reference_genome)
-    joined_ht = hl.Table.parallelize(
-        [],
-        key_type,
-        key=key_type.fields,
-        globals=hl.Struct(
-            paths=hl.Struct(),
-            versions=hl.Struct(),
-            enums=hl.Struct(),
-        ),
+    datasets = reference_dataset_collection.datasets(dataset_type)
+    if not datasets:
+        key_type = reference_dataset_collection.table_key_type(reference_genome)
+        return hl.Table.parallelize(
+            [],
+            key_type,
+            key=key_type.fields,
+            globals=hl.Struct(
+                paths=hl.Struct(),
+                versions=hl.Struct(),
+                enums=hl.Struct(),
+            ),
+        )
+    # The dataset tables are joined lazily, so building them and merging
+    # them runs as a single Hail pipeline when the result is written.
+    return join_dataset_hts(
+        {dataset: get_ht(dataset, reference_genome) for dataset in datasets},
     )
-    for dataset in reference_dataset_collection.datasets(dataset_type):
-        dataset_ht = get_ht(dataset, reference_genome)
-        joined_ht = joined_ht.join(dataset_ht, 'outer')
+
+
+def join_dataset_hts(dataset_hts: dict[str, hl.Table]) -> hl.Table:
+    # multi_way_zip_join requires identical row types, so every table carries
+    # all of the dataset fields with only its own one set.  The tables are
+    # then merged in a single pass over the shared key rather than a chain
+    # of pairwise outer joins.
+    dataset_types = {
+        dataset: dataset_ht[dataset].dtype
+        for dataset, dataset_ht in dataset_hts.items()
+    }
+    zipped_ht = hl.Table.multi_way_zip_join(
+        [
+            dataset_ht.select(
+                **{
+                    other_dataset: (
+                        dataset_ht[dataset]
+                        if other_dataset == dataset
+                        else hl.missing(other_dataset_type)
+                    )
+                    for other_dataset, other_dataset_type in dataset_types.items()
+                },
+            ).select_globals()
+            for dataset, dataset_ht in dataset_hts.items()
+        ],
+        'data',
+        'global_data',
+    )
+    joined_ht = zipped_ht.select(
+        **{
+            dataset: zipped_ht.data[i][dataset] for i, dataset in enumerate(dataset_hts)
+        },
+    ).select_globals(
+        paths=hl.Struct(),
+        versions=hl.Struct(),
+        enums=hl.Struct(),
+    )
+    for dataset, dataset_ht in dataset_hts.items():
         joined_ht = annotate_dataset_globals(joined_ht, dataset, dataset_ht)
     return joined_ht
 
@@ -166,16 +228,83 @@ def update_existing_joined_hts(
     dataset_type: DatasetType,
     reference_dataset_collection: ReferenceDatasetCollection,
 ):
-    joined_ht = hl.read_table(destination_path)
-    dataset_ht = get_ht(dataset, reference_genome)
-    joined_ht = joined_ht.drop(dataset)
-    joined_ht = joined_ht.join(dataset_ht, 'outer')
+    return update_joined_ht(
+        hl.read_table(destination_path),
+        dataset,
+        get_ht(dataset, reference_genome),
+        reference_dataset_collection.datasets(dataset_type),
+    )
+
+
+def get_dataset_delta_ht(
+    joined_ht: hl.Table,
+    dataset: str,
+    dataset_ht: hl.Table,
+) -> hl.Table:
+    # Keys whose value for the dataset differs between the joined table and
+    # the rebuilt dataset table, with the new value (missing for removed
+    # keys) and whether the key is new to the joined table.
+    existing_ht = joined_ht.select(
+        existing=joined_ht[dataset],
+        is_joined=True,
+    ).select_globals()
+    delta_ht = existing_ht.join(dataset_ht.select(dataset).select_globals(), 'outer')
+    delta_ht = delta_ht.filter(
+        hl.or_else(
+            delta_ht.existing != delta_ht[dataset],
+            hl.is_defined(delta_ht.existing) | hl.is_defined(delta_ht[dataset]),
+        ),
+    )
+    return delta_ht.select(dataset, is_added=hl.is_missing(delta_ht.is_joined))
+
+
+def update_joined_ht(
+    joined_ht: hl.Table,
+    dataset: str,
+    dataset_ht: hl.Table,
+    datasets: list[str],
+) -> hl.Table:
+    if joined_ht[dataset].dtype != dataset_ht[dataset].dtype:
+        # The dataset schema changed, so every row has to be replaced.
+        joined_ht = joined_ht.drop(dataset)
+        joined_ht = joined_ht.join(dataset_ht, 'outer')
+        joined_ht = joined_ht.filter(
+            hl.any([~hl.is_missing(joined_ht[dataset]) for dataset in datasets]),
+        )
+        return annotate_dataset_globals(joined_ht, dataset, dataset_ht)
+
+    # Releases usually touch a small fraction of the keys, so only the
+    # changed keys are applied to the joined table.  The delta is small, so
+    # existing rows look it up rather than being joined against the whole
+    # rebuilt dataset table, and the rows of new keys are appended.
+    delta_ht, _ = checkpoint(get_dataset_delta_ht(joined_ht, dataset, dataset_ht))
+    joined_ht = joined_ht.annotate(delta=delta_ht[joined_ht.key])
+    joined_ht = joined_ht.annotate(
+        **{
+            dataset: hl.if_else(
+                hl.is_defined(joined_ht.delta),
+                joined_ht.delta[dataset],
+                joined_ht[dataset],
+            ),
+        },
+    )
+    # Only removed keys can leave a row without any dataset.
     joined_ht = joined_ht.filter(
-        hl.any(
-            [
-                ~hl.is_missing(joined_ht[dataset])
-                for dataset in reference_dataset_collection.datasets(dataset_type)
-            ],
+        hl.is_missing(joined_ht.delta)
+        | hl.any(
+            [~hl.is_missing(joined_ht[other_dataset]) for other_dataset in datasets],
         ),
+    ).drop('delta')
+    added_ht = delta_ht.filter(delta_ht.is_added)
+    added_ht = added_ht.select(
+        **{
+            field: (
+                added_ht[dataset]
+                if field == dataset
+                else hl.missing(joined_ht[field].dtype)
+            )
+            for field in joined_ht.row_value
+        },
     )
+    joined_ht = joined_ht.union(added_ht)
     return annotate_dataset_globals(joined_ht, dataset, dataset_ht)
@@ -1,3 +1,4 @@
+import tempfile
 import unittest
 from datetime import datetime
 from unittest import mock
@@ -13,6 +14,7 @@ from v03_pipeline.lib.model import (
 from v03_pipeline.lib.reference_data.combine import (
     get_enum_select_fields,
     get_ht,
+    join_hts,
     update_existing_joined_hts,
 )
 from v03_pipeline.lib.reference_data.config import (
@@ -20,6 +22,8 @@ from v03_pipeline.lib.reference_data.config import (
     dbnsfp_mito_custom_select,
 )
 
+read_table = hl.read_table
+
 
 class ReferenceDataCombineTest(unittest.TestCase):
     def test_get_enum_select_fields(self):
@@ -272,6 +276,117 @@ class ReferenceDataCombineTest(unittest.TestCase):
         )
         self.assertRaises(Exception, ht.globals.collect)
 
+    @mock.patch('v03_pipeline.lib.misc.io.Env')
+    @mock.patch('v03_pipeline.lib.reference_data.combine.get_ht')
+    @mock.patch('v03_pipeline.lib.reference_data.combine.datetime', wraps=datetime)
+    @mock.patch.object(ReferenceDatasetCollection, 'datasets')
+    def test_join_hts(
+        self,
+        mock_reference_dataset_collection_datasets,
+        mock_datetime,
+        mock_get_ht,
+        mock_env,
+    ):
+        mock_reference_dataset_collection_datasets.return_value = ['a', 'b']
+        mock_datetime.now.return_value = datetime(
+            2023,
+            4,
+            19,
+            16,
+            43,
+            39,
+            361110,
+            tzinfo=pytz.timezone('US/Eastern'),
+        )
+        key_type = hl.tstruct(
+            locus=hl.tlocus('GRCh38'),
+            alleles=hl.tarray(hl.tstr),
+        )
+        dataset_hts = {
+            'a': hl.Table.parallelize(
+                [
+                    {
+                        'locus': hl.Locus('chr1', 1, 'GRCh38'),
+                        'alleles': ['A', 'C'],
+                        'a': hl.Struct(d=1),
+                    },
+                    {
+                        'locus': hl.Locus('chr1', 2, 'GRCh38'),
+                        'alleles': ['A', 'C'],
+                        'a': hl.Struct(d=2),
+                    },
+                ],
+                hl.tstruct(**key_type, a=hl.tstruct(d=hl.tint32)),
+                key=['locus', 'alleles'],
+                globals=hl.Struct(
+                    path='a_path',
+                    version='a_version',
+                    enums=hl.Struct(),
+                ),
+            ),
+            'b': hl.Table.parallelize(
+                [
+                    {
+                        'locus': hl.Locus('chr1', 2, 'GRCh38'),
+                        'alleles': ['A', 'C'],
+                        'b': hl.Struct(e='x'),
+                    },
+                    {
+                        'locus': hl.Locus('chr1', 3, 'GRCh38'),
+                        'alleles': ['A', 'C'],
+                        'b': hl.Struct(e='y'),
+                    },
+                ],
+                hl.tstruct(**key_type, b=hl.tstruct(e=hl.tstr)),
+                key=['locus', 'alleles'],
+                globals=hl.Struct(
+                    path='b_path',
+                    version='b_version',
+                    enums=hl.Struct(enum_1=['D', 'F']),
+                ),
+            ),
+        }
+        mock_get_ht.side_effect = lambda dataset, _: dataset_hts[dataset]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            mock_env.HAIL_TMPDIR = temp_dir
+            ht = join_hts(
+                ReferenceGenome.GRCh38,
+                DatasetType.SNV_INDEL,
+                ReferenceDatasetCollection.COMBINED,
+            )
+            self.assertListEqual(
+                ht.collect(),
+                [
+                    hl.Struct(
+                        locus=hl.Locus('chr1', 1, 'GRCh38'),
+                        alleles=['A', 'C'],
+                        a=hl.Struct(d=1),
+                        b=None,
+                    ),
+                    hl.Struct(
+                        locus=hl.Locus('chr1', 2, 'GRCh38'),
+                        alleles=['A', 'C'],
+                        a=hl.Struct(d=2),
+                        b=hl.Struct(e='x'),
+                    ),
+                    hl.Struct(
+                        locus=hl.Locus('chr1', 3, 'GRCh38'),
+                        alleles=['A', 'C'],
+                        a=None,
+                        b=hl.Struct(e='y'),
+                    ),
+                ],
+            )
+            self.assertEqual(
+                hl.eval(ht.globals),
+                hl.Struct(
+                    paths=hl.Struct(a='a_path', b='b_path'),
+                    versions=hl.Struct(a='a_version', b='b_version'),
+                    enums=hl.Struct(a=hl.Struct(), b=hl.Struct(enum_1=['D', 'F'])),
+                    date='2023-04-19T16:43:39.361110-04:56',
+                ),
+            )
+
     @mock.patch.dict(
         'v03_pipeline.lib.reference_data.combine.CONFIG',
         {
@@ -316,7 +431,7 @@ class ReferenceDataCombineTest(unittest.TestCase):
             361110,
             tzinfo=pytz.timezone('US/Eastern'),
         )
-        mock_read_table.return_value = hl.Table.parallelize(
+        joined_ht = hl.Table.parallelize(
             [
                 {
                     'locus': hl.Locus(
@@ -361,6 +476,10 @@ class ReferenceDataCombineTest(unittest.TestCase):
                 ),
             ),
         )
+        # The checkpointed delta is read back with the unpatched read_table.
+        mock_read_table.side_effect = lambda path, **kwargs: (
+            joined_ht if path == 'destination' else read_table(path, **kwargs)
+        )
         mock_get_ht.return_value = hl.Table.parallelize(
             [
                 {
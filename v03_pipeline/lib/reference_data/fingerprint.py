@@ -0,0 +1,67 @@
+import json
+import os
+import urllib.request
+
+import hail as hl
+
+from v03_pipeline.lib.misc.io import file_content_hash
+from v03_pipeline.lib.model import ReferenceGenome
+from v03_pipeline.lib.reference_data.combine import get_dataset_path
+
+REMOTE_SCHEMES = ('ftp://', 'http://', 'https://')
+
+
+def _hail_table_fingerprint(path: str) -> dict | None:
+    # A table without _SUCCESS is still being written (or its write failed),
+    # so it has no fingerprint yet.
+    success_path = os.path.join(path, '_SUCCESS')
+    if not hl.hadoop_exists(success_path):
+        return None
+    # The row metadata lists the part files, whose names are unique to each
+    # write, so its checksum changes whenever the table is rewritten.
+    rows_metadata_path = os.path.join(
+        path,
+        'rows/rows/metadata.json.gz'
+        if path.endswith('mt')
+        else 'rows/metadata.json.gz',
+    )
+    return {
+        'size_bytes': hl.hadoop_stat(rows_metadata_path)['size_bytes'],
+        'modification_time': hl.hadoop_stat(success_path)['modification_time'],
+        'checksum': file_content_hash(rows_metadata_path),
+    }
+
+
+def _remote_fingerprint(url: str) -> dict | None:
+    # NCBI publishes an md5 next to each ClinVar release.  Sources without
+    # one cannot be fingerprinted; callers treat a missing fingerprint for a
+    # dataset that recorded one as a change.
+    try:
+        with urllib.request.urlopen(f'{url}.md5') as f:  # noqa: S310
+            return {'checksum': f.read().decode().split()[0]}
+    except OSError:
+        return None
+
+
+def is_remote_source(path: str) -> bool:
+    return path.startswith(REMOTE_SCHEMES)
+
+
+def source_fingerprint(path: str) -> dict | None:
+    if is_remote_source(path):
+        return _remote_fingerprint(path)
+    if path.endswith(('ht', 'mt')):
+        return _hail_table_fingerprint(path)
+    # Source files such as VCFs may be large, so they are not read.
+    stat = hl.hadoop_stat(path)
+    return {
+        'size_bytes': stat['size_bytes'],
+        'modification_time': stat['modification_time'],
+    }
+
+
+def dataset_fingerprint(dataset: str, reference_genome: ReferenceGenome) -> str | None:
+    fingerprint = source_fingerprint(get_dataset_path(dataset, reference_genome))
+    if fingerprint is None:
+        return None
+    return json.dumps(fingerprint, sort_keys=True)
@@ -0,0 +1,50 @@
+import io
+import os
+import tempfile
+import unittest
+import urllib.error
+from unittest import mock
+
+import hail as hl
+
+from v03_pipeline.lib.reference_data.fingerprint import source_fingerprint
+
+
+class FingerprintTest(unittest.TestCase):
+    def test_hail_table_fingerprint(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'test.ht')
+            hl.utils.range_table(10).write(path)
+            fingerprint = source_fingerprint(path)
+            self.assertEqual(source_fingerprint(path), fingerprint)
+            hl.utils.range_table(10).write(path, overwrite=True)
+            self.assertNotEqual(
+                source_fingerprint(path)['checksum'],
+                fingerprint['checksum'],
+            )
+            # A table whose write has not finished has no fingerprint.
+            os.remove(os.path.join(path, '_SUCCESS'))
+            self.assertIsNone(source_fingerprint(path))
+
+    def test_file_fingerprint(self):
+        with tempfile.NamedTemporaryFile(suffix='.vcf.gz') as f:
+            f.write(b'abc')
+            f.flush()
+            fingerprint = source_fingerprint(f.name)
+            self.assertEqual(fingerprint['size_bytes'], 3)
+            self.assertNotIn('checksum', fingerprint)
+
+    @mock.patch('v03_pipeline.lib.reference_data.fingerprint.urllib.request.urlopen')
+    def test_remote_fingerprint(self, mock_urlopen):
+        mock_urlopen.return_value = io.BytesIO(b'0123abcd  clinvar.vcf.gz\n')
+        self.assertEqual(
+            source_fingerprint('ftp://ftp.ncbi.nlm.nih.gov/clinvar.vcf.gz'),
+            {'checksum': '0123abcd'},
+        )
+        mock_urlopen.assert_called_with(
+            'ftp://ftp.ncbi.nlm.nih.gov/clinvar.vcf.gz.md5',
+        )
+        mock_urlopen.side_effect = urllib.error.URLError('no md5')
+        self.assertIsNone(
+            source_fingerprint('https://example.com/source.vcf.gz'),
+        )
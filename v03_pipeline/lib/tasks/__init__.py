@@ -2,16 +2,26 @@ from v03_pipeline.lib.tasks.update_project_table import UpdateProjectTableTask
 from v03_pipeline.lib.tasks.update_sample_lookup_table import (
     UpdateSampleLookupTableTask,
 )
+from v03_pipeline.lib.tasks.update_variant_annotations_table_with_new_callsets import (
+    UpdateVariantAnnotationsTableWithNewCallsetsTask,
+)
 from v03_pipeline.lib.tasks.update_variant_annotations_table_with_new_samples import (
     UpdateVariantAnnotationsTableWithNewSamplesTask,
 )
 from v03_pipeline.lib.tasks.write_family_table import WriteFamilyTableTask
+from v03_pipeline.lib.tasks.write_family_tables import WriteFamilyTablesTask
 from v03_pipeline.lib.tasks.write_metadata_for_run import WriteMetadataForRunTask
+from v03_pipeline.lib.tasks.write_reference_dataset_collection import (
+    WriteReferenceDatasetCollectionTask,
+)
 
 __all__ = [
     'UpdateProjectTableTask',
     'UpdateSampleLookupTableTask',
+    'UpdateVariantAnnotationsTableWithNewCallsetsTask',
     'UpdateVariantAnnotationsTableWithNewSamplesTask',
     'WriteMetadataForRunTask',
     'WriteFamilyTableTask',
+    'WriteFamilyTablesTask',
+    'WriteReferenceDatasetCollectionTask',
 ]
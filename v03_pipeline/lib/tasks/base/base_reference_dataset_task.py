@@ -0,0 +1,39 @@
+import hail as hl
+import luigi
+
+from v03_pipeline.lib.misc.io import write
+from v03_pipeline.lib.model import (
+    DatasetType,
+    Env,
+    ReferenceDatasetCollection,
+    ReferenceGenome,
+)
+from v03_pipeline.lib.tasks.files import GCSorLocalFolderTarget
+
+
+class BaseReferenceDatasetTask(luigi.Task):
+    reference_genome = luigi.EnumParameter(enum=ReferenceGenome)
+    dataset_type = luigi.EnumParameter(enum=DatasetType)
+    reference_dataset_collection = luigi.EnumParameter(
+        enum=ReferenceDatasetCollection,
+    )
+
+    def output(self) -> luigi.Target:
+        raise NotImplementedError
+
+    def complete(self) -> bool:
+        return GCSorLocalFolderTarget(self.output().path).exists()
+
+    def init_hail(self):
+        hl.init(tmp_dir=Env.HAIL_TMPDIR, idempotent=True)
+
+        # hail 0.2.78 hits an error on the join, this flag gets around it
+        hl._set_flags(no_whole_stage_codegen='1')  # noqa: SLF001
+
+    def run(self) -> None:
+        self.init_hail()
+        ht = self.create_table()
+        write(ht, self.output().path)
+
+    def create_table(self) -> hl.Table:
+        raise NotImplementedError
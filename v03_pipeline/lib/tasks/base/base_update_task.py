@@ -1,8 +1,14 @@
+import functools
+
 import hail as hl
 import luigi
 
-from v03_pipeline.lib.misc.io import write
+from v03_pipeline.lib.misc.io import write, write_in_place
 from v03_pipeline.lib.model import DatasetType, Env, ReferenceGenome, SampleType
+from v03_pipeline.lib.tasks.base.task_metrics import (
+    record_task_start,
+    write_task_metrics,
+)
 from v03_pipeline.lib.tasks.files import GCSorLocalFolderTarget
 
 
@@ -10,6 +16,12 @@ class BaseUpdateTask(luigi.Task):
     reference_genome = luigi.EnumParameter(enum=ReferenceGenome)
     dataset_type = luigi.EnumParameter(enum=DatasetType)
     sample_type = luigi.EnumParameter(enum=SampleType)
+    run_id = luigi.OptionalParameter(
+        default=None,
+        significant=False,
+        positional=False,
+        description='Run under which task metrics are recorded.',
+    )
 
     def output(self) -> luigi.Target:
         raise NotImplementedError
@@ -28,13 +40,24 @@ class BaseUpdateTask(luigi.Task):
         self.init_hail()
         if not self.output().exists():
             ht = self.initialize_table()
-        else:
-            ht = hl.read_table(self.output().path)
+            ht = self.update_table(ht)
+            write(ht, self.output().path)
+            return
+        ht = hl.read_table(self.output().path)
         ht = self.update_table(ht)
-        write(ht, self.output().path)
+        if Env.IN_PLACE_UPDATES:
+            write_in_place(ht, self.output().path)
+        else:
+            write(ht, self.output().path)
 
     def initialize_table(self) -> hl.Table:
         raise NotImplementedError
 
     def update_table(self, ht: hl.Table) -> hl.Table:
         raise NotImplementedError
+
+
+BaseUpdateTask.event_handler(luigi.Event.START)(
+    functools.partial(record_task_start, reads_output=True),
+)
+BaseUpdateTask.event_handler(luigi.Event.SUCCESS)(write_task_metrics)
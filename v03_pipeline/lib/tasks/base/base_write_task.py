@@ -3,6 +3,10 @@ import luigi
 
 from v03_pipeline.lib.misc.io import write
 from v03_pipeline.lib.model import DatasetType, Env, ReferenceGenome, SampleType
+from v03_pipeline.lib.tasks.base.task_metrics import (
+    record_task_start,
+    write_task_metrics,
+)
 from v03_pipeline.lib.tasks.files import GCSorLocalFolderTarget
 
 
@@ -10,6 +14,12 @@ class BaseWriteTask(luigi.Task):
     reference_genome = luigi.EnumParameter(enum=ReferenceGenome)
     dataset_type = luigi.EnumParameter(enum=DatasetType)
     sample_type = luigi.EnumParameter(enum=SampleType)
+    run_id = luigi.OptionalParameter(
+        default=None,
+        significant=False,
+        positional=False,
+        description='Run under which task metrics are recorded.',
+    )
 
     def output(self) -> luigi.Target:
         raise NotImplementedError
@@ -27,7 +37,16 @@ class BaseWriteTask(luigi.Task):
     def run(self) -> None:
         self.init_hail()
         ht = self.create_table()
-        write(ht, self.output().path)
+        write(ht, self.output().path, self.size_reference_path())
+
+    def size_reference_path(self) -> str | None:
+        # Tasks whose output is sized like an existing table may return its
+        # path to skip the temporary write used for partition planning.
+        return None
 
     def create_table(self) -> hl.Table:
         raise NotImplementedError
+
+
+BaseWriteTask.event_handler(luigi.Event.START)(record_task_start)
+BaseWriteTask.event_handler(luigi.Event.SUCCESS)(write_task_metrics)
@@ -0,0 +1,75 @@
+import json
+
+import hail as hl
+
+from v03_pipeline.lib.model import DatasetType, ReferenceGenome
+from v03_pipeline.lib.paths import (
+    metadata_for_run_path,
+    task_metrics_for_run_prefix,
+    vep_parameters_for_run_path,
+)
+from v03_pipeline.lib.tasks.files import GCSorLocalTarget
+
+
+def read_task_metrics_for_run(
+    reference_genome: ReferenceGenome,
+    dataset_type: DatasetType,
+    run_id: str,
+) -> dict[str, dict]:
+    prefix = task_metrics_for_run_prefix(reference_genome, dataset_type, run_id)
+    if not hl.hadoop_exists(prefix):
+        return {}
+    task_metrics = {}
+    for f in hl.hadoop_ls(prefix):
+        with hl.hadoop_open(f['path']) as fd:
+            metrics = json.load(fd)
+        task_metrics[metrics['task_id']] = metrics
+    return task_metrics
+
+
+def read_vep_parameters_for_run(
+    reference_genome: ReferenceGenome,
+    dataset_type: DatasetType,
+    run_id: str,
+) -> dict | None:
+    path = vep_parameters_for_run_path(reference_genome, dataset_type, run_id)
+    if not hl.hadoop_exists(path):
+        return None
+    with hl.hadoop_open(path) as f:
+        return json.load(f)
+
+
+def refresh_metadata_for_run(
+    reference_genome: ReferenceGenome,
+    dataset_type: DatasetType,
+    run_id: str,
+) -> None:
+    # The run metadata is written by WriteMetadataForRunTask with what has
+    # been recorded so far, and refreshed by every task that records more
+    # after it.  The task metrics and VEP parameters are always rebuilt from
+    # their own files and re-read once written, so a refresh from an older
+    # listing that lands last is followed by another.
+    path = metadata_for_run_path(reference_genome, dataset_type, run_id)
+    if not hl.hadoop_exists(path):
+        return
+    recorded = None
+    while True:
+        latest = {
+            'tasks': read_task_metrics_for_run(
+                reference_genome,
+                dataset_type,
+                run_id,
+            ),
+            'vep_parameters': read_vep_parameters_for_run(
+                reference_genome,
+                dataset_type,
+                run_id,
+            ),
+        }
+        if latest == recorded:
+            return
+        with hl.hadoop_open(path) as f:
+            metadata_json = json.load(f)
+        with GCSorLocalTarget(path).open('w') as f:
+            json.dump({**metadata_json, **latest}, f)
+        recorded = latest
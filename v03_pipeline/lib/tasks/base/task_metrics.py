@@ -0,0 +1,90 @@
+import json
+import os
+import time
+
+import hail as hl
+import luigi
+from luigi.task import flatten
+
+from v03_pipeline.lib.misc.io import file_size_bytes
+from v03_pipeline.lib.misc.spark_metrics import (
+    completed_spark_stages,
+    spark_stage_metrics_since,
+)
+from v03_pipeline.lib.paths import task_metrics_for_run_prefix
+from v03_pipeline.lib.tasks.base.run_metadata import refresh_metadata_for_run
+from v03_pipeline.lib.tasks.files import GCSorLocalFolderTarget, GCSorLocalTarget
+
+
+def hail_table_metrics(path: str) -> dict:
+    # Row and partition counts are read from the table metadata, so
+    # nothing is scanned.
+    if path.endswith('mt'):
+        t = hl.read_matrix_table(path)
+        return {'path': path, 'rows': t.count_rows(), 'partitions': t.n_partitions()}
+    if path.endswith('ht'):
+        t = hl.read_table(path)
+        return {'path': path, 'rows': t.count(), 'partitions': t.n_partitions()}
+    return {'path': path, 'rows': None, 'partitions': None}
+
+
+def _existing_hail_table_metrics(targets: list[luigi.Target]) -> list[dict]:
+    return [
+        hail_table_metrics(target.path)
+        for target in targets
+        if target.path.endswith(('ht', 'mt'))
+        and GCSorLocalFolderTarget(target.path).exists()
+    ]
+
+
+def task_metrics_path(task: luigi.Task) -> str:
+    return os.path.join(
+        task_metrics_for_run_prefix(
+            task.reference_genome,
+            task.dataset_type,
+            task.run_id,
+        ),
+        f'{task.task_id}.json',
+    )
+
+
+def record_task_start(task: luigi.Task, reads_output: bool = False) -> None:
+    # Update tasks read their existing output table, so it is counted as an
+    # input along with the outputs of their requirements.
+    if task.run_id is None:
+        return
+    task.init_hail()
+    targets = flatten(task.input())
+    if reads_output:
+        targets = [*targets, *flatten(task.output())]
+    task.task_metrics_start = {
+        'inputs': _existing_hail_table_metrics(targets),
+        'spark_stages': completed_spark_stages(),
+        'time': time.perf_counter(),
+    }
+
+
+def write_task_metrics(task: luigi.Task) -> None:
+    # Each task writes only its own metrics file, so concurrent tasks never
+    # write the same file; the run metadata is rebuilt from all of them.
+    start = getattr(task, 'task_metrics_start', None)
+    if start is None:
+        return
+    metrics = {
+        'task_id': task.task_id,
+        'task_family': task.get_task_family(),
+        'wall_time_seconds': time.perf_counter() - start['time'],
+        'inputs': start['inputs'],
+        'outputs': [
+            {
+                **hail_table_metrics(target.path),
+                'bytes_written': file_size_bytes(target.path),
+            }
+            for target in flatten(task.output())
+            if target.exists()
+        ],
+        'spark': spark_stage_metrics_since(start['spark_stages']),
+    }
+    with GCSorLocalTarget(task_metrics_path(task)).open('w') as f:
+        json.dump(metrics, f)
+    refresh_metadata_for_run(task.reference_genome, task.dataset_type, task.run_id)
@@ -2,11 +2,18 @@ import hail as hl
 import luigi
 
 from v03_pipeline.lib.annotations.fields import get_fields
+from v03_pipeline.lib.misc.callset_view import read_remapped_and_subsetted_callset
 from v03_pipeline.lib.misc.sample_entries import (
+    densify_entries,
     filter_callset_entries,
+    filter_callset_sparse_entries,
     globalize_sample_ids,
+    has_sparse_entries,
     join_entries_hts,
+    join_sparse_entries_hts,
+    sparsify_entries,
 )
+from v03_pipeline.lib.model import Env
 from v03_pipeline.lib.paths import project_table_path
 from v03_pipeline.lib.tasks.base.base_update_task import BaseUpdateTask
 from v03_pipeline.lib.tasks.files import GCSorLocalTarget
@@ -65,6 +72,7 @@ class UpdateProjectTableTask(BaseUpdateTask):
             self.ignore_missing_samples_when_subsetting,
             self.ignore_missing_samples_when_remapping,
             self.validate,
+            run_id=self.run_id,
         )
 
     def initialize_table(self) -> hl.Table:
@@ -85,7 +93,7 @@ class UpdateProjectTableTask(BaseUpdateTask):
         )
 
     def update_table(self, ht: hl.Table) -> hl.Table:
-        callset_mt = hl.read_matrix_table(self.input().path)
+        callset_mt = read_remapped_and_subsetted_callset(self.input().path)
         callset_ht = callset_mt.select_rows(
             filters=callset_mt.filters.difference(self.dataset_type.excluded_filters),
             entries=hl.sorted(
@@ -106,14 +114,24 @@ class UpdateProjectTableTask(BaseUpdateTask):
             callset_ht.entries.any(self.dataset_type.sample_entries_filter_fn),
         )
         callset_ht = globalize_sample_ids(callset_ht)
+        if Env.SPARSE_ENTRIES:
+            callset_ht = sparsify_entries(callset_ht)
         # HACK: steal the type from callset_ht when ht is empty.
         # This was the least gross way
         if 'entries' not in ht.row_value:
             ht = ht.annotate(
                 entries=hl.empty_array(callset_ht.entries.dtype.element_type),
             )
-        ht = filter_callset_entries(ht, callset_mt.cols())
-        ht = join_entries_hts(ht, callset_ht)
+        elif has_sparse_entries(ht) and not Env.SPARSE_ENTRIES:
+            ht = densify_entries(ht)
+        elif not has_sparse_entries(ht) and Env.SPARSE_ENTRIES:
+            ht = sparsify_entries(ht)
+        if Env.SPARSE_ENTRIES:
+            ht = filter_callset_sparse_entries(ht, callset_mt.cols())
+            ht = join_sparse_entries_hts(ht, callset_ht)
+        else:
+            ht = filter_callset_entries(ht, callset_mt.cols())
+            ht = join_entries_hts(ht, callset_ht)
         return ht.select_globals(
             sample_ids=ht.sample_ids,
             sample_type=self.sample_type.value,
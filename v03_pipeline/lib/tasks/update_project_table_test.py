@@ -1,6 +1,9 @@
+from unittest.mock import Mock, patch
+
 import hail as hl
 import luigi.worker
 
+from v03_pipeline.lib.misc.sample_entries import densify_entries
 from v03_pipeline.lib.model import DatasetType, ReferenceGenome, SampleType
 from v03_pipeline.lib.tasks.update_project_table import UpdateProjectTableTask
 from v03_pipeline.lib.test.mocked_dataroot_testcase import MockedDatarootTestCase
@@ -11,7 +14,9 @@ TEST_PEDIGREE_3 = 'v03_pipeline/var/test/pedigrees/test_pedigree_3.tsv'
 
 
 class UpdateProjectTableTaskTest(MockedDatarootTestCase):
-    def test_update_project_table_task(self) -> None:
+    @patch('v03_pipeline.lib.tasks.update_project_table.Env')
+    def test_update_project_table_task(self, mock_env: Mock) -> None:
+        mock_env.SPARSE_ENTRIES = False
         worker = luigi.worker.Worker()
         upt_task = UpdateProjectTableTask(
             reference_genome=ReferenceGenome.GRCh38,
@@ -101,3 +106,73 @@ class UpdateProjectTableTaskTest(MockedDatarootTestCase):
                 ),
             ],
         )
+
+    @patch('v03_pipeline.lib.tasks.update_project_table.Env')
+    def test_update_project_table_task_sparse_entries(self, mock_env: Mock) -> None:
+        mock_env.SPARSE_ENTRIES = True
+        worker = luigi.worker.Worker()
+        upt_task = UpdateProjectTableTask(
+            reference_genome=ReferenceGenome.GRCh38,
+            dataset_type=DatasetType.SNV_INDEL,
+            sample_type=SampleType.WGS,
+            callset_path=TEST_VCF,
+            project_guid='R0113_test_project',
+            project_remap_path=TEST_REMAP,
+            project_pedigree_path=TEST_PEDIGREE_3,
+            validate=False,
+        )
+        worker.add(upt_task)
+        worker.run()
+        self.assertTrue(upt_task.complete())
+        ht = hl.read_table(upt_task.output().path)
+        # Reference calls are kept whole.
+        self.assertCountEqual(
+            ht.entries.collect()[1],
+            [
+                hl.Struct(
+                    sample_index=0,
+                    GQ=30,
+                    AB=0.3333333333333333,
+                    DP=3,
+                    GT=hl.Call(alleles=[0, 1], phased=False),
+                ),
+                hl.Struct(
+                    sample_index=1,
+                    GQ=6,
+                    AB=0.0,
+                    DP=2,
+                    GT=hl.Call(alleles=[0, 0], phased=False),
+                ),
+                hl.Struct(
+                    sample_index=2,
+                    GQ=61,
+                    AB=0.6,
+                    DP=5,
+                    GT=hl.Call(alleles=[0, 1], phased=False),
+                ),
+            ],
+        )
+        ht = densify_entries(ht)
+        self.assertCountEqual(
+            ht.entries.collect()[1],
+            [
+                hl.Struct(
+                    GQ=30,
+                    AB=0.3333333333333333,
+                    DP=3,
+                    GT=hl.Call(alleles=[0, 1], phased=False),
+                ),
+                hl.Struct(
+                    GQ=6,
+                    AB=0.0,
+                    DP=2,
+                    GT=hl.Call(alleles=[0, 0], phased=False),
+                ),
+                hl.Struct(
+                    GQ=61,
+                    AB=0.6,
+                    DP=5,
+                    GT=hl.Call(alleles=[0, 1], phased=False),
+                ),
+            ],
+        )
@@ -1,16 +1,24 @@
 import hail as hl
 import luigi
 
+from v03_pipeline.lib.misc.callset_view import read_remapped_and_subsetted_callset
+from v03_pipeline.lib.misc.io import checkpoint
 from v03_pipeline.lib.misc.sample_lookup import (
-    compute_callset_sample_lookup_ht,
+    compute_callset_sample_lookup_ht_for_projects,
     filter_callset_sample_ids,
-    join_sample_lookup_hts,
+    initialize_sample_lookup_ht,
+    is_indexed_sample_lookup_ht,
+    join_sample_lookup_hts_for_projects,
 )
+from v03_pipeline.lib.model import Env
 from v03_pipeline.lib.paths import sample_lookup_table_path
 from v03_pipeline.lib.tasks.base.base_update_task import BaseUpdateTask
 from v03_pipeline.lib.tasks.files import GCSorLocalTarget
-from v03_pipeline.lib.tasks.write_remapped_and_subsetted_callset import (
-    WriteRemappedAndSubsettedCallsetTask,
+from v03_pipeline.lib.tasks.write_remapped_and_subsetted_callsets import (
+    WriteRemappedAndSubsettedCallsetsTask,
+)
+from v03_pipeline.lib.tasks.write_sample_lookup_delta_table import (
+    WriteSampleLookupDeltaTableTask,
 )
 
 
@@ -60,65 +68,94 @@ class UpdateSampleLookupTableTask(BaseUpdateTask):
 
     def requires(self) -> luigi.Task:
         return [
-            WriteRemappedAndSubsettedCallsetTask(
+            WriteRemappedAndSubsettedCallsetsTask(
                 self.reference_genome,
                 self.dataset_type,
                 self.sample_type,
                 self.callset_path,
-                project_guid,
-                project_remap_path,
-                project_pedigree_path,
+                self.project_guids,
+                self.project_remap_paths,
+                self.project_pedigree_paths,
                 self.ignore_missing_samples_when_subsetting,
                 self.ignore_missing_samples_when_remapping,
                 self.validate,
-            )
-            for (project_guid, project_remap_path, project_pedigree_path) in zip(
+                run_id=self.run_id,
+            ),
+            *self.sample_lookup_delta_table_tasks(),
+        ]
+
+    def sample_lookup_delta_table_tasks(
+        self,
+    ) -> list[WriteSampleLookupDeltaTableTask]:
+        # The delta of a run is written before the table is updated, so the
+        # variant annotations table can apply only the changed rows.
+        if self.run_id is None:
+            return []
+        return [
+            WriteSampleLookupDeltaTableTask(
+                self.reference_genome,
+                self.dataset_type,
+                self.sample_type,
+                self.callset_path,
                 self.project_guids,
                 self.project_remap_paths,
                 self.project_pedigree_paths,
-                strict=True,
-            )
+                self.ignore_missing_samples_when_subsetting,
+                self.ignore_missing_samples_when_remapping,
+                self.validate,
+                run_id=self.run_id,
+            ),
         ]
 
     def initialize_table(self) -> hl.Table:
-        key_type = self.dataset_type.table_key_type(self.reference_genome)
-        return hl.Table.parallelize(
-            [],
-            hl.tstruct(
-                **key_type,
-                **{
-                    field: hl.tstruct()
-                    for field in self.dataset_type.sample_lookup_table_fields_and_genotype_filter_fns
-                },
-            ),
-            key=key_type.fields,
-            globals=hl.Struct(
-                updates=hl.empty_set(hl.tstruct(callset=hl.tstr, project_guid=hl.tstr)),
-            ),
+        return initialize_sample_lookup_ht(
+            self.reference_genome,
+            self.dataset_type,
+            Env.INDEX_SAMPLE_LOOKUP_TABLE,
         )
 
     def update_table(self, ht: hl.Table) -> hl.Table:
-        for i, project_guid in enumerate(self.project_guids):
-            callset_mt = hl.read_matrix_table(self.input()[i].path)
+        # NB: the per-project callset lookups are merged with each other
+        # and then with the sample lookup table in a single join, rather
+        # than one full table join per project.
+        (
+            callset_sample_lookup_ht,
+            sample_subset_hts,
+        ) = compute_callset_sample_lookup_ht_for_projects(
+            self.dataset_type,
+            ht,
+            {
+                project_guid: read_remapped_and_subsetted_callset(
+                    self.input()[0][i].path,
+                )
+                for i, project_guid in enumerate(self.project_guids)
+            },
+        )
+        callset_sample_lookup_ht, _ = checkpoint(callset_sample_lookup_ht)
+        for project_guid, sample_subset_ht in sample_subset_hts.items():
             ht = filter_callset_sample_ids(
                 self.dataset_type,
                 ht,
-                callset_mt.cols(),
+                sample_subset_ht,
                 project_guid,
             )
-            callset_sample_lookup_ht = compute_callset_sample_lookup_ht(
-                self.dataset_type,
-                callset_mt,
-            )
-            ht = join_sample_lookup_hts(
-                self.dataset_type,
-                ht,
-                callset_sample_lookup_ht,
-                project_guid,
-            )
-            ht = ht.select_globals(
-                updates=ht.updates.add(
-                    hl.Struct(callset=self.callset_path, project_guid=project_guid),
+        ht = join_sample_lookup_hts_for_projects(
+            self.dataset_type,
+            ht,
+            callset_sample_lookup_ht,
+        )
+        updates = ht.updates.union(
+            {
+                hl.Struct(callset=self.callset_path, project_guid=project_guid)
+                for project_guid in self.project_guids
+            },
+        )
+        if is_indexed_sample_lookup_ht(callset_sample_lookup_ht):
+            return ht.select_globals(
+                updates=updates,
+                sample_ids=hl.literal(
+                    hl.eval(callset_sample_lookup_ht.sample_ids),
+                    callset_sample_lookup_ht.sample_ids.dtype,
                 ),
             )
-        return ht
+        return ht.select_globals(updates=updates)
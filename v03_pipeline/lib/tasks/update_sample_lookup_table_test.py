@@ -1,3 +1,5 @@
+from unittest.mock import Mock, patch
+
 import hail as hl
 import luigi.worker
 
@@ -10,6 +12,7 @@ from v03_pipeline.lib.test.mocked_dataroot_testcase import MockedDatarootTestCas
 TEST_VCF = 'v03_pipeline/var/test/callsets/1kg_30variants.vcf'
 TEST_REMAP = 'v03_pipeline/var/test/remaps/test_remap_1.tsv'
 TEST_PEDIGREE_3 = 'v03_pipeline/var/test/pedigrees/test_pedigree_3.tsv'
+TEST_PEDIGREE_4 = 'v03_pipeline/var/test/pedigrees/test_pedigree_4.tsv'
 
 
 class UpdateSampleLookupTableTest(MockedDatarootTestCase):
@@ -186,3 +189,46 @@ class UpdateSampleLookupTableTest(MockedDatarootTestCase):
                 ),
             ],
         )
+
+    @patch('v03_pipeline.lib.tasks.update_sample_lookup_table.Env')
+    def test_update_indexed_sample_lookup_table_task(self, mock_env: Mock) -> None:
+        mock_env.INDEX_SAMPLE_LOOKUP_TABLE = True
+        worker = luigi.worker.Worker()
+        for project_guid, project_pedigree_path in [
+            ('R0113_test_project', TEST_PEDIGREE_3),
+            ('R0114_project4', TEST_PEDIGREE_4),
+        ]:
+            uslt_task = UpdateSampleLookupTableTask(
+                reference_genome=ReferenceGenome.GRCh38,
+                dataset_type=DatasetType.SNV_INDEL,
+                sample_type=SampleType.WGS,
+                callset_path=TEST_VCF,
+                project_guids=[project_guid],
+                project_remap_paths=[TEST_REMAP],
+                project_pedigree_paths=[project_pedigree_path],
+                validate=False,
+            )
+            worker.add(uslt_task)
+            worker.run()
+            self.assertTrue(uslt_task.complete())
+        ht = hl.read_table(uslt_task.output().path)
+        sample_ids = hl.eval(ht.sample_ids)
+        self.assertEqual(
+            sample_ids.R0113_test_project,
+            ['HG00731_1', 'HG00732_1', 'HG00733_1'],
+        )
+        self.assertEqual(len(sample_ids.R0114_project4), 13)
+        ht = ht.filter(ht.locus.position == 878314)  # noqa: PLR2004
+        self.assertEqual(
+            ht.ref_samples.collect(),
+            [
+                hl.Struct(
+                    R0113_test_project=[1],
+                    R0114_project4=[0, 1, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12],
+                ),
+            ],
+        )
+        self.assertEqual(
+            ht.het_samples.R0113_test_project.collect(),
+            [[0, 2]],
+        )
@@ -0,0 +1,142 @@
+import luigi
+
+from v03_pipeline.lib.tasks.update_sample_lookup_table import (
+    UpdateSampleLookupTableTask,
+)
+from v03_pipeline.lib.tasks.update_variant_annotations_table_with_new_samples import (
+    BaseUpdateVariantAnnotationsTableWithNewSamplesTask,
+)
+from v03_pipeline.lib.tasks.write_remapped_and_subsetted_callset import (
+    WriteRemappedAndSubsettedCallsetTask,
+)
+from v03_pipeline.lib.tasks.write_remapped_and_subsetted_callsets import (
+    WriteRemappedAndSubsettedCallsetsTask,
+)
+
+
+class UpdateVariantAnnotationsTableWithNewCallsetsTask(
+    BaseUpdateVariantAnnotationsTableWithNewSamplesTask,
+):
+    callset_paths = luigi.ListParameter()
+    project_guids = luigi.ListParameter(
+        description='A list of project guids for each callset.',
+    )
+    project_remap_paths = luigi.ListParameter(
+        description='A list of project remap paths for each callset.',
+    )
+    project_pedigree_paths = luigi.ListParameter(
+        description='A list of project pedigree paths for each callset.',
+    )
+
+    def callset_project_pairs(self) -> list[tuple[str, str]]:
+        return [
+            (callset_path, project_guid)
+            for callset_path, project_guids in zip(
+                self.callset_paths,
+                self.project_guids,
+                strict=True,
+            )
+            for project_guid in project_guids
+        ]
+
+    def callset_projects(self) -> list[tuple[str, list[str], list[str], list[str]]]:
+        return list(
+            zip(
+                self.callset_paths,
+                self.project_guids,
+                self.project_remap_paths,
+                self.project_pedigree_paths,
+                strict=True,
+            ),
+        )
+
+    def remapped_and_subsetted_callset_tasks(
+        self,
+    ) -> list[WriteRemappedAndSubsettedCallsetTask]:
+        return [
+            WriteRemappedAndSubsettedCallsetTask(
+                self.reference_genome,
+                self.dataset_type,
+                self.sample_type,
+                callset_path,
+                project_guid,
+                project_remap_path,
+                project_pedigree_path,
+                self.ignore_missing_samples_when_subsetting,
+                self.ignore_missing_samples_when_remapping,
+                self.validate,
+                run_id=self.run_id,
+            )
+            for (
+                callset_path,
+                project_guids,
+                project_remap_paths,
+                project_pedigree_paths,
+            ) in self.callset_projects()
+            for (project_guid, project_remap_path, project_pedigree_path) in zip(
+                project_guids,
+                project_remap_paths,
+                project_pedigree_paths,
+                strict=True,
+            )
+        ]
+
+    def sample_lookup_table_tasks(self) -> list[UpdateSampleLookupTableTask]:
+        return [
+            UpdateSampleLookupTableTask(
+                self.reference_genome,
+                self.dataset_type,
+                self.sample_type,
+                callset_path,
+                project_guids,
+                project_remap_paths,
+                project_pedigree_paths,
+                self.ignore_missing_samples_when_subsetting,
+                self.ignore_missing_samples_when_remapping,
+                self.validate,
+                run_id=self.run_id,
+            )
+            for (
+                callset_path,
+                project_guids,
+                project_remap_paths,
+                project_pedigree_paths,
+            ) in self.callset_projects()
+        ]
+
+    def requires(self) -> list[luigi.Task]:
+        return [
+            *super().requires(),
+            *[
+                WriteRemappedAndSubsettedCallsetsTask(
+                    self.reference_genome,
+                    self.dataset_type,
+                    self.sample_type,
+                    callset_path,
+                    project_guids,
+                    project_remap_paths,
+                    project_pedigree_paths,
+                    self.ignore_missing_samples_when_subsetting,
+                    self.ignore_missing_samples_when_remapping,
+                    self.validate,
+                    run_id=self.run_id,
+                )
+                for (
+                    callset_path,
+                    project_guids,
+                    project_remap_paths,
+                    project_pedigree_paths,
+                ) in self.callset_projects()
+            ],
+        ]
+
+    def run(self):
+        # NB: every sample lookup table task updates the same table, so they
+        # are run one at a time as dynamic dependencies rather than required
+        # up front, where luigi would be free to schedule them concurrently.
+        # A plain loop is used because luigi sends the outputs of each
+        # dynamic dependency back into the generator.
+        if self.dataset_type.has_sample_lookup_table:
+            for task in self.sample_lookup_table_tasks():  # noqa: UP028
+                yield task
+        super().run()
@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+from unittest.mock import Mock, patch
+
+import hail as hl
+import luigi.worker
+
+from v03_pipeline.lib.model import (
+    DatasetType,
+    ReferenceDatasetCollection,
+    ReferenceGenome,
+    SampleType,
+)
+from v03_pipeline.lib.paths import valid_reference_dataset_collection_path
+from v03_pipeline.lib.tasks.update_variant_annotations_table_with_new_callsets import (
+    UpdateVariantAnnotationsTableWithNewCallsetsTask,
+)
+from v03_pipeline.lib.test.mocked_dataroot_testcase import MockedDatarootTestCase
+from v03_pipeline.var.test.vep.mock_vep_data import MOCK_VEP_DATA
+
+TEST_LIFTOVER = 'v03_pipeline/var/test/liftover/grch38_to_grch37.over.chain.gz'
+TEST_SNV_INDEL_VCF = 'v03_pipeline/var/test/callsets/1kg_30variants.vcf'
+TEST_REMAP = 'v03_pipeline/var/test/remaps/test_remap_1.tsv'
+TEST_PEDIGREE_3 = 'v03_pipeline/var/test/pedigrees/test_pedigree_3.tsv'
+TEST_PEDIGREE_4 = 'v03_pipeline/var/test/pedigrees/test_pedigree_4.tsv'
+TEST_COMBINED_1 = 'v03_pipeline/var/test/reference_data/test_combined_1.ht'
+TEST_HGMD_1 = 'v03_pipeline/var/test/reference_data/test_hgmd_1.ht'
+TEST_INTERVAL_1 = 'v03_pipeline/var/test/reference_data/test_interval_1.ht'
+
+
+class UpdateVariantAnnotationsTableWithNewCallsetsTaskTest(MockedDatarootTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        for rdc, path in [
+            (ReferenceDatasetCollection.COMBINED, TEST_COMBINED_1),
+            (ReferenceDatasetCollection.HGMD, TEST_HGMD_1),
+            (ReferenceDatasetCollection.INTERVAL, TEST_INTERVAL_1),
+        ]:
+            shutil.copytree(
+                path,
+                valid_reference_dataset_collection_path(
+                    ReferenceGenome.GRCh38,
+                    DatasetType.SNV_INDEL,
+                    rdc,
+                ),
+            )
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.recalled_vcf = os.path.join(self._temp_dir.name, 'recalled.vcf')
+        shutil.copy(TEST_SNV_INDEL_VCF, self.recalled_vcf)
+
+    def tearDown(self) -> None:
+        super().tearDown()
+        self._temp_dir.cleanup()
+
+    @patch('v03_pipeline.lib.vep.hl.vep')
+    def test_update_vat_with_new_callsets(self, mock_vep: Mock) -> None:
+        mock_vep.side_effect = lambda ht, **_: ht.annotate(vep=MOCK_VEP_DATA)
+        worker = luigi.worker.Worker()
+        uvatwnc_task = UpdateVariantAnnotationsTableWithNewCallsetsTask(
+            reference_genome=ReferenceGenome.GRCh38,
+            dataset_type=DatasetType.SNV_INDEL,
+            sample_type=SampleType.WGS,
+            callset_paths=[TEST_SNV_INDEL_VCF, self.recalled_vcf],
+            project_guids=[['R0113_test_project'], ['R0114_project4']],
+            project_remap_paths=[[TEST_REMAP], [TEST_REMAP]],
+            project_pedigree_paths=[[TEST_PEDIGREE_3], [TEST_PEDIGREE_4]],
+            validate=False,
+            liftover_ref_path=TEST_LIFTOVER,
+        )
+        worker.add(uvatwnc_task)
+        worker.run()
+        self.assertTrue(uvatwnc_task.complete())
+
+        # Both callsets share their variants, so VEP runs over them once.
+        self.assertEqual(mock_vep.call_count, 1)
+        ht = hl.read_table(uvatwnc_task.output().path)
+        self.assertEqual(ht.count(), 30)
+        self.assertEqual(
+            ht.filter(ht.locus.position == 871269).gt_stats.collect(),  # noqa: PLR2004
+            [hl.Struct(AC=1, AN=32, AF=0.03125, hom=0)],
+        )
+        self.assertEqual(
+            ht.globals.updates.collect(),
+            [
+                {
+                    hl.Struct(
+                        callset=TEST_SNV_INDEL_VCF,
+                        project_guid='R0113_test_project',
+                    ),
+                    hl.Struct(
+                        callset=self.recalled_vcf,
+                        project_guid='R0114_project4',
+                    ),
+                },
+            ],
+        )
@@ -1,38 +1,50 @@
+import dataclasses
 import functools
+import json
 import math
 
 import hail as hl
 import luigi
 
 from v03_pipeline.lib.annotations.enums import annotate_enums
-from v03_pipeline.lib.annotations.fields import get_fields
+from v03_pipeline.lib.annotations.fields import annotate_interval_matches, get_fields
+from v03_pipeline.lib.misc.callset_view import read_remapped_and_subsetted_callset
 from v03_pipeline.lib.model import ReferenceDatasetCollection
 from v03_pipeline.lib.paths import (
-    remapped_and_subsetted_callset_path,
+    sample_lookup_delta_table_path,
     sample_lookup_table_path,
     valid_reference_dataset_collection_path,
+    vep_parameters_for_run_path,
 )
 from v03_pipeline.lib.reference_data.gencode.mapping_gene_ids import load_gencode
 from v03_pipeline.lib.tasks.base.base_variant_annotations_table import (
     BaseVariantAnnotationsTableTask,
 )
+from v03_pipeline.lib.tasks.base.run_metadata import refresh_metadata_for_run
+from v03_pipeline.lib.tasks.files import GCSorLocalFolderTarget, GCSorLocalTarget
 from v03_pipeline.lib.tasks.update_sample_lookup_table import (
     UpdateSampleLookupTableTask,
 )
 from v03_pipeline.lib.tasks.write_remapped_and_subsetted_callset import (
     WriteRemappedAndSubsettedCallsetTask,
 )
-from v03_pipeline.lib.vep import run_vep
+from v03_pipeline.lib.tasks.write_remapped_and_subsetted_callsets import (
+    WriteRemappedAndSubsettedCallsetsTask,
+)
+from v03_pipeline.lib.vep import (
+    DEFAULT_VEP_BLOCK_SIZE,
+    VARIANTS_PER_VEP_PARTITION,
+    VEPParameters,
+    plan_vep,
+    run_vep,
+)
 
 GENCODE_RELEASE = 42
-VARIANTS_PER_VEP_PARTITION = 20e3
 
 
-class UpdateVariantAnnotationsTableWithNewSamplesTask(BaseVariantAnnotationsTableTask):
-    callset_path = luigi.Parameter()
-    project_guids = luigi.ListParameter()
-    project_remap_paths = luigi.ListParameter()
-    project_pedigree_paths = luigi.ListParameter()
+class BaseUpdateVariantAnnotationsTableWithNewSamplesTask(
+    BaseVariantAnnotationsTableTask,
+):
     ignore_missing_samples_when_subsetting = luigi.BoolParameter(
         default=False,
         parsing=luigi.BoolParameter.EXPLICIT_PARSING,
@@ -53,6 +65,30 @@ class UpdateVariantAnnotationsTableWithNewSamplesTask(BaseVariantAnnotationsTabl
         default=None,
         description='Path of hail vep config .json file',
     )
+    use_vep_cache = luigi.BoolParameter(
+        default=False,
+        parsing=luigi.BoolParameter.EXPLICIT_PARSING,
+        description='Re-use and extend the VEP annotations cached from previous loads.',
+    )
+    adaptive_vep_partitioning = luigi.BoolParameter(
+        default=False,
+        parsing=luigi.BoolParameter.EXPLICIT_PARSING,
+        description='Size VEP partitions and blocks from the measured per-variant cost.',
+    )
+
+    def callset_project_pairs(self) -> list[tuple[str, str]]:
+        raise NotImplementedError
+
+    def remapped_and_subsetted_callset_tasks(
+        self,
+    ) -> list[WriteRemappedAndSubsettedCallsetTask]:
+        raise NotImplementedError
+
+    def new_updates(self) -> set[hl.Struct]:
+        return {
+            hl.Struct(callset=callset_path, project_guid=project_guid)
+            for callset_path, project_guid in self.callset_project_pairs()
+        }
 
     def read_annotation_dependencies(self):
         annotation_dependencies = {}
@@ -81,78 +117,55 @@ class UpdateVariantAnnotationsTableWithNewSamplesTask(BaseVariantAnnotationsTabl
 
         return annotation_dependencies
 
-    def requires(self) -> list[luigi.Task]:
-        if self.dataset_type.has_sample_lookup_table:
-            # NB: the sample lookup table task has remapped and subsetted callset tasks as dependencies.
-            upstream_table_tasks = [
-                UpdateSampleLookupTableTask(
-                    self.reference_genome,
-                    self.dataset_type,
-                    self.sample_type,
-                    self.callset_path,
-                    self.project_guids,
-                    self.project_remap_paths,
-                    self.project_pedigree_paths,
-                    self.ignore_missing_samples_when_subsetting,
-                    self.ignore_missing_samples_when_remapping,
-                    self.validate,
-                ),
-            ]
-        else:
-            upstream_table_tasks = [
-                WriteRemappedAndSubsettedCallsetTask(
-                    self.reference_genome,
-                    self.dataset_type,
-                    self.sample_type,
-                    self.callset_path,
-                    project_guid,
-                    project_remap_path,
-                    project_pedigree_path,
-                    self.ignore_missing_samples_when_subsetting,
-                    self.ignore_missing_samples_when_remapping,
-                    self.validate,
-                )
-                for (project_guid, project_remap_path, project_pedigree_path) in zip(
-                    self.project_guids,
-                    self.project_remap_paths,
-                    self.project_pedigree_paths,
-                    strict=True,
-                )
-            ]
-        return [
-            *super().requires(),
-            *upstream_table_tasks,
-        ]
-
     def complete(self) -> bool:
         return super().complete() and hl.eval(
             hl.bind(
                 lambda updates: hl.all(
-                    [
-                        updates.contains(
-                            hl.Struct(
-                                callset=self.callset_path,
-                                project_guid=project_guid,
-                            ),
-                        )
-                        for project_guid in self.project_guids
-                    ],
+                    [updates.contains(update) for update in self.new_updates()],
                 ),
                 hl.read_table(self.output().path).updates,
             ),
         )
 
+    def sample_lookup_delta_path(self) -> str | None:
+        return None
+
+    def can_apply_sample_lookup_delta(self, ht: hl.Table) -> bool:
+        sample_lookup_delta_path = self.sample_lookup_delta_path()
+        if (
+            sample_lookup_delta_path is None
+            or 'gt_stats' not in ht.row
+            or not GCSorLocalFolderTarget(
+                sample_lookup_delta_path,
+            ).exists()
+        ):
+            return False
+        sample_lookup_delta_ht = hl.read_table(sample_lookup_delta_path)
+        updates = hl.eval(ht.updates)
+        return (
+            hl.eval(sample_lookup_delta_ht.previous_updates) == updates
+            and hl.eval(sample_lookup_delta_ht.updates) == updates | self.new_updates()
+        )
+
+    def write_vep_parameters(self, vep_parameters: VEPParameters) -> None:
+        with GCSorLocalTarget(
+            vep_parameters_for_run_path(
+                self.reference_genome,
+                self.dataset_type,
+                self.run_id,
+            ),
+        ).open('w') as f:
+            json.dump(dataclasses.asdict(vep_parameters), f)
+        refresh_metadata_for_run(
+            self.reference_genome,
+            self.dataset_type,
+            self.run_id,
+        )
+
     def update_table(self, ht: hl.Table) -> hl.Table:
         callset_hts = [
-            hl.read_matrix_table(
-                remapped_and_subsetted_callset_path(
-                    self.reference_genome,
-                    self.dataset_type,
-                    self.callset_path,
-                    project_guid,
-                ),
-            ).rows()
-            for project_guid in self.project_guids
+            read_remapped_and_subsetted_callset(task.output().path).rows()
+            for task in self.remapped_and_subsetted_callset_tasks()
         ]
         callset_ht = functools.reduce(
             (lambda ht1, ht2: ht1.union(ht2, unify=True)),
@@ -168,18 +181,40 @@ class UpdateVariantAnnotationsTableWithNewSamplesTask(BaseVariantAnnotationsTabl
         # will under-partition in that regard, so we split up our work
         # with a partitioning scheme local to this task.
         new_variants_ht = callset_ht.anti_join(ht)
-        new_variants_count = new_variants_ht.count()
-        new_variants_ht = new_variants_ht.repartition(
-            max(math.ceil(new_variants_count / VARIANTS_PER_VEP_PARTITION), 1),
-        )
+        vep_block_size = DEFAULT_VEP_BLOCK_SIZE
+        if self.adaptive_vep_partitioning and self.dataset_type.veppable:
+            # A sample of each variant class is sent through VEP first, and
+            # the variants are split into enough partitions that none should
+            # take much longer than the per-partition VEP time target.
+            new_variants_ht, vep_parameters = plan_vep(
+                new_variants_ht,
+                self.vep_config_json_path,
+            )
+            vep_block_size = vep_parameters.block_size
+            if self.run_id is not None:
+                self.write_vep_parameters(vep_parameters)
+        else:
+            new_variants_count = new_variants_ht.count()
+            new_variants_ht = new_variants_ht.repartition(
+                max(math.ceil(new_variants_count / VARIANTS_PER_VEP_PARTITION), 1),
+            )
         new_variants_ht = run_vep(
             new_variants_ht,
             self.dataset_type,
             self.vep_config_json_path,
+            self.reference_genome,
+            self.use_vep_cache,
+            vep_block_size,
         )
 
         # 2) Select down to the formatting annotations fields and
-        # any reference dataset collection annotations.
+        # any reference dataset collection annotations.  The interval
+        # reference data is joined once and shared by all of its fields.
+        if 'interval_ht' in annotation_dependencies:
+            new_variants_ht = annotate_interval_matches(
+                new_variants_ht,
+                annotation_dependencies['interval_ht'],
+            )
         new_variants_ht = new_variants_ht.select(
             **get_fields(
                 new_variants_ht,
@@ -197,7 +232,16 @@ class UpdateVariantAnnotationsTableWithNewSamplesTask(BaseVariantAnnotationsTabl
             new_variants_ht = new_variants_ht.join(rdc_ht, 'left')
 
         # 4) Union with the existing variant annotations table
-        # and annotate with the sample lookup table.
+        # and annotate with the sample lookup table.  If this table reflects
+        # the sample lookup table prior to its latest update, only the
+        # per-variant changes from that update are applied.
+        if (
+            self.dataset_type.has_sample_lookup_table
+            and self.can_apply_sample_lookup_delta(ht)
+        ):
+            annotation_dependencies['sample_lookup_delta_ht'] = hl.read_table(
+                self.sample_lookup_delta_path(),
+            )
         ht = ht.union(new_variants_ht, unify=True)
         if self.dataset_type.has_sample_lookup_table:
             ht = ht.annotate(
@@ -235,11 +279,93 @@ class UpdateVariantAnnotationsTableWithNewSamplesTask(BaseVariantAnnotationsTabl
         ht = annotate_enums(ht, self.dataset_type)
 
         # 6) Mark the table as updated with these callset/project pairs.
-        return ht.annotate_globals(
-            updates=ht.updates.union(
-                {
-                    hl.Struct(callset=self.callset_path, project_guid=project_guid)
-                    for project_guid in self.project_guids
-                },
-            ),
+        return ht.annotate_globals(updates=ht.updates.union(self.new_updates()))
+
+
+class UpdateVariantAnnotationsTableWithNewSamplesTask(
+    BaseUpdateVariantAnnotationsTableWithNewSamplesTask,
+):
+    callset_path = luigi.Parameter()
+    project_guids = luigi.ListParameter()
+    project_remap_paths = luigi.ListParameter()
+    project_pedigree_paths = luigi.ListParameter()
+
+    def callset_project_pairs(self) -> list[tuple[str, str]]:
+        return [
+            (self.callset_path, project_guid) for project_guid in self.project_guids
+        ]
+
+    def sample_lookup_delta_path(self) -> str | None:
+        # The delta is written by the sample lookup table update of this run.
+        if self.run_id is None:
+            return None
+        return sample_lookup_delta_table_path(
+            self.reference_genome,
+            self.dataset_type,
+            self.run_id,
+            self.callset_path,
         )
+
+    def remapped_and_subsetted_callset_tasks(
+        self,
+    ) -> list[WriteRemappedAndSubsettedCallsetTask]:
+        return [
+            WriteRemappedAndSubsettedCallsetTask(
+                self.reference_genome,
+                self.dataset_type,
+                self.sample_type,
+                self.callset_path,
+                project_guid,
+                project_remap_path,
+                project_pedigree_path,
+                self.ignore_missing_samples_when_subsetting,
+                self.ignore_missing_samples_when_remapping,
+                self.validate,
+                run_id=self.run_id,
+            )
+            for (project_guid, project_remap_path, project_pedigree_path) in zip(
+                self.project_guids,
+                self.project_remap_paths,
+                self.project_pedigree_paths,
+                strict=True,
+            )
+        ]
+
+    def requires(self) -> list[luigi.Task]:
+        if self.dataset_type.has_sample_lookup_table:
+            # NB: the sample lookup table task has remapped and subsetted callset tasks as dependencies.
+            upstream_table_tasks = [
+                UpdateSampleLookupTableTask(
+                    self.reference_genome,
+                    self.dataset_type,
+                    self.sample_type,
+                    self.callset_path,
+                    self.project_guids,
+                    self.project_remap_paths,
+                    self.project_pedigree_paths,
+                    self.ignore_missing_samples_when_subsetting,
+                    self.ignore_missing_samples_when_remapping,
+                    self.validate,
+                    run_id=self.run_id,
+                ),
+            ]
+        else:
+            upstream_table_tasks = [
+                WriteRemappedAndSubsettedCallsetsTask(
+                    self.reference_genome,
+                    self.dataset_type,
+                    self.sample_type,
+                    self.callset_path,
+                    self.project_guids,
+                    self.project_remap_paths,
+                    self.project_pedigree_paths,
+                    self.ignore_missing_samples_when_subsetting,
+                    self.ignore_missing_samples_when_remapping,
+                    self.validate,
+                    run_id=self.run_id,
+                ),
+            ]
+        return [
+            *super().requires(),
+            *upstream_table_tasks,
+        ]
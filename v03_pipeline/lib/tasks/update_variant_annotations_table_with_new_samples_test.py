@@ -1,3 +1,5 @@
+import json
+import os
 import shutil
 from functools import partial
 from unittest.mock import Mock, PropertyMock, patch
@@ -23,8 +25,10 @@ from v03_pipeline.lib.model import (
     SampleType,
 )
 from v03_pipeline.lib.paths import (
+    metadata_for_run_path,
     valid_cached_reference_dataset_query_path,
     valid_reference_dataset_collection_path,
+    vep_parameters_for_run_path,
 )
 from v03_pipeline.lib.reference_data.clinvar import (
     CLINVAR_ASSERTIONS,
@@ -268,10 +272,16 @@ class UpdateVariantAnnotationsTableWithNewSamplesTaskTest(MockedDatarootTestCase
             project_pedigree_paths=[TEST_PEDIGREE_4],
             validate=True,
             liftover_ref_path=TEST_LIFTOVER,
+            run_id='run_4',
         )
         worker.add(uvatwns_task_4)
         worker.run()
         self.assertTrue(uvatwns_task_4.complete())
+        # The sample lookup update of the run wrote its delta, which this
+        # update applied to gt_stats.
+        self.assertTrue(
+            GCSorLocalFolderTarget(uvatwns_task_4.sample_lookup_delta_path()).exists(),
+        )
         ht = hl.read_table(uvatwns_task_4.output().path)
         self.assertCountEqual(
             [
@@ -441,6 +451,64 @@ class UpdateVariantAnnotationsTableWithNewSamplesTaskTest(MockedDatarootTestCase
             ],
         )
 
+    @patch('v03_pipeline.lib.vep.hl.vep')
+    def test_update_vat_adaptive_vep_partitioning(self, mock_vep: Mock) -> None:
+        mock_vep.side_effect = lambda ht, **_: ht.annotate(vep=MOCK_VEP_DATA)
+        worker = luigi.worker.Worker()
+        uvatwns_task = UpdateVariantAnnotationsTableWithNewSamplesTask(
+            reference_genome=ReferenceGenome.GRCh38,
+            dataset_type=DatasetType.SNV_INDEL,
+            sample_type=SampleType.WGS,
+            callset_path=TEST_SNV_INDEL_VCF,
+            project_guids=['R0113_test_project'],
+            project_remap_paths=[TEST_REMAP],
+            project_pedigree_paths=[TEST_PEDIGREE_3],
+            validate=False,
+            liftover_ref_path=TEST_LIFTOVER,
+            adaptive_vep_partitioning=True,
+            run_id='run_123456',
+        )
+        metadata_path = metadata_for_run_path(
+            ReferenceGenome.GRCh38,
+            DatasetType.SNV_INDEL,
+            'run_123456',
+        )
+        os.makedirs(os.path.dirname(metadata_path))
+        with open(metadata_path, 'w') as f:
+            json.dump({'run_id': 'run_123456'}, f)
+        worker.add(uvatwns_task)
+        worker.run()
+        self.assertTrue(uvatwns_task.complete())
+        ht = hl.read_table(uvatwns_task.output().path)
+        self.assertEqual(ht.count(), 30)
+        with open(
+            vep_parameters_for_run_path(
+                ReferenceGenome.GRCh38,
+                DatasetType.SNV_INDEL,
+                'run_123456',
+            ),
+        ) as f:
+            vep_parameters = json.load(f)
+        self.assertEqual(sum(vep_parameters['variant_counts'].values()), 30)
+        self.assertCountEqual(
+            vep_parameters.keys(),
+            ['n_partitions', 'block_size', 'seconds_per_variant', 'variant_counts'],
+        )
+        # A startup run, one sample per variant class, then the full run.
+        self.assertEqual(
+            mock_vep.call_count,
+            len(vep_parameters['variant_counts']) + 2,
+        )
+        self.assertEqual(
+            mock_vep.call_args.kwargs['block_size'],
+            vep_parameters['block_size'],
+        )
+        # The parameters are also recorded in the run metadata.
+        with open(metadata_path) as f:
+            metadata_json = json.load(f)
+        self.assertEqual(metadata_json['run_id'], 'run_123456')
+        self.assertEqual(metadata_json['vep_parameters'], vep_parameters)
+
     def test_mito_update_vat(self) -> None:
         worker = luigi.worker.Worker()
         update_variant_annotations_task = (
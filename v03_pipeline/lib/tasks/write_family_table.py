@@ -1,11 +1,14 @@
+from typing import Any
+
 import hail as hl
 import luigi
 
 from v03_pipeline.lib.annotations.fields import get_fields
-from v03_pipeline.lib.misc.io import import_pedigree
-from v03_pipeline.lib.misc.pedigree import parse_pedigree_ht_to_families
+from v03_pipeline.lib.misc.callset_view import read_remapped_and_subsetted_callset
+from v03_pipeline.lib.misc.pedigree import load_pedigree_families
 from v03_pipeline.lib.misc.sample_entries import globalize_sample_ids
 from v03_pipeline.lib.misc.sample_ids import subset_samples
+from v03_pipeline.lib.model import DatasetType
 from v03_pipeline.lib.paths import family_table_path
 from v03_pipeline.lib.tasks.base.base_write_task import BaseWriteTask
 from v03_pipeline.lib.tasks.files import GCSorLocalTarget
@@ -14,6 +17,29 @@ from v03_pipeline.lib.tasks.write_remapped_and_subsetted_callset import (
 )
 
 
+def compute_callset_family_entries_ht(
+    dataset_type: DatasetType,
+    callset_mt: hl.MatrixTable,
+    param_kwargs: dict[str, Any],
+) -> hl.Table:
+    return callset_mt.select_rows(
+        filters=callset_mt.filters.difference(dataset_type.excluded_filters),
+        entries=hl.sorted(
+            hl.agg.collect(
+                hl.struct(
+                    s=callset_mt.s,
+                    **get_fields(
+                        callset_mt,
+                        dataset_type.genotype_entry_annotation_fns,
+                        **param_kwargs,
+                    ),
+                ),
+            ),
+            key=lambda e: e.s,
+        ),
+    ).rows()
+
+
 class WriteFamilyTableTask(BaseWriteTask):
     callset_path = luigi.Parameter()
     project_guid = luigi.Parameter()
@@ -63,12 +89,12 @@ class WriteFamilyTableTask(BaseWriteTask):
             self.ignore_missing_samples_when_subsetting,
             self.ignore_missing_samples_when_remapping,
             self.validate,
+            run_id=self.run_id,
         )
 
     def create_table(self) -> hl.Table:
-        callset_mt = hl.read_matrix_table(self.input().path)
-        pedigree_ht = import_pedigree(self.project_pedigree_path)
-        families = parse_pedigree_ht_to_families(pedigree_ht)
+        callset_mt = read_remapped_and_subsetted_callset(self.input().path)
+        families = load_pedigree_families(self.project_pedigree_path)
         family = next(
             iter(
                 family for family in families if family.family_guid == self.family_guid
@@ -83,22 +109,11 @@ class WriteFamilyTableTask(BaseWriteTask):
             ),
             False,
         )
-        ht = callset_mt.select_rows(
-            filters=callset_mt.filters.difference(self.dataset_type.excluded_filters),
-            entries=hl.sorted(
-                hl.agg.collect(
-                    hl.struct(
-                        s=callset_mt.s,
-                        **get_fields(
-                            callset_mt,
-                            self.dataset_type.genotype_entry_annotation_fns,
-                            **self.param_kwargs,
-                        ),
-                    ),
-                ),
-                key=lambda e: e.s,
-            ),
-        ).rows()
+        ht = compute_callset_family_entries_ht(
+            self.dataset_type,
+            callset_mt,
+            self.param_kwargs,
+        )
         ht = ht.filter(ht.entries.any(self.dataset_type.sample_entries_filter_fn))
         ht = globalize_sample_ids(ht)
         return ht.select_globals(
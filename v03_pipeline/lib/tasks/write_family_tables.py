@@ -0,0 +1,202 @@
+import math
+
+import hail as hl
+import luigi
+
+from v03_pipeline.lib.misc.callset_view import read_remapped_and_subsetted_callset
+from v03_pipeline.lib.misc.io import (
+    checkpoint,
+    compute_hail_n_partitions,
+    file_size_bytes,
+)
+from v03_pipeline.lib.misc.pedigree import Family, load_pedigree_families
+from v03_pipeline.lib.misc.sample_entries import globalize_sample_ids
+from v03_pipeline.lib.misc.sample_ids import subset_samples
+from v03_pipeline.lib.tasks.base.base_write_task import BaseWriteTask
+from v03_pipeline.lib.tasks.write_family_table import (
+    WriteFamilyTableTask,
+    compute_callset_family_entries_ht,
+)
+from v03_pipeline.lib.tasks.write_remapped_and_subsetted_callset import (
+    WriteRemappedAndSubsettedCallsetTask,
+)
+
+
+class WriteFamilyTablesTask(BaseWriteTask):
+    callset_path = luigi.Parameter()
+    project_guid = luigi.Parameter()
+    project_remap_path = luigi.Parameter()
+    project_pedigree_path = luigi.Parameter()
+    ignore_missing_samples_when_subsetting = luigi.BoolParameter(
+        default=False,
+        parsing=luigi.BoolParameter.EXPLICIT_PARSING,
+    )
+    ignore_missing_samples_when_remapping = luigi.BoolParameter(
+        default=False,
+        parsing=luigi.BoolParameter.EXPLICIT_PARSING,
+    )
+    family_guids = luigi.ListParameter()
+    validate = luigi.BoolParameter(
+        default=True,
+        parsing=luigi.BoolParameter.EXPLICIT_PARSING,
+    )
+    is_new_gcnv_joint_call = luigi.BoolParameter(
+        default=False,
+        description='Is this a fully joint-called callset.',
+    )
+
+    def family_tasks(self) -> list[WriteFamilyTableTask]:
+        return [
+            WriteFamilyTableTask(
+                self.reference_genome,
+                self.dataset_type,
+                self.sample_type,
+                self.callset_path,
+                self.project_guid,
+                self.project_remap_path,
+                self.project_pedigree_path,
+                self.ignore_missing_samples_when_subsetting,
+                self.ignore_missing_samples_when_remapping,
+                family_guid,
+                self.validate,
+                self.is_new_gcnv_joint_call,
+                run_id=self.run_id,
+            )
+            for family_guid in self.family_guids
+        ]
+
+    def output(self) -> list[luigi.Target]:
+        return [task.output() for task in self.family_tasks()]
+
+    def complete(self) -> bool:
+        return all(task.complete() for task in self.family_tasks())
+
+    def requires(self) -> luigi.Task:
+        return WriteRemappedAndSubsettedCallsetTask(
+            self.reference_genome,
+            self.dataset_type,
+            self.sample_type,
+            self.callset_path,
+            self.project_guid,
+            self.project_remap_path,
+            self.project_pedigree_path,
+            self.ignore_missing_samples_when_subsetting,
+            self.ignore_missing_samples_when_remapping,
+            self.validate,
+            run_id=self.run_id,
+        )
+
+    def run(self) -> None:
+        self.init_hail()
+        callset_mt = read_remapped_and_subsetted_callset(self.input().path)
+        callset_sample_ids = set(callset_mt.s.collect())
+        pedigree_families = {
+            family.family_guid: family
+            for family in load_pedigree_families(self.project_pedigree_path)
+        }
+
+        # A family that cannot be loaded is reported once the other
+        # families have been written, rather than failing the whole batch.
+        family_tasks = []
+        failed_family_guids = []
+        for family_task in self.family_tasks():
+            if family_task.complete():
+                continue
+            family = pedigree_families.get(family_task.family_guid)
+            if family is None or not callset_sample_ids.issuperset(family.samples):
+                print(
+                    f'Family {family_task.family_guid} is not in the pedigree '
+                    'or has samples missing from the callset',
+                )
+                failed_family_guids.append(family_task.family_guid)
+                continue
+            family_tasks.append((family_task, family))
+        if family_tasks:
+            self.write_family_tables(callset_mt, family_tasks)
+        if failed_family_guids:
+            msg = f'Failed to write family tables for {failed_family_guids}'
+            raise RuntimeError(msg)
+
+    def write_family_tables(
+        self,
+        callset_mt: hl.MatrixTable,
+        family_tasks: list[tuple[WriteFamilyTableTask, Family]],
+    ) -> None:
+        sample_ids = sorted(
+            sample_id for _, family in family_tasks for sample_id in family.samples
+        )
+        callset_mt = subset_samples(
+            callset_mt,
+            hl.Table.parallelize(
+                [{'s': sample_id} for sample_id in sample_ids],
+                hl.tstruct(s=hl.dtype('str')),
+                key='s',
+            ),
+            False,
+        )
+
+        # Entries are aggregated once for every family and split into one row
+        # per family and variant, keyed by the family first, so that each
+        # family table is read from its own partitions of a single checkpoint
+        # rather than from a full read of the callset per family.
+        sample_indices = {sample_id: i for i, sample_id in enumerate(sample_ids)}
+        ht = compute_callset_family_entries_ht(
+            self.dataset_type,
+            callset_mt,
+            self.param_kwargs,
+        )
+        key_fields = list(ht.key)
+        ht = ht.annotate(
+            family_entries=hl.enumerate(
+                hl.literal(
+                    [
+                        [
+                            sample_indices[sample_id]
+                            for sample_id in sorted(family.samples)
+                        ]
+                        for _, family in family_tasks
+                    ],
+                ),
+            )
+            .map(
+                lambda family: hl.struct(
+                    family_index=family[0],
+                    entries=family[1].map(lambda i: ht.entries[i]),
+                ),
+            )
+            .filter(
+                lambda family: family.entries.any(
+                    self.dataset_type.sample_entries_filter_fn,
+                ),
+            ),
+        )
+        ht = ht.explode(ht.family_entries)
+        ht = ht.annotate(
+            family_index=ht.family_entries.family_index,
+            entries=ht.family_entries.entries,
+        ).drop('family_entries')
+        ht, checkpoint_path = checkpoint(ht.key_by('family_index', *key_fields))
+        size_bytes_per_sample = file_size_bytes(checkpoint_path) / len(sample_ids)
+        for family_index, (family_task, family) in enumerate(family_tasks):
+            family_ht = hl.filter_intervals(
+                ht,
+                [
+                    hl.interval(
+                        hl.struct(family_index=family_index),
+                        hl.struct(family_index=family_index),
+                        includes_end=True,
+                    ),
+                ],
+            )
+            family_ht = family_ht.key_by(*key_fields).drop('family_index')
+            family_ht = globalize_sample_ids(family_ht)
+            family_ht = family_ht.select_globals(
+                sample_ids=family_ht.sample_ids,
+                sample_type=self.sample_type.value,
+                updates={self.callset_path},
+            )
+            family_ht.naive_coalesce(
+                compute_hail_n_partitions(
+                    math.ceil(size_bytes_per_sample * len(family.samples)),
+                ),
+            ).write(family_task.output().path, overwrite=True)
@@ -0,0 +1,70 @@
+import hail as hl
+import luigi.worker
+
+from v03_pipeline.lib.model import DatasetType, ReferenceGenome, SampleType
+from v03_pipeline.lib.tasks.write_family_tables import WriteFamilyTablesTask
+from v03_pipeline.lib.test.mocked_dataroot_testcase import MockedDatarootTestCase
+
+TEST_SNV_INDEL_VCF = 'v03_pipeline/var/test/callsets/1kg_30variants.vcf'
+TEST_REMAP = 'v03_pipeline/var/test/remaps/test_remap_1.tsv'
+TEST_PEDIGREE_4 = 'v03_pipeline/var/test/pedigrees/test_pedigree_4.tsv'
+
+
+class WriteFamilyTablesTaskTest(MockedDatarootTestCase):
+    def test_snv_write_family_tables_task(self) -> None:
+        worker = luigi.worker.Worker()
+        wfts_task = WriteFamilyTablesTask(
+            reference_genome=ReferenceGenome.GRCh38,
+            dataset_type=DatasetType.SNV_INDEL,
+            sample_type=SampleType.WGS,
+            callset_path=TEST_SNV_INDEL_VCF,
+            project_guid='R0114_project4',
+            project_remap_path=TEST_REMAP,
+            project_pedigree_path=TEST_PEDIGREE_4,
+            family_guids=['123_1', '234_1', 'efg_1'],
+            validate=False,
+        )
+        worker.add(wfts_task)
+        worker.run()
+        self.assertTrue(wfts_task.complete())
+        for wft_task, sample_id in zip(
+            wfts_task.family_tasks(),
+            ['NA19675_1', 'NA19678_1', 'NA20888_1'],
+            strict=True,
+        ):
+            self.assertTrue(wft_task.complete())
+            ht = hl.read_table(wft_task.output().path)
+            self.assertEqual(
+                ht.globals.collect(),
+                [
+                    hl.Struct(
+                        sample_ids=[sample_id],
+                        sample_type=SampleType.WGS.value,
+                        updates={TEST_SNV_INDEL_VCF},
+                    ),
+                ],
+            )
+            # The batched table matches the one written for a single family.
+            self.assertEqual(ht.collect(), wft_task.create_table().collect())
+
+    def test_write_family_tables_task_unknown_family(self) -> None:
+        worker = luigi.worker.Worker()
+        wfts_task = WriteFamilyTablesTask(
+            reference_genome=ReferenceGenome.GRCh38,
+            dataset_type=DatasetType.SNV_INDEL,
+            sample_type=SampleType.WGS,
+            callset_path=TEST_SNV_INDEL_VCF,
+            project_guid='R0114_project4',
+            project_remap_path=TEST_REMAP,
+            project_pedigree_path=TEST_PEDIGREE_4,
+            family_guids=['123_1', 'not_a_family', 'efg_1'],
+            validate=False,
+        )
+        worker.add(wfts_task)
+        self.assertFalse(worker.run())
+        self.assertFalse(wfts_task.complete())
+        # The families in the pedigree are still written.
+        self.assertEqual(
+            [wft_task.complete() for wft_task in wfts_task.family_tasks()],
+            [True, False, True],
+        )
@@ -1,13 +1,18 @@
 import json
 
-import hail as hl
 import luigi
+from luigi.task import flatten
 
+from v03_pipeline.lib.misc.callset_view import read_remapped_and_subsetted_callset
 from v03_pipeline.lib.paths import metadata_for_run_path
 from v03_pipeline.lib.tasks.base.base_write_task import BaseWriteTask
+from v03_pipeline.lib.tasks.base.run_metadata import (
+    read_task_metrics_for_run,
+    read_vep_parameters_for_run,
+)
 from v03_pipeline.lib.tasks.files import GCSorLocalTarget
-from v03_pipeline.lib.tasks.write_remapped_and_subsetted_callset import (
-    WriteRemappedAndSubsettedCallsetTask,
+from v03_pipeline.lib.tasks.write_remapped_and_subsetted_callsets import (
+    WriteRemappedAndSubsettedCallsetsTask,
 )
 
 
@@ -44,25 +49,20 @@ class WriteMetadataForRunTask(BaseWriteTask):
 
     def requires(self) -> luigi.Task:
         return [
-            WriteRemappedAndSubsettedCallsetTask(
+            WriteRemappedAndSubsettedCallsetsTask(
                 self.reference_genome,
                 self.dataset_type,
                 self.sample_type,
                 callset_path,
-                project_guid,
-                project_remap_path,
-                project_pedigree_path,
+                self.project_guids,
+                self.project_remap_paths,
+                self.project_pedigree_paths,
                 self.ignore_missing_samples_when_subsetting,
                 self.ignore_missing_samples_when_remapping,
                 self.validate,
+                run_id=self.run_id,
             )
             for callset_path in self.callset_paths
-            for (project_guid, project_remap_path, project_pedigree_path) in zip(
-                self.project_guids,
-                self.project_remap_paths,
-                self.project_pedigree_paths,
-                strict=True,
-            )
         ]
 
     def run(self) -> None:
@@ -71,9 +71,21 @@ class WriteMetadataForRunTask(BaseWriteTask):
             'run_id': self.run_id,
             'sample_type': self.sample_type.value,
             'families': {},
+            'tasks': read_task_metrics_for_run(
+                self.reference_genome,
+                self.dataset_type,
+                self.run_id,
+            ),
+            'vep_parameters': read_vep_parameters_for_run(
+                self.reference_genome,
+                self.dataset_type,
+                self.run_id,
+            ),
         }
-        for remapped_and_subsetted_callset in self.input():
-            callset_mt = hl.read_matrix_table(remapped_and_subsetted_callset.path)
+        for remapped_and_subsetted_callset in flatten(self.input()):
+            callset_mt = read_remapped_and_subsetted_callset(
+                remapped_and_subsetted_callset.path,
+            )
             metadata_json['families'] = {
                 **callset_mt.families.collect()[0],
                 **metadata_json['families'],
@@ -1,9 +1,13 @@
 import json
+from unittest.mock import ANY
 
 import luigi.worker
 
 from v03_pipeline.lib.model import DatasetType, ReferenceGenome, SampleType
 from v03_pipeline.lib.tasks.write_metadata_for_run import WriteMetadataForRunTask
+from v03_pipeline.lib.tasks.write_sample_lookup_delta_table import (
+    WriteSampleLookupDeltaTableTask,
+)
 from v03_pipeline.lib.test.mocked_dataroot_testcase import MockedDatarootTestCase
 
 TEST_VCF = 'v03_pipeline/var/test/callsets/1kg_30variants.vcf'
@@ -33,8 +37,9 @@ class WriteMetadataForRunTaskTest(MockedDatarootTestCase):
         )
         self.assertTrue(write_metadata_for_run_task.complete())
         with write_metadata_for_run_task.output().open('r') as f:
+            metadata_json = json.load(f)
             self.assertDictEqual(
-                json.load(f),
+                metadata_json,
                 {
                     'callsets': [TEST_VCF],
                     'families': {
@@ -59,5 +64,51 @@ class WriteMetadataForRunTaskTest(MockedDatarootTestCase):
                     },
                     'run_id': 'run_123456',
                     'sample_type': SampleType.WGS.value,
+                    'tasks': ANY,
+                    'vep_parameters': None,
                 },
             )
+        self.assertCountEqual(
+            [metrics['task_family'] for metrics in metadata_json['tasks'].values()],
+            [
+                'WriteImportedCallsetTask',
+                'WriteRemappedAndSubsettedCallsetTask',
+                'WriteRemappedAndSubsettedCallsetTask',
+                'WriteRemappedAndSubsettedCallsetsTask',
+                # The metadata task records its own metrics once it succeeds.
+                'WriteMetadataForRunTask',
+            ],
+        )
+        imported_callset_metrics = next(
+            metrics
+            for metrics in metadata_json['tasks'].values()
+            if metrics['task_family'] == 'WriteImportedCallsetTask'
+        )
+        self.assertEqual(imported_callset_metrics['inputs'], [])
+        self.assertEqual(len(imported_callset_metrics['outputs']), 1)
+        self.assertEqual(imported_callset_metrics['outputs'][0]['rows'], 30)
+        self.assertGreater(imported_callset_metrics['wall_time_seconds'], 0)
+        self.assertGreater(
+            imported_callset_metrics['outputs'][0]['bytes_written'],
+            0,
+        )
+
+        # A task that finishes after the metadata was written is added to it.
+        worker = luigi.worker.Worker()
+        wsldt_task = WriteSampleLookupDeltaTableTask(
+            reference_genome=ReferenceGenome.GRCh38,
+            dataset_type=DatasetType.SNV_INDEL,
+            sample_type=SampleType.WGS,
+            callset_path=TEST_VCF,
+            project_guids=['R0113_test_project', 'R0114_project4'],
+            project_remap_paths=[TEST_REMAP, TEST_REMAP],
+            project_pedigree_paths=[TEST_PEDIGREE_3, TEST_PEDIGREE_4],
+            validate=False,
+            run_id='run_123456',
+        )
+        worker.add(wsldt_task)
+        worker.run()
+        with write_metadata_for_run_task.output().open('r') as f:
+            metadata_json = json.load(f)
+        self.assertEqual(metadata_json['callsets'], [TEST_VCF])
+        self.assertIn(wsldt_task.task_id, metadata_json['tasks'])
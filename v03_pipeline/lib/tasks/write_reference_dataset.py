@@ -0,0 +1,65 @@
+import hail as hl
+import luigi
+
+from v03_pipeline.lib.paths import valid_reference_dataset_path
+from v03_pipeline.lib.reference_data.combine import (
+    dataset_is_current,
+    get_dataset_path,
+    get_ht,
+)
+from v03_pipeline.lib.reference_data.fingerprint import (
+    dataset_fingerprint,
+    is_remote_source,
+)
+from v03_pipeline.lib.tasks.base.base_reference_dataset_task import (
+    BaseReferenceDatasetTask,
+)
+from v03_pipeline.lib.tasks.files import GCSorLocalTarget
+
+
+class WriteReferenceDatasetTask(BaseReferenceDatasetTask):
+    dataset = luigi.Parameter()
+
+    def output(self) -> luigi.Target:
+        return GCSorLocalTarget(
+            valid_reference_dataset_path(
+                self.reference_genome,
+                self.dataset_type,
+                self.reference_dataset_collection,
+                self.dataset,
+            ),
+        )
+
+    def complete(self) -> bool:
+        if not super().complete():
+            return False
+        dataset_globals = hl.eval(hl.read_table(self.output().path).globals)
+        if not dataset_is_current(
+            self.dataset,
+            self.reference_genome,
+            dataset_globals.path,
+            dataset_globals.version,
+        ):
+            return False
+        # Remote sources that publish no checksum cannot be fingerprinted and
+        # are only rebuilt when their path or version changes.  Any other
+        # source without a fingerprint, such as a Hail table that is still
+        # being written, is stale, as is a table built with a fingerprint
+        # that can no longer be fetched, so a failed lookup never hides a
+        # new release.
+        fingerprint = dataset_fingerprint(self.dataset, self.reference_genome)
+        recorded_fingerprint = dataset_globals.get('fingerprint')
+        if fingerprint is None:
+            return recorded_fingerprint is None and is_remote_source(
+                get_dataset_path(self.dataset, self.reference_genome),
+            )
+        return fingerprint == recorded_fingerprint
+
+    def create_table(self) -> hl.Table:
+        # The fingerprint is taken before the source is read, so a source
+        # that changes during the build is picked up by the next run.
+        fingerprint = dataset_fingerprint(self.dataset, self.reference_genome)
+        ht = get_ht(self.dataset, self.reference_genome)
+        return ht.annotate_globals(
+            fingerprint=(hl.missing(hl.tstr) if fingerprint is None else fingerprint),
+        )
@@ -0,0 +1,128 @@
+import json
+
+import hail as hl
+import luigi
+
+from v03_pipeline.lib.misc.io import write, write_in_place
+from v03_pipeline.lib.model import Env
+from v03_pipeline.lib.paths import (
+    valid_reference_dataset_collection_manifest_path,
+    valid_reference_dataset_collection_path,
+)
+from v03_pipeline.lib.reference_data.combine import join_dataset_hts, update_joined_ht
+from v03_pipeline.lib.tasks.base.base_reference_dataset_task import (
+    BaseReferenceDatasetTask,
+)
+from v03_pipeline.lib.tasks.files import GCSorLocalFolderTarget, GCSorLocalTarget
+from v03_pipeline.lib.tasks.write_reference_dataset import WriteReferenceDatasetTask
+
+
+class WriteReferenceDatasetCollectionTask(BaseReferenceDatasetTask):
+    @property
+    def datasets(self) -> list[str]:
+        return self.reference_dataset_collection.datasets(self.dataset_type)
+
+    def output(self) -> luigi.Target:
+        return GCSorLocalTarget(
+            valid_reference_dataset_collection_path(
+                self.reference_genome,
+                self.dataset_type,
+                self.reference_dataset_collection,
+            ),
+        )
+
+    def complete(self) -> bool:
+        return (
+            super().complete()
+            and all(task.complete() for task in self.requires())
+            and not self.stale_datasets(hl.read_table(self.output().path))
+        )
+
+    def requires(self) -> list[luigi.Task]:
+        return [
+            WriteReferenceDatasetTask(
+                self.reference_genome,
+                self.dataset_type,
+                self.reference_dataset_collection,
+                dataset,
+            )
+            for dataset in self.datasets
+        ]
+
+    def manifest_target(self) -> luigi.Target:
+        return GCSorLocalTarget(
+            valid_reference_dataset_collection_manifest_path(
+                self.reference_genome,
+                self.dataset_type,
+                self.reference_dataset_collection,
+            ),
+        )
+
+    def dataset_manifest(self) -> dict[str, dict]:
+        manifest = {}
+        for dataset, task in zip(self.datasets, self.requires(), strict=True):
+            dataset_globals = hl.eval(hl.read_table(task.output().path).globals)
+            manifest[dataset] = {
+                'path': dataset_globals.path,
+                'version': dataset_globals.version,
+                'fingerprint': dataset_globals.get('fingerprint'),
+            }
+        return manifest
+
+    def stale_datasets(self, joined_ht: hl.Table) -> list[str]:
+        # Datasets whose table has been rebuilt since it was last combined.
+        dataset_manifest = self.dataset_manifest()
+        if self.manifest_target().exists():
+            with self.manifest_target().open('r') as f:
+                manifest = json.load(f)
+        else:
+            # Collections combined before manifests were written only record
+            # the paths and versions.
+            joined_globals = hl.eval(joined_ht.globals)
+            manifest = {
+                dataset: {
+                    'path': joined_globals.paths.get(dataset),
+                    'version': joined_globals.versions.get(dataset),
+                    'fingerprint': dataset_manifest[dataset]['fingerprint'],
+                }
+                for dataset in self.datasets
+            }
+        return [
+            dataset
+            for dataset in self.datasets
+            if manifest.get(dataset) != dataset_manifest[dataset]
+        ]
+
+    def run(self) -> None:
+        self.init_hail()
+        dataset_manifest = self.dataset_manifest()
+        if (
+            not GCSorLocalFolderTarget(self.output().path).exists()
+            or not Env.IN_PLACE_UPDATES
+        ):
+            write(self.create_table(), self.output().path)
+        else:
+            write_in_place(self.create_table(), self.output().path)
+        with self.manifest_target().open('w') as f:
+            json.dump(dataset_manifest, f)
+
+    def create_table(self) -> hl.Table:
+        dataset_hts = {
+            dataset: hl.read_table(task.output().path)
+            for dataset, task in zip(self.datasets, self.requires(), strict=True)
+        }
+        if not GCSorLocalFolderTarget(self.output().path).exists():
+            return join_dataset_hts(dataset_hts)
+        joined_ht = hl.read_table(self.output().path)
+        if set(joined_ht.row_value) != set(self.datasets):
+            # Datasets were added to or removed from the collection.
+            return join_dataset_hts(dataset_hts)
+        # Only the rebuilt datasets are merged into the existing table.
+        for dataset in self.stale_datasets(joined_ht):
+            joined_ht = update_joined_ht(
+                joined_ht,
+                dataset,
+                dataset_hts[dataset],
+                self.datasets,
+            )
+        return joined_ht
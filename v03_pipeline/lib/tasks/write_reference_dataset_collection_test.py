@@ -0,0 +1,155 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+import hail as hl
+import luigi.worker
+
+from v03_pipeline.lib.model import (
+    DatasetType,
+    ReferenceDatasetCollection,
+    ReferenceGenome,
+)
+from v03_pipeline.lib.tasks.write_reference_dataset_collection import (
+    WriteReferenceDatasetCollectionTask,
+)
+from v03_pipeline.lib.test.mocked_dataroot_testcase import MockedDatarootTestCase
+
+
+class WriteReferenceDatasetCollectionTaskTest(MockedDatarootTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.source_dir = tempfile.mkdtemp()
+        for dataset, values in [('a', [1, 2]), ('b', [3, 4]), ('a_v2', [5, 6])]:
+            hl.Table.parallelize(
+                [
+                    {
+                        'locus': hl.Locus('chr1', position, 'GRCh38'),
+                        'alleles': ['A', 'C'],
+                        'x': value,
+                    }
+                    for position, value in enumerate(values, start=1)
+                ],
+                hl.tstruct(
+                    locus=hl.tlocus('GRCh38'),
+                    alleles=hl.tarray(hl.tstr),
+                    x=hl.tint32,
+                ),
+                key=['locus', 'alleles'],
+            ).write(os.path.join(self.source_dir, f'{dataset}.ht'))
+        self.config = {
+            dataset: {
+                '38': {
+                    'path': os.path.join(self.source_dir, f'{dataset}.ht'),
+                    'select': ['x'],
+                    'version': '1',
+                },
+            }
+            for dataset in ['a', 'b']
+        }
+        patcher = mock.patch.dict(
+            'v03_pipeline.lib.reference_data.combine.CONFIG',
+            self.config,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(
+            ReferenceDatasetCollection,
+            'datasets',
+            return_value=['a', 'b'],
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        super().tearDown()
+        shutil.rmtree(self.source_dir)
+
+    def test_write_reference_dataset_collection_task(self) -> None:
+        worker = luigi.worker.Worker()
+        task = WriteReferenceDatasetCollectionTask(
+            reference_genome=ReferenceGenome.GRCh38,
+            dataset_type=DatasetType.SNV_INDEL,
+            reference_dataset_collection=ReferenceDatasetCollection.COMBINED,
+        )
+        worker.add(task)
+        worker.run()
+        self.assertTrue(task.complete())
+        ht = hl.read_table(task.output().path)
+        self.assertListEqual(
+            ht.select(a=ht.a.x, b=ht.b.x).collect(),
+            [
+                hl.Struct(
+                    locus=hl.Locus('chr1', 1, 'GRCh38'),
+                    alleles=['A', 'C'],
+                    a=1,
+                    b=3,
+                ),
+                hl.Struct(
+                    locus=hl.Locus('chr1', 2, 'GRCh38'),
+                    alleles=['A', 'C'],
+                    a=2,
+                    b=4,
+                ),
+            ],
+        )
+        self.assertEqual(
+            hl.eval(ht.versions),
+            hl.Struct(a='1', b='1'),
+        )
+
+        # A new release of one dataset only rebuilds that dataset.
+        self.config['a']['38']['path'] = os.path.join(self.source_dir, 'a_v2.ht')
+        self.config['a']['38']['version'] = '2'
+        self.assertFalse(task.complete())
+        self.assertListEqual(
+            [dataset_task.complete() for dataset_task in task.requires()],
+            [False, True],
+        )
+        worker = luigi.worker.Worker()
+        worker.add(task)
+        worker.run()
+        self.assertTrue(task.complete())
+        ht = hl.read_table(task.output().path)
+        self.assertListEqual(
+            ht.select(a=ht.a.x, b=ht.b.x).collect(),
+            [
+                hl.Struct(
+                    locus=hl.Locus('chr1', 1, 'GRCh38'),
+                    alleles=['A', 'C'],
+                    a=5,
+                    b=3,
+                ),
+                hl.Struct(
+                    locus=hl.Locus('chr1', 2, 'GRCh38'),
+                    alleles=['A', 'C'],
+                    a=6,
+                    b=4,
+                ),
+            ],
+        )
+        self.assertEqual(
+            hl.eval(ht.versions),
+            hl.Struct(a='2', b='1'),
+        )
+
+        # So does a source rewritten in place under the same version.
+        hl.read_table(os.path.join(self.source_dir, 'a.ht')).write(
+            os.path.join(self.source_dir, 'b.ht'),
+            overwrite=True,
+        )
+        self.assertFalse(task.complete())
+        self.assertListEqual(
+            [dataset_task.complete() for dataset_task in task.requires()],
+            [True, False],
+        )
+        worker = luigi.worker.Worker()
+        worker.add(task)
+        worker.run()
+        self.assertTrue(task.complete())
+        ht = hl.read_table(task.output().path)
+        self.assertListEqual(
+            ht.aggregate(hl.agg.collect(ht.b.x)),
+            [1, 2],
+        )
@@ -31,6 +31,7 @@ class WriteRelatednessCheckTableTask(BaseWriteTask):
                 self.dataset_type,
                 self.sample_type,
                 self.callset_path,
+                run_id=self.run_id,
             ),
         ]
         if Env.ACCESS_PRIVATE_DATASETS:
@@ -1,16 +1,20 @@
 import hail as hl
 import luigi
 
+from v03_pipeline.lib.misc.callset_view import callset_view_ht
 from v03_pipeline.lib.misc.family_loading_failures import (
     get_families_failed_missing_samples,
     get_families_failed_relatedness_check,
     get_families_failed_sex_check,
 )
-from v03_pipeline.lib.misc.io import does_file_exist, import_pedigree, import_remap
-from v03_pipeline.lib.misc.pedigree import parse_pedigree_ht_to_families
+from v03_pipeline.lib.misc.io import does_file_exist, load_remap
+from v03_pipeline.lib.misc.pedigree import load_pedigree_families
 from v03_pipeline.lib.misc.sample_ids import remap_sample_ids, subset_samples
 from v03_pipeline.lib.model import Env
-from v03_pipeline.lib.paths import remapped_and_subsetted_callset_path
+from v03_pipeline.lib.paths import (
+    remapped_and_subsetted_callset_path,
+    remapped_and_subsetted_callset_view_path,
+)
 from v03_pipeline.lib.tasks.base.base_write_task import BaseWriteTask
 from v03_pipeline.lib.tasks.files import GCSorLocalTarget, RawFileTask
 from v03_pipeline.lib.tasks.write_imported_callset import WriteImportedCallsetTask
@@ -39,8 +43,13 @@ class WriteRemappedAndSubsettedCallsetTask(BaseWriteTask):
     )
 
     def output(self) -> luigi.Target:
+        path_fn = (
+            remapped_and_subsetted_callset_view_path
+            if Env.CALLSET_VIEWS
+            else remapped_and_subsetted_callset_path
+        )
         return GCSorLocalTarget(
-            remapped_and_subsetted_callset_path(
+            path_fn(
                 self.reference_genome,
                 self.dataset_type,
                 self.callset_path,
@@ -60,6 +69,7 @@ class WriteRemappedAndSubsettedCallsetTask(BaseWriteTask):
                 # Only the primary import task itself should be aware of it.
                 None,
                 self.validate,
+                run_id=self.run_id,
             ),
             RawFileTask(self.project_pedigree_path),
         ]
@@ -74,40 +84,44 @@ class WriteRemappedAndSubsettedCallsetTask(BaseWriteTask):
                     self.dataset_type,
                     self.sample_type,
                     self.callset_path,
+                    run_id=self.run_id,
                 ),
                 WriteSexCheckTableTask(
                     self.reference_genome,
                     self.dataset_type,
                     self.sample_type,
                     self.callset_path,
+                    run_id=self.run_id,
                 ),
             ]
         return requirements
 
-    def create_table(self) -> hl.MatrixTable:
+    def size_reference_path(self) -> str | None:
+        if Env.CALLSET_VIEWS:
+            return None
+        return self.input()[0].path
+
+    def create_table(self) -> hl.MatrixTable | hl.Table:
         callset_mt = hl.read_matrix_table(self.input()[0].path)
-        pedigree_ht = import_pedigree(self.input()[1].path)
 
         # Remap, but only if the remap file is present!
         remap_lookup = hl.empty_dict(hl.tstr, hl.tstr)
         if does_file_exist(self.project_remap_path):
-            project_remap_ht = import_remap(self.project_remap_path)
+            project_remap = load_remap(self.project_remap_path)
             callset_mt = remap_sample_ids(
                 callset_mt,
-                project_remap_ht,
+                project_remap,
                 self.ignore_missing_samples_when_remapping,
             )
-            remap_lookup = hl.dict(
-                {r.s: r.seqr_id for r in project_remap_ht.collect()},
-            )
+            remap_lookup = hl.dict({r.s: r.seqr_id for r in project_remap})
 
-        families = parse_pedigree_ht_to_families(pedigree_ht)
+        families = load_pedigree_families(self.input()[1].path)
         families_failed_missing_samples = get_families_failed_missing_samples(
             callset_mt,
             families,
         )
-        families_failed_relatedness_check = set()
-        families_failed_sex_check = set()
+        families_failed_relatedness_check = {}
+        families_failed_sex_check = {}
         if (
             Env.CHECK_SEX_AND_RELATEDNESS
             and self.dataset_type.check_sex_and_relatedness
@@ -124,12 +138,17 @@ class WriteRemappedAndSubsettedCallsetTask(BaseWriteTask):
                 sex_check_ht,
                 remap_lookup,
             )
+            for family, reasons in [
+                *families_failed_relatedness_check.items(),
+                *families_failed_sex_check.items(),
+            ]:
+                print(f'Family {family.family_guid} failed checks: {reasons}')
 
         loadable_families = (
             families
             - families_failed_missing_samples
-            - families_failed_relatedness_check
-            - families_failed_sex_check
+            - families_failed_relatedness_check.keys()
+            - families_failed_sex_check.keys()
         )
         if not len(loadable_families):
             msg = 'All families failed checks'
@@ -148,7 +167,7 @@ class WriteRemappedAndSubsettedCallsetTask(BaseWriteTask):
             ),
             self.ignore_missing_samples_when_subsetting,
         )
-        return mt.select_globals(
+        mt = mt.select_globals(
             family_guids_failed_missing_samples=(
                 {f.family_guid for f in families_failed_missing_samples}
                 or hl.empty_set(hl.tstr)
@@ -169,3 +188,6 @@ class WriteRemappedAndSubsettedCallsetTask(BaseWriteTask):
                 }
             ),
         )
+        if Env.CALLSET_VIEWS:
+            return callset_view_ht(mt, self.input()[0].path)
+        return mt
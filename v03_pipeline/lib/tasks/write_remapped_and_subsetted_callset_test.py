@@ -5,6 +5,7 @@ from unittest.mock import patch
 import hail as hl
 import luigi.worker
 
+from v03_pipeline.lib.misc.callset_view import read_remapped_and_subsetted_callset
 from v03_pipeline.lib.model import DatasetType, ReferenceGenome, SampleType
 from v03_pipeline.lib.paths import relatedness_check_table_path, sex_check_table_path
 from v03_pipeline.lib.tasks.write_remapped_and_subsetted_callset import (
@@ -47,6 +48,7 @@ class WriteRemappedAndSubsettedCallsetTaskTest(MockedDatarootTestCase):
         self,
         mock_env: unittest.mock.Mock,
     ) -> None:
+        mock_env.CALLSET_VIEWS = False
         mock_env.CHECK_SEX_AND_RELATEDNESS = True
         worker = luigi.worker.Worker()
         wrsc_task = WriteRemappedAndSubsettedCallsetTask(
@@ -81,6 +83,7 @@ class WriteRemappedAndSubsettedCallsetTaskTest(MockedDatarootTestCase):
         self,
         mock_env: unittest.mock.Mock,
     ) -> None:
+        mock_env.CALLSET_VIEWS = False
         mock_env.CHECK_SEX_AND_RELATEDNESS = True
         worker = luigi.worker.Worker()
         wrsc_task = WriteRemappedAndSubsettedCallsetTask(
@@ -99,3 +102,47 @@ class WriteRemappedAndSubsettedCallsetTaskTest(MockedDatarootTestCase):
         mt = hl.read_matrix_table(wrsc_task.output().path)
         # NB: one "family"/"sample" has been removed because of a failed sex check!
         self.assertEqual(mt.count(), (30, 12))
+
+    @patch('v03_pipeline.lib.tasks.write_remapped_and_subsetted_callset.Env')
+    def test_write_remapped_and_subsetted_callset_view(
+        self,
+        mock_env: unittest.mock.Mock,
+    ) -> None:
+        mock_env.CALLSET_VIEWS = True
+        mock_env.CHECK_SEX_AND_RELATEDNESS = False
+        worker = luigi.worker.Worker()
+        wrsc_task = WriteRemappedAndSubsettedCallsetTask(
+            reference_genome=ReferenceGenome.GRCh38,
+            dataset_type=DatasetType.SNV_INDEL,
+            sample_type=SampleType.WGS,
+            callset_path=TEST_VCF,
+            project_guid='R0113_test_project',
+            project_remap_path=TEST_REMAP,
+            project_pedigree_path=TEST_PEDIGREE_3,
+            validate=False,
+        )
+        worker.add(wrsc_task)
+        worker.run()
+        self.assertTrue(wrsc_task.complete())
+        self.assertTrue(wrsc_task.output().path.endswith('.view.ht'))
+        mt = read_remapped_and_subsetted_callset(wrsc_task.output().path)
+        self.assertEqual(mt.count(), (30, 3))
+        self.assertEqual(
+            mt.cols().collect(),
+            [
+                hl.Struct(s='HG00731_1', seqr_id='HG00731_1', vcf_id='HG00731'),
+                hl.Struct(s='HG00732_1', seqr_id='HG00732_1', vcf_id='HG00732'),
+                hl.Struct(s='HG00733_1', seqr_id='HG00733_1', vcf_id='HG00733'),
+            ],
+        )
+        self.assertEqual(
+            mt.globals.collect(),
+            [
+                hl.Struct(
+                    family_guids_failed_missing_samples=set(),
+                    family_guids_failed_relatedness_check=set(),
+                    family_guids_failed_sex_check=set(),
+                    families={'abc_1': ['HG00731_1', 'HG00732_1', 'HG00733_1']},
+                ),
+            ],
+        )
@@ -0,0 +1,90 @@
+import luigi
+
+from v03_pipeline.lib.misc.callset_view import write_callset_view_entries
+from v03_pipeline.lib.misc.io import write
+from v03_pipeline.lib.model import Env
+from v03_pipeline.lib.paths import remapped_and_subsetted_callset_entries_path
+from v03_pipeline.lib.tasks.base.base_write_task import BaseWriteTask
+from v03_pipeline.lib.tasks.files import GCSorLocalFolderTarget
+from v03_pipeline.lib.tasks.write_remapped_and_subsetted_callset import (
+    WriteRemappedAndSubsettedCallsetTask,
+)
+
+
+class WriteRemappedAndSubsettedCallsetsTask(BaseWriteTask):
+    callset_path = luigi.Parameter()
+    project_guids = luigi.ListParameter()
+    project_remap_paths = luigi.ListParameter()
+    project_pedigree_paths = luigi.ListParameter()
+    ignore_missing_samples_when_subsetting = luigi.BoolParameter(
+        default=False,
+        parsing=luigi.BoolParameter.EXPLICIT_PARSING,
+    )
+    ignore_missing_samples_when_remapping = luigi.BoolParameter(
+        default=False,
+        parsing=luigi.BoolParameter.EXPLICIT_PARSING,
+    )
+    validate = luigi.BoolParameter(
+        default=True,
+        parsing=luigi.BoolParameter.EXPLICIT_PARSING,
+    )
+
+    def project_tasks(self) -> list[WriteRemappedAndSubsettedCallsetTask]:
+        return [
+            WriteRemappedAndSubsettedCallsetTask(
+                self.reference_genome,
+                self.dataset_type,
+                self.sample_type,
+                self.callset_path,
+                project_guid,
+                project_remap_path,
+                project_pedigree_path,
+                self.ignore_missing_samples_when_subsetting,
+                self.ignore_missing_samples_when_remapping,
+                self.validate,
+                run_id=self.run_id,
+            )
+            for (project_guid, project_remap_path, project_pedigree_path) in zip(
+                self.project_guids,
+                self.project_remap_paths,
+                self.project_pedigree_paths,
+                strict=True,
+            )
+        ]
+
+    def output(self) -> list[luigi.Target]:
+        return [task.output() for task in self.project_tasks()]
+
+    def complete(self) -> bool:
+        return all(
+            GCSorLocalFolderTarget(target.path).exists() for target in self.output()
+        )
+
+    def requires(self) -> list[luigi.Task]:
+        # Materialized subsets are still written by one task per project.
+        if not Env.CALLSET_VIEWS:
+            return self.project_tasks()
+        # NB: the imported callset task is shared by every project and
+        # de-duplicated by luigi.
+        return [
+            requirement
+            for task in self.project_tasks()
+            for requirement in task.requires()
+        ]
+
+    def run(self) -> None:
+        if not Env.CALLSET_VIEWS:
+            return
+        self.init_hail()
+        project_tasks = [task for task in self.project_tasks() if not task.complete()]
+        view_hts = write_callset_view_entries(
+            {task.project_guid: task.create_table() for task in project_tasks},
+            self.input()[0].path,
+            remapped_and_subsetted_callset_entries_path(
+                self.reference_genome,
+                self.dataset_type,
+                self.callset_path,
+            ),
+        )
+        for task in project_tasks:
+            write(view_hts[task.project_guid], task.output().path)
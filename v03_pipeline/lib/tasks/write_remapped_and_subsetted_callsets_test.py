@@ -0,0 +1,92 @@
+import unittest
+from unittest.mock import patch
+
+import hail as hl
+import luigi.worker
+
+from v03_pipeline.lib.misc.callset_view import read_remapped_and_subsetted_callset
+from v03_pipeline.lib.model import DatasetType, ReferenceGenome, SampleType
+from v03_pipeline.lib.paths import imported_callset_path
+from v03_pipeline.lib.tasks.write_remapped_and_subsetted_callsets import (
+    WriteRemappedAndSubsettedCallsetsTask,
+)
+from v03_pipeline.lib.test.mocked_dataroot_testcase import MockedDatarootTestCase
+
+TEST_VCF = 'v03_pipeline/var/test/callsets/1kg_30variants.vcf'
+TEST_REMAP = 'v03_pipeline/var/test/remaps/test_remap_1.tsv'
+TEST_PEDIGREE_3 = 'v03_pipeline/var/test/pedigrees/test_pedigree_3.tsv'
+TEST_PEDIGREE_4 = 'v03_pipeline/var/test/pedigrees/test_pedigree_4.tsv'
+
+
+class WriteRemappedAndSubsettedCallsetsTaskTest(MockedDatarootTestCase):
+    @patch('v03_pipeline.lib.tasks.write_remapped_and_subsetted_callsets.Env')
+    @patch('v03_pipeline.lib.tasks.write_remapped_and_subsetted_callset.Env')
+    def test_write_remapped_and_subsetted_callsets_task(
+        self,
+        mock_env: unittest.mock.Mock,
+        mock_callsets_env: unittest.mock.Mock,
+    ) -> None:
+        mock_env.CALLSET_VIEWS = True
+        mock_env.CHECK_SEX_AND_RELATEDNESS = False
+        mock_callsets_env.CALLSET_VIEWS = True
+        worker = luigi.worker.Worker()
+        wrscs_task = WriteRemappedAndSubsettedCallsetsTask(
+            reference_genome=ReferenceGenome.GRCh38,
+            dataset_type=DatasetType.SNV_INDEL,
+            sample_type=SampleType.WGS,
+            callset_path=TEST_VCF,
+            project_guids=['R0113_test_project', 'R0114_project4'],
+            project_remap_paths=[TEST_REMAP, TEST_REMAP],
+            project_pedigree_paths=[TEST_PEDIGREE_3, TEST_PEDIGREE_4],
+            validate=False,
+        )
+        worker.add(wrscs_task)
+        worker.run()
+        self.assertTrue(wrscs_task.complete())
+        for project_task in wrscs_task.project_tasks():
+            self.assertTrue(project_task.complete())
+
+        imported_mt = hl.read_matrix_table(
+            imported_callset_path(
+                ReferenceGenome.GRCh38,
+                DatasetType.SNV_INDEL,
+                TEST_VCF,
+            ),
+        )
+        view_ht = hl.read_table(wrscs_task.output()[0].path)
+        self.assertTrue(
+            hl.eval(view_ht.entries_path).endswith('R0113_test_project'),
+        )
+        mt = read_remapped_and_subsetted_callset(wrscs_task.output()[0].path)
+        self.assertEqual(mt.count(), (30, 3))
+        self.assertEqual(
+            mt.cols().collect(),
+            [
+                hl.Struct(s='HG00731_1', seqr_id='HG00731_1', vcf_id='HG00731'),
+                hl.Struct(s='HG00732_1', seqr_id='HG00732_1', vcf_id='HG00732'),
+                hl.Struct(s='HG00733_1', seqr_id='HG00733_1', vcf_id='HG00733'),
+            ],
+        )
+        self.assertEqual(
+            mt.globals.collect(),
+            [
+                hl.Struct(
+                    family_guids_failed_missing_samples=set(),
+                    family_guids_failed_relatedness_check=set(),
+                    family_guids_failed_sex_check=set(),
+                    families={'abc_1': ['HG00731_1', 'HG00732_1', 'HG00733_1']},
+                ),
+            ],
+        )
+        # The entries match those of the imported callset.
+        expected_mt = imported_mt.filter_cols(
+            hl.set(['HG00731', 'HG00732', 'HG00733']).contains(imported_mt.s),
+        )
+        self.assertEqual(mt.GT.collect(), expected_mt.GT.collect())
+        self.assertEqual(mt.rows().collect(), expected_mt.rows().collect())
+
+        mt = read_remapped_and_subsetted_callset(wrscs_task.output()[1].path)
+        self.assertEqual(
+            mt.count_cols(),
+            sum(len(samples) for samples in hl.eval(mt.families).values()),
+        )
@@ -0,0 +1,110 @@
+import hail as hl
+import luigi
+
+from v03_pipeline.lib.misc.callset_view import read_remapped_and_subsetted_callset
+from v03_pipeline.lib.misc.sample_lookup import (
+    compute_callset_sample_lookup_ht_for_projects,
+    compute_sample_lookup_delta_ht,
+    initialize_sample_lookup_ht,
+)
+from v03_pipeline.lib.model import Env
+from v03_pipeline.lib.paths import (
+    sample_lookup_delta_table_path,
+    sample_lookup_table_path,
+)
+from v03_pipeline.lib.tasks.base.base_write_task import BaseWriteTask
+from v03_pipeline.lib.tasks.files import GCSorLocalFolderTarget, GCSorLocalTarget
+from v03_pipeline.lib.tasks.write_remapped_and_subsetted_callsets import (
+    WriteRemappedAndSubsettedCallsetsTask,
+)
+
+
+class WriteSampleLookupDeltaTableTask(BaseWriteTask):
+    callset_path = luigi.Parameter()
+    project_guids = luigi.ListParameter()
+    project_remap_paths = luigi.ListParameter()
+    project_pedigree_paths = luigi.ListParameter()
+    ignore_missing_samples_when_subsetting = luigi.BoolParameter(
+        default=False,
+        parsing=luigi.BoolParameter.EXPLICIT_PARSING,
+    )
+    ignore_missing_samples_when_remapping = luigi.BoolParameter(
+        default=False,
+        parsing=luigi.BoolParameter.EXPLICIT_PARSING,
+    )
+    validate = luigi.BoolParameter(
+        default=True,
+        parsing=luigi.BoolParameter.EXPLICIT_PARSING,
+    )
+    run_id = luigi.Parameter()
+
+    def output(self) -> luigi.Target:
+        return GCSorLocalTarget(
+            sample_lookup_delta_table_path(
+                self.reference_genome,
+                self.dataset_type,
+                self.run_id,
+                self.callset_path,
+            ),
+        )
+
+    def requires(self) -> luigi.Task:
+        return WriteRemappedAndSubsettedCallsetsTask(
+            self.reference_genome,
+            self.dataset_type,
+            self.sample_type,
+            self.callset_path,
+            self.project_guids,
+            self.project_remap_paths,
+            self.project_pedigree_paths,
+            self.ignore_missing_samples_when_subsetting,
+            self.ignore_missing_samples_when_remapping,
+            self.validate,
+            run_id=self.run_id,
+        )
+
+    def create_table(self) -> hl.Table:
+        # NB: the delta is computed against the sample lookup table before
+        # UpdateSampleLookupTableTask applies this callset, and records
+        # the updates of the table it was computed against, so a consumer
+        # can tell whether it still applies.
+        path = sample_lookup_table_path(self.reference_genome, self.dataset_type)
+        if GCSorLocalFolderTarget(path).exists():
+            sample_lookup_ht = hl.read_table(path)
+        else:
+            sample_lookup_ht = initialize_sample_lookup_ht(
+                self.reference_genome,
+                self.dataset_type,
+                Env.INDEX_SAMPLE_LOOKUP_TABLE,
+            )
+        (
+            callset_sample_lookup_ht,
+            sample_subset_hts,
+        ) = compute_callset_sample_lookup_ht_for_projects(
+            self.dataset_type,
+            sample_lookup_ht,
+            {
+                project_guid: read_remapped_and_subsetted_callset(
+                    remapped_and_subsetted_callset.path,
+                )
+                for project_guid, remapped_and_subsetted_callset in zip(
+                    self.project_guids,
+                    self.input(),
+                    strict=True,
+                )
+            },
+        )
+        sample_lookup_delta_ht = compute_sample_lookup_delta_ht(
+            self.dataset_type,
+            sample_lookup_ht,
+            callset_sample_lookup_ht,
+            sample_subset_hts,
+        )
+        return sample_lookup_delta_ht.annotate_globals(
+            updates=sample_lookup_delta_ht.previous_updates.union(
+                {
+                    hl.Struct(callset=self.callset_path, project_guid=project_guid)
+                    for project_guid in self.project_guids
+                },
+            ),
+        )
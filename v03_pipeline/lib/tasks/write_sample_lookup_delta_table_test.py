@@ -0,0 +1,76 @@
+import hail as hl
+import luigi.worker
+
+from v03_pipeline.lib.model import DatasetType, ReferenceGenome, SampleType
+from v03_pipeline.lib.tasks.update_sample_lookup_table import (
+    UpdateSampleLookupTableTask,
+)
+from v03_pipeline.lib.tasks.write_sample_lookup_delta_table import (
+    WriteSampleLookupDeltaTableTask,
+)
+from v03_pipeline.lib.test.mocked_dataroot_testcase import MockedDatarootTestCase
+
+TEST_VCF = 'v03_pipeline/var/test/callsets/1kg_30variants.vcf'
+TEST_REMAP = 'v03_pipeline/var/test/remaps/test_remap_1.tsv'
+TEST_PEDIGREE_3 = 'v03_pipeline/var/test/pedigrees/test_pedigree_3.tsv'
+
+
+class WriteSampleLookupDeltaTableTest(MockedDatarootTestCase):
+    def test_write_sample_lookup_delta_table_task(self) -> None:
+        worker = luigi.worker.Worker()
+        uslt_task = UpdateSampleLookupTableTask(
+            reference_genome=ReferenceGenome.GRCh38,
+            dataset_type=DatasetType.SNV_INDEL,
+            sample_type=SampleType.WGS,
+            callset_path=TEST_VCF,
+            project_guids=['R0113_test_project'],
+            project_remap_paths=[TEST_REMAP],
+            project_pedigree_paths=[TEST_PEDIGREE_3],
+            validate=False,
+            run_id='run_123456',
+        )
+        worker.add(uslt_task)
+        worker.run()
+        self.assertTrue(uslt_task.complete())
+        wsldt_task = WriteSampleLookupDeltaTableTask(
+            reference_genome=ReferenceGenome.GRCh38,
+            dataset_type=DatasetType.SNV_INDEL,
+            sample_type=SampleType.WGS,
+            callset_path=TEST_VCF,
+            project_guids=['R0113_test_project'],
+            project_remap_paths=[TEST_REMAP],
+            project_pedigree_paths=[TEST_PEDIGREE_3],
+            validate=False,
+            run_id='run_123456',
+        )
+        self.assertTrue(wsldt_task.complete())
+        self.assertTrue('run_123456' in wsldt_task.output().path)
+        ht = hl.read_table(wsldt_task.output().path)
+        # The delta was computed against the table before this update.
+        self.assertEqual(
+            ht.globals.collect(),
+            [
+                hl.Struct(
+                    previous_updates=set(),
+                    updates={
+                        hl.Struct(callset=TEST_VCF, project_guid='R0113_test_project'),
+                    },
+                ),
+            ],
+        )
+        self.assertEqual(
+            ht.filter(ht.locus.position == 871269).collect(),  # noqa: PLR2004
+            [
+                hl.Struct(
+                    locus=hl.Locus(
+                        contig='chr1',
+                        position=871269,
+                        reference_genome='GRCh38',
+                    ),
+                    alleles=['A', 'C'],
+                    ref_samples=3,
+                    het_samples=0,
+                    hom_samples=0,
+                ),
+            ],
+        )
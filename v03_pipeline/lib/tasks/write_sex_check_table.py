@@ -27,6 +27,7 @@ class WriteSexCheckTableTask(BaseWriteTask):
                 self.dataset_type,
                 self.sample_type,
                 self.callset_path,
+                run_id=self.run_id,
             ),
         ]
 
@@ -1,24 +1,488 @@
+import hashlib
+import math
+import os
+import time
+import uuid
+from dataclasses import dataclass
+
 import hail as hl
 
-from v03_pipeline.lib.model import DatasetType
+from v03_pipeline.lib.annotations.enums import CONSEQUENCE_TERMS
+from v03_pipeline.lib.misc.io import checkpoint, does_file_exist, remove_directory
+from v03_pipeline.lib.model import DatasetType, Env, ReferenceGenome
+from v03_pipeline.lib.paths import vep_cache_prefix
+
+DEFAULT_VEP_CONFIG_JSON_PATH = 'file:///vep_data/vep-gcloud.json'
+DEFAULT_VEP_BLOCK_SIZE = 1000
+LARGE_VARIANT_ALLELE_LENGTH = 50
+MAX_VEP_CACHE_TABLES = 16
+MAX_VEP_BLOCK_SIZE = 5000
+MIN_VEP_BLOCK_SIZE = 50
+TARGET_SECONDS_PER_VEP_BLOCK = 60
+TARGET_SECONDS_PER_VEP_PARTITION = 900
+VARIANTS_PER_VEP_COST_SAMPLE = 500
+VARIANTS_PER_VEP_PARTITION = 20e3
+
+SYNTHETIC_VEP_BIOTYPES = [
+    'protein_coding',
+    'protein_coding',
+    'protein_coding',
+    'nonsense_mediated_decay',
+    'retained_intron',
+    'processed_transcript',
+    'lncRNA',
+]
+SYNTHETIC_VEP_CODING_CONSEQUENCE_TERMS = {
+    'SNV': [
+        'missense_variant',
+        'synonymous_variant',
+        'missense_variant',
+        'stop_gained',
+        'splice_donor_variant',
+        'start_lost',
+    ],
+    'INDEL': [
+        'frameshift_variant',
+        'inframe_deletion',
+        'inframe_insertion',
+        'frameshift_variant',
+        'splice_acceptor_variant',
+    ],
+    'LARGE': [
+        'frameshift_variant',
+        'transcript_ablation',
+        'feature_truncation',
+    ],
+}
+SYNTHETIC_VEP_NONCODING_CONSEQUENCE_TERMS = [
+    'intron_variant',
+    'intron_variant',
+    '3_prime_UTR_variant',
+    '5_prime_UTR_variant',
+    'upstream_gene_variant',
+    'downstream_gene_variant',
+    'non_coding_transcript_exon_variant',
+]
+SYNTHETIC_VEP_COST_MULTIPLIERS = {'SNV': 1, 'INDEL': 4, 'LARGE': 20}
+SYNTHETIC_VEP_LOF_CONSEQUENCE_TERMS = {
+    'frameshift_variant',
+    'splice_acceptor_variant',
+    'splice_donor_variant',
+    'stop_gained',
+    'transcript_ablation',
+}
+SYNTHETIC_VEP_MAX_TRANSCRIPTS = 6
+SYNTHETIC_VEP_N_GENES = 20000
+SYNTHETIC_VEP_TRANSCRIPT_CONSEQUENCE_TYPE = hl.tstruct(
+    allele_num=hl.tint32,
+    amino_acids=hl.tstr,
+    biotype=hl.tstr,
+    canonical=hl.tint32,
+    ccds=hl.tstr,
+    cdna_end=hl.tint32,
+    cdna_start=hl.tint32,
+    cds_end=hl.tint32,
+    cds_start=hl.tint32,
+    codons=hl.tstr,
+    consequence_terms=hl.tarray(hl.tstr),
+    distance=hl.tint32,
+    domains=hl.tarray(hl.tstruct(db=hl.tstr, name=hl.tstr)),
+    exon=hl.tstr,
+    gene_id=hl.tstr,
+    gene_pheno=hl.tint32,
+    gene_symbol=hl.tstr,
+    gene_symbol_source=hl.tstr,
+    hgnc_id=hl.tstr,
+    hgvs_offset=hl.tint32,
+    hgvsc=hl.tstr,
+    hgvsp=hl.tstr,
+    impact=hl.tstr,
+    intron=hl.tstr,
+    lof=hl.tstr,
+    lof_filter=hl.tstr,
+    lof_flags=hl.tstr,
+    lof_info=hl.tstr,
+    minimised=hl.tint32,
+    polyphen_prediction=hl.tstr,
+    polyphen_score=hl.tfloat64,
+    protein_end=hl.tint32,
+    protein_id=hl.tstr,
+    protein_start=hl.tint32,
+    sift_prediction=hl.tstr,
+    sift_score=hl.tfloat64,
+    strand=hl.tint32,
+    swissprot=hl.tstr,
+    transcript_id=hl.tstr,
+    trembl=hl.tstr,
+    uniparc=hl.tstr,
+    variant_allele=hl.tstr,
+)
+
+
+@dataclass
+class VEPParameters:
+    n_partitions: int
+    block_size: int
+    seconds_per_variant: dict[str, float]
+    variant_counts: dict[str, int]
+
+
+def vep_config_hash(config: str) -> str:
+    # NB: the config pins the VEP version, cache and plugins, so hashing
+    # its contents is sufficient to invalidate cached annotations.
+    with hl.hadoop_open(config) as f:
+        return hashlib.sha256(f.read().encode('utf8')).hexdigest()
+
+
+def vep_cache_table_paths(prefix: str) -> list[str]:
+    if not does_file_exist(prefix):
+        return []
+    return sorted(
+        path
+        for path in (
+            os.path.join(prefix, os.path.basename(f['path'].rstrip('/')))
+            for f in hl.hadoop_ls(prefix)
+            if f['is_dir']
+        )
+        if does_file_exist(os.path.join(path, '_SUCCESS'))
+    )
+
+
+def read_vep_cache_ht(
+    reference_genome: ReferenceGenome,
+    dataset_type: DatasetType,
+    config_hash: str,
+) -> hl.Table | None:
+    # The cache only grows, so each run writes its new annotations as a
+    # separate table and the cache is read as the union of those tables.
+    vep_cache_hts = [
+        hl.read_table(path)
+        for path in vep_cache_table_paths(
+            vep_cache_prefix(reference_genome, dataset_type, config_hash),
+        )
+    ]
+    if not vep_cache_hts:
+        return None
+    return vep_cache_hts[0].union(*vep_cache_hts[1:])
+
+
+def compact_vep_cache(
+    reference_genome: ReferenceGenome,
+    dataset_type: DatasetType,
+    config_hash: str,
+) -> None:
+    # Every lookup reads the union of the per-run tables, so once there are
+    # too many of them they are merged into one.  The merged table is
+    # complete before the per-run tables are removed, so a listing of the
+    # cache never misses an annotation.
+    prefix = vep_cache_prefix(reference_genome, dataset_type, config_hash)
+    paths = vep_cache_table_paths(prefix)
+    if len(paths) < MAX_VEP_CACHE_TABLES:
+        return
+    vep_cache_hts = [hl.read_table(path) for path in paths]
+    # NB: overlapping runs may have annotated the same variant.
+    vep_cache_hts[0].union(*vep_cache_hts[1:]).distinct().write(
+        os.path.join(prefix, f'{uuid.uuid4()}.ht'),
+    )
+    for path in paths:
+        remove_directory(path)
+
+
+class VEPBackend:
+    def config_hash(self, config: str) -> str:
+        raise NotImplementedError
+
+    def vep(self, ht: hl.Table, config: str, block_size: int) -> hl.Table:
+        raise NotImplementedError
+
+
+class HailVEPBackend(VEPBackend):
+    def config_hash(self, config: str) -> str:
+        return vep_config_hash(config)
+
+    def vep(self, ht: hl.Table, config: str, block_size: int) -> hl.Table:
+        return hl.vep(
+            ht,
+            config=config,
+            name='vep',
+            block_size=block_size,
+            tolerate_parse_error=True,
+        )
+
+
+class SyntheticVEPBackend(VEPBackend):
+    # Generates transcript consequences from the variant alone, so the
+    # annotation path may be exercised at scale without a VEP install.
+    # The cost of a variant is a busy loop of cost_per_variant iterations,
+    # scaled by SYNTHETIC_VEP_COST_MULTIPLIERS for its variant class.
+    def __init__(self, cost_per_variant: int = 0) -> None:
+        self.cost_per_variant = cost_per_variant
+
+    def config_hash(self, _config: str) -> str:
+        # NB: the config is not read, and synthetic annotations must never
+        # share a cache with real ones.
+        return hashlib.sha256(b'synthetic').hexdigest()
+
+    def vep(self, ht: hl.Table, _config: str, _block_size: int) -> hl.Table:
+        return ht.annotate(vep=synthetic_vep(ht, self.cost_per_variant))
+
+
+def vep_backend() -> VEPBackend:
+    if Env.VEP_BACKEND == 'synthetic':
+        return SyntheticVEPBackend(Env.SYNTHETIC_VEP_COST_PER_VARIANT)
+    return HailVEPBackend()
+
+
+def synthetic_vep(ht: hl.Table, cost_per_variant: int = 0) -> hl.StructExpression:
+    base_codes = hl.literal({'A': 0, 'C': 1, 'G': 2, 'T': 3})
+    ref, alt = ht.alleles[0], ht.alleles[1]
+    cls = variant_class(ht)
+    seed = (
+        hl.int64(ht.locus.position) * 31
+        + hl.len(ref) * 7
+        + hl.len(alt) * 13
+        + hl.or_else(base_codes.get(alt[0]), 4)
+    ) % 2147483647
+    seed = hl.fold(
+        lambda acc, i: (acc * 48271 + i) % 2147483647,
+        seed,
+        hl.range(
+            cost_per_variant * hl.literal(SYNTHETIC_VEP_COST_MULTIPLIERS)[cls],
+        ),
+    )
+
+    def pick(i: hl.Int32Expression, salt: int, n: int) -> hl.Int64Expression:
+        return (seed * (2 * i + 2 * salt + 1) + i * 40503 + salt * 9973) % n
+
+    def transcript_consequence(i: hl.Int32Expression) -> hl.StructExpression:
+        biotypes = hl.literal(SYNTHETIC_VEP_BIOTYPES)
+        biotype = biotypes[hl.int32(pick(i, 1, len(SYNTHETIC_VEP_BIOTYPES)))]
+        coding_terms = hl.literal(SYNTHETIC_VEP_CODING_CONSEQUENCE_TERMS)[cls]
+        noncoding_terms = hl.literal(SYNTHETIC_VEP_NONCODING_CONSEQUENCE_TERMS)
+        consequence_terms = hl.if_else(
+            (biotype == 'protein_coding') & (pick(i, 2, 3) > 0),
+            hl.array(
+                [coding_terms[hl.int32(pick(i, 3, hl.len(coding_terms)))]],
+            ),
+            hl.array(
+                [
+                    noncoding_terms[
+                        hl.int32(
+                            pick(i, 4, len(SYNTHETIC_VEP_NONCODING_CONSEQUENCE_TERMS)),
+                        )
+                    ],
+                ],
+            ),
+        )
+        gene = (seed + i // 3) % SYNTHETIC_VEP_N_GENES
+        transcript_id = hl.format('ENST%011d', seed * 10 + i)
+        cds_position = hl.int32(pick(i, 5, 3000)) + 1
+        is_lof = hl.literal(SYNTHETIC_VEP_LOF_CONSEQUENCE_TERMS).contains(
+            consequence_terms[0],
+        )
+        fields = {
+            'allele_num': 1,
+            'amino_acids': hl.or_missing(
+                consequence_terms[0] == 'missense_variant',
+                'A/V',
+            ),
+            'biotype': biotype,
+            'canonical': hl.or_missing(i == 0, 1),
+            'codons': hl.or_missing(
+                consequence_terms[0] == 'missense_variant',
+                'gCc/gTc',
+            ),
+            'consequence_terms': consequence_terms,
+            'gene_id': hl.format('ENSG%011d', gene),
+            'gene_symbol': hl.format('SYN%d', gene),
+            'hgvsc': hl.format('%s:c.%d%s>%s', transcript_id, cds_position, ref, alt),
+            'hgvsp': hl.or_missing(
+                consequence_terms[0] == 'missense_variant',
+                hl.format('ENSP%011d:p.Ala%dVal', seed * 10 + i, cds_position // 3),
+            ),
+            'lof': hl.or_missing(
+                is_lof,
+                hl.if_else(pick(i, 6, 5) == 0, 'LC', 'HC'),
+            ),
+            'lof_filter': hl.or_missing(
+                is_lof & (pick(i, 6, 5) == 0),
+                'END_TRUNC',
+            ),
+            'strand': hl.if_else(pick(i, 7, 2) == 0, 1, -1),
+            'transcript_id': transcript_id,
+            'variant_allele': alt,
+        }
+        return hl.struct(
+            **{
+                name: fields.get(name, hl.missing(dtype))
+                for name, dtype in SYNTHETIC_VEP_TRANSCRIPT_CONSEQUENCE_TYPE.items()
+            },
+        )
+
+    transcript_consequences = hl.range(
+        hl.int32(pick(0, 0, SYNTHETIC_VEP_MAX_TRANSCRIPTS)) + 1,
+    ).map(transcript_consequence)
+    consequence_ranks = hl.dict(
+        hl.enumerate(hl.literal(CONSEQUENCE_TERMS)).map(lambda x: (x[1], x[0])),
+    )
+    return hl.struct(
+        allele_string=hl.delimit(ht.alleles, '/'),
+        end=ht.locus.position + hl.len(ref) - 1,
+        id=hl.missing(hl.tstr),
+        input=hl.delimit(
+            [
+                ht.locus.contig,
+                hl.str(ht.locus.position),
+                '.',
+                ref,
+                alt,
+            ],
+            '\t',
+        ),
+        most_severe_consequence=hl.sorted(
+            transcript_consequences.flatmap(lambda c: c.consequence_terms),
+            key=lambda t: consequence_ranks[t],
+        )[0],
+        seq_region_name=ht.locus.contig,
+        start=ht.locus.position,
+        strand=1,
+        transcript_consequences=transcript_consequences,
+        variant_class=hl.if_else(cls == 'SNV', 'SNV', 'indel'),
+    )
+
+
+def _resolve_config(vep_config_json_path: str | None) -> str:
+    return (
+        vep_config_json_path
+        if vep_config_json_path is not None
+        else DEFAULT_VEP_CONFIG_JSON_PATH
+    )
+
+
+def variant_class(ht: hl.Table) -> hl.StringExpression:
+    allele_length = hl.max(ht.alleles.map(hl.len))
+    return (
+        hl.case()
+        .when(allele_length == 1, 'SNV')
+        .when(allele_length <= LARGE_VARIANT_ALLELE_LENGTH, 'INDEL')
+        .default('LARGE')
+    )
+
+
+def compute_vep_parameters(
+    variant_counts: dict[str, int],
+    seconds_per_variant: dict[str, float],
+) -> VEPParameters:
+    total_seconds = sum(
+        n * seconds_per_variant[cls] for cls, n in variant_counts.items()
+    )
+    n_variants = sum(variant_counts.values())
+    block_size = DEFAULT_VEP_BLOCK_SIZE
+    if total_seconds > 0:
+        block_size = round(TARGET_SECONDS_PER_VEP_BLOCK * n_variants / total_seconds)
+    # NB: partitions are only ever split further than the fixed
+    # partitioning by variant count, never merged.
+    return VEPParameters(
+        n_partitions=max(
+            math.ceil(total_seconds / TARGET_SECONDS_PER_VEP_PARTITION),
+            math.ceil(n_variants / VARIANTS_PER_VEP_PARTITION),
+            1,
+        ),
+        block_size=min(max(block_size, MIN_VEP_BLOCK_SIZE), MAX_VEP_BLOCK_SIZE),
+        seconds_per_variant=seconds_per_variant,
+        variant_counts=variant_counts,
+    )
+
+
+def measure_vep_seconds_per_variant(
+    ht: hl.Table,
+    vep_config_json_path: str | None,
+    variant_counts: dict[str, int],
+) -> dict[str, float]:
+    backend = vep_backend()
+    config = _resolve_config(vep_config_json_path)
+
+    def vep_seconds(sample_ht: hl.Table) -> float:
+        start = time.monotonic()
+        sample_ht = backend.vep(sample_ht, config, DEFAULT_VEP_BLOCK_SIZE)
+        # NB: aggregating over the annotation keeps VEP from being pruned.
+        sample_ht.aggregate(hl.agg.count_where(hl.is_defined(sample_ht.vep)))
+        return time.monotonic() - start
+
+    # Each class is timed on a random sample of its variants, checkpointed
+    # so that neither reading nor filtering the variants is counted as VEP
+    # time.  A run over a single variant measures the startup cost of VEP,
+    # which is paid once per block rather than per variant.
+    # NB: Hail does not launch VEP for a partition without rows, so the
+    # startup run cannot be empty.
+    startup_seconds = vep_seconds(checkpoint(ht.select().head(1))[0])
+    seconds_per_variant = {}
+    for cls, n in variant_counts.items():
+        sample_ht = ht.filter(ht.vep_variant_class == cls)
+        sample_ht = sample_ht.sample(min(VARIANTS_PER_VEP_COST_SAMPLE / n, 1))
+        sample_ht, _ = checkpoint(sample_ht.select())
+        n_sampled = sample_ht.count()
+        if not n_sampled:
+            continue
+        seconds_per_variant[cls] = (
+            max(vep_seconds(sample_ht) - startup_seconds, 0) / n_sampled
+        )
+    return seconds_per_variant
+
+
+def plan_vep(
+    ht: hl.Table,
+    vep_config_json_path: str | None,
+) -> tuple[hl.Table, VEPParameters]:
+    ht, _ = checkpoint(ht.annotate(vep_variant_class=variant_class(ht)))
+    variant_counts = ht.aggregate(hl.agg.counter(ht.vep_variant_class))
+    vep_parameters = compute_vep_parameters(
+        variant_counts,
+        measure_vep_seconds_per_variant(ht, vep_config_json_path, variant_counts),
+    )
+    ht = ht.repartition(vep_parameters.n_partitions)
+    return ht.drop('vep_variant_class'), vep_parameters
 
 
 def run_vep(
     ht: hl.Table,
     dataset_type: DatasetType,
     vep_config_json_path: str | None,
+    reference_genome: ReferenceGenome | None = None,
+    use_vep_cache: bool = False,
+    block_size: int = DEFAULT_VEP_BLOCK_SIZE,
 ) -> hl.Table:
     if not dataset_type.veppable:
         return ht
-    config = (
-        vep_config_json_path
-        if vep_config_json_path is not None
-        else 'file:///vep_data/vep-gcloud.json'
-    )
-    return hl.vep(
-        ht,
-        config=config,
-        name='vep',
-        block_size=1000,
-        tolerate_parse_error=True,
+    backend = vep_backend()
+    config = _resolve_config(vep_config_json_path)
+    if not use_vep_cache:
+        return backend.vep(ht, config, block_size)
+
+    # Only variants absent from the cache are sent to VEP.  Their
+    # annotations are written once, as a new table of the cache, and every
+    # requested variant is then read back from the cache.
+    config_hash = backend.config_hash(config)
+    vep_cache_ht = read_vep_cache_ht(reference_genome, dataset_type, config_hash)
+    uncached_ht = ht.select().select_globals()
+    if vep_cache_ht is not None:
+        uncached_ht = uncached_ht.anti_join(vep_cache_ht)
+    new_vep_cache_ht = backend.vep(uncached_ht, config, block_size)
+    # NB: variants that VEP failed to parse are not cached, so they are retried.
+    new_vep_cache_ht = new_vep_cache_ht.filter(hl.is_defined(new_vep_cache_ht.vep))
+    new_vep_cache_path = os.path.join(
+        vep_cache_prefix(reference_genome, dataset_type, config_hash),
+        f'{uuid.uuid4()}.ht',
     )
+    new_vep_cache_ht.select('vep').select_globals(
+        vep_config_hash=config_hash,
+    ).write(new_vep_cache_path)
+    # NB: the row count is read from the table metadata.
+    if hl.read_table(new_vep_cache_path).count() == 0:
+        remove_directory(new_vep_cache_path)
+    else:
+        compact_vep_cache(reference_genome, dataset_type, config_hash)
+    vep_cache_ht = read_vep_cache_ht(reference_genome, dataset_type, config_hash)
+    if vep_cache_ht is None:
+        return ht.annotate(vep=hl.missing(new_vep_cache_ht.vep.dtype))
+    return ht.annotate(vep=vep_cache_ht[ht.key].vep)
@@ -0,0 +1,295 @@
+import os
+import tempfile
+from unittest.mock import Mock, patch
+
+import hail as hl
+
+from v03_pipeline.lib.annotations.enums import BIOTYPES, CONSEQUENCE_TERMS
+from v03_pipeline.lib.model import DatasetType, ReferenceGenome
+from v03_pipeline.lib.paths import vep_cache_prefix
+from v03_pipeline.lib.test.mocked_dataroot_testcase import MockedDatarootTestCase
+from v03_pipeline.lib.vep import (
+    VEPParameters,
+    compute_vep_parameters,
+    measure_vep_seconds_per_variant,
+    plan_vep,
+    read_vep_cache_ht,
+    run_vep,
+    variant_class,
+    vep_config_hash,
+)
+from v03_pipeline.var.test.vep.mock_vep_data import MOCK_VEP_DATA
+
+
+class VepTest(MockedDatarootTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.vep_config_json_path = os.path.join(self.temp_dir.name, 'vep.json')
+        with open(self.vep_config_json_path, 'w') as f:
+            f.write('{"command": ["vep"]}')
+
+    def tearDown(self) -> None:
+        super().tearDown()
+        self.temp_dir.cleanup()
+
+    def _variants_ht(
+        self,
+        positions: list[int],
+        alleles: list[str] | None = None,
+    ) -> hl.Table:
+        return hl.Table.parallelize(
+            [
+                {
+                    'locus': hl.Locus(
+                        contig='chr1',
+                        position=position,
+                        reference_genome='GRCh38',
+                    ),
+                    'alleles': alleles if alleles is not None else ['A', 'C'],
+                    'rsid': f'rs{position}',
+                }
+                for position in positions
+            ],
+            hl.tstruct(
+                locus=hl.tlocus('GRCh38'),
+                alleles=hl.tarray(hl.tstr),
+                rsid=hl.tstr,
+            ),
+            key=['locus', 'alleles'],
+        )
+
+    @patch('v03_pipeline.lib.vep.hl.vep')
+    def test_run_vep_with_cache(self, mock_vep: Mock) -> None:
+        vepped_positions = []
+
+        def mock_vep_fn(ht: hl.Table, **_) -> hl.Table:
+            vepped_positions.extend(ht.locus.position.collect())
+            return ht.annotate(vep=MOCK_VEP_DATA)
+
+        mock_vep.side_effect = mock_vep_fn
+        ht = run_vep(
+            self._variants_ht([1, 2, 3]),
+            DatasetType.SNV_INDEL,
+            self.vep_config_json_path,
+            ReferenceGenome.GRCh38,
+            True,
+        )
+        self.assertCountEqual(ht.rsid.collect(), ['rs1', 'rs2', 'rs3'])
+        self.assertEqual(vepped_positions, [1, 2, 3])
+
+        # Only the new variant should be annotated.
+        vepped_positions.clear()
+        ht = run_vep(
+            self._variants_ht([2, 3, 4]),
+            DatasetType.SNV_INDEL,
+            self.vep_config_json_path,
+            ReferenceGenome.GRCh38,
+            True,
+        )
+        self.assertEqual(vepped_positions, [4])
+        self.assertEqual(
+            ht.aggregate(hl.agg.count_where(hl.is_defined(ht.vep))),
+            3,
+        )
+        config_hash = vep_config_hash(self.vep_config_json_path)
+        vep_cache_ht = read_vep_cache_ht(
+            ReferenceGenome.GRCh38,
+            DatasetType.SNV_INDEL,
+            config_hash,
+        )
+        self.assertEqual(vep_cache_ht.count(), 4)
+        self.assertEqual(hl.eval(vep_cache_ht.vep_config_hash), config_hash)
+        # Each run adds its own table rather than rewriting the cache.
+        self.assertEqual(
+            len(
+                hl.hadoop_ls(
+                    vep_cache_prefix(
+                        ReferenceGenome.GRCh38,
+                        DatasetType.SNV_INDEL,
+                        config_hash,
+                    ),
+                ),
+            ),
+            2,
+        )
+
+        # A run without new variants adds no table.
+        vepped_positions.clear()
+        run_vep(
+            self._variants_ht([1, 4]),
+            DatasetType.SNV_INDEL,
+            self.vep_config_json_path,
+            ReferenceGenome.GRCh38,
+            True,
+        )
+        self.assertEqual(vepped_positions, [])
+        self.assertEqual(
+            len(
+                hl.hadoop_ls(
+                    vep_cache_prefix(
+                        ReferenceGenome.GRCh38,
+                        DatasetType.SNV_INDEL,
+                        config_hash,
+                    ),
+                ),
+            ),
+            2,
+        )
+
+        # A changed config should not re-use the cached annotations.
+        with open(self.vep_config_json_path, 'w') as f:
+            f.write('{"command": ["vep", "--everything"]}')
+        vepped_positions.clear()
+        run_vep(
+            self._variants_ht([2, 3]),
+            DatasetType.SNV_INDEL,
+            self.vep_config_json_path,
+            ReferenceGenome.GRCh38,
+            True,
+        )
+        self.assertEqual(vepped_positions, [2, 3])
+
+    @patch('v03_pipeline.lib.vep.MAX_VEP_CACHE_TABLES', 3)
+    @patch('v03_pipeline.lib.vep.hl.vep')
+    def test_compact_vep_cache(self, mock_vep: Mock) -> None:
+        mock_vep.side_effect = lambda ht, **_: ht.annotate(vep=MOCK_VEP_DATA)
+        for positions in [[1, 2], [2, 3], [4]]:
+            run_vep(
+                self._variants_ht(positions),
+                DatasetType.SNV_INDEL,
+                self.vep_config_json_path,
+                ReferenceGenome.GRCh38,
+                True,
+            )
+        prefix = vep_cache_prefix(
+            ReferenceGenome.GRCh38,
+            DatasetType.SNV_INDEL,
+            vep_config_hash(self.vep_config_json_path),
+        )
+        self.assertEqual(len(hl.hadoop_ls(prefix)), 1)
+        vep_cache_ht = read_vep_cache_ht(
+            ReferenceGenome.GRCh38,
+            DatasetType.SNV_INDEL,
+            vep_config_hash(self.vep_config_json_path),
+        )
+        self.assertEqual(vep_cache_ht.locus.position.collect(), [1, 2, 3, 4])
+
+    def test_compute_vep_parameters(self) -> None:
+        self.assertEqual(
+            compute_vep_parameters({}, {}),
+            VEPParameters(
+                n_partitions=1,
+                block_size=1000,
+                seconds_per_variant={},
+                variant_counts={},
+            ),
+        )
+        self.assertEqual(
+            compute_vep_parameters(
+                {'SNV': 90000, 'INDEL': 10000},
+                {'SNV': 0.01, 'INDEL': 0.1},
+            ),
+            VEPParameters(
+                n_partitions=5,
+                block_size=3158,
+                seconds_per_variant={'SNV': 0.01, 'INDEL': 0.1},
+                variant_counts={'SNV': 90000, 'INDEL': 10000},
+            ),
+        )
+        self.assertEqual(
+            compute_vep_parameters({'LARGE': 10}, {'LARGE': 10.0}).block_size,
+            50,
+        )
+        # The VEP time estimate may raise the partition count above the
+        # count-based partitioning, but never lower it.
+        self.assertEqual(
+            compute_vep_parameters({'LARGE': 10000}, {'LARGE': 1.0}).n_partitions,
+            12,
+        )
+
+    @patch('v03_pipeline.lib.vep.hl.vep')
+    def test_measure_vep_seconds_per_variant(self, mock_vep: Mock) -> None:
+        mock_vep.side_effect = lambda ht, **_: ht.annotate(vep=MOCK_VEP_DATA)
+        ht = self._variants_ht([1, 2]).union(self._variants_ht([3], ['AT', 'A']))
+        ht = ht.annotate(vep_variant_class=variant_class(ht))
+        seconds_per_variant = measure_vep_seconds_per_variant(
+            ht,
+            self.vep_config_json_path,
+            {'SNV': 2, 'INDEL': 1},
+        )
+        self.assertCountEqual(seconds_per_variant.keys(), ['SNV', 'INDEL'])
+        self.assertTrue(all(s >= 0 for s in seconds_per_variant.values()))
+        # One run measures the VEP startup cost, then one run per class.
+        self.assertEqual(mock_vep.call_count, 3)
+
+    @patch('v03_pipeline.lib.vep.compute_vep_parameters')
+    @patch('v03_pipeline.lib.vep.measure_vep_seconds_per_variant')
+    def test_plan_vep(
+        self,
+        mock_measure: Mock,
+        mock_compute_vep_parameters: Mock,
+    ) -> None:
+        mock_measure.return_value = {'SNV': 1.0, 'INDEL': 3.0}
+        mock_compute_vep_parameters.side_effect = lambda variant_counts, seconds: (
+            VEPParameters(
+                n_partitions=3,
+                block_size=100,
+                seconds_per_variant=seconds,
+                variant_counts=variant_counts,
+            )
+        )
+        ht = self._variants_ht(list(range(1, 10))).union(
+            self._variants_ht(list(range(10, 13)), ['AT', 'A']),
+        )
+        ht, vep_parameters = plan_vep(ht, self.vep_config_json_path)
+        self.assertEqual(vep_parameters.variant_counts, {'SNV': 9, 'INDEL': 3})
+        self.assertEqual(ht.count(), 12)
+        self.assertEqual(
+            ht.row.dtype,
+            hl.tstruct(
+                locus=hl.tlocus('GRCh38'),
+                alleles=hl.tarray(hl.tstr),
+                rsid=hl.tstr,
+            ),
+        )
+        self.assertEqual(ht.n_partitions(), 3)
+
+    @patch('v03_pipeline.lib.vep.Env')
+    def test_run_vep_synthetic_backend(self, mock_env: Mock) -> None:
+        mock_env.VEP_BACKEND = 'synthetic'
+        mock_env.SYNTHETIC_VEP_COST_PER_VARIANT = 10
+        ht = run_vep(
+            self._variants_ht([1, 2, 3]).union(
+                self._variants_ht([4], ['AT', 'A']),
+            ),
+            DatasetType.SNV_INDEL,
+            None,
+            ReferenceGenome.GRCh38,
+            True,
+        )
+        rows = ht.collect()
+        self.assertEqual(len(rows), 4)
+        for row in rows:
+            self.assertTrue(len(row.vep.transcript_consequences) > 0)
+            for c in row.vep.transcript_consequences:
+                self.assertIn(c.biotype, BIOTYPES)
+                self.assertTrue(set(c.consequence_terms) <= set(CONSEQUENCE_TERMS))
+            self.assertIn(
+                row.vep.most_severe_consequence,
+                {
+                    t
+                    for c in row.vep.transcript_consequences
+                    for t in c.consequence_terms
+                },
+            )
+        self.assertEqual(rows[0].vep.transcript_consequences[0].canonical, 1)
+
+        # Annotations depend only on the variant, not the table it is in.
+        ht_2 = run_vep(
+            self._variants_ht([2]),
+            DatasetType.SNV_INDEL,
+            None,
+            ReferenceGenome.GRCh38,
+        )
+        self.assertEqual(ht_2.vep.collect(), [rows[1].vep])